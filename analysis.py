@@ -1,21 +1,66 @@
 # NLP Analysis Functions (Sentiment, Topic Modeling)
 
-from textblob import TextBlob
+import time # Added for timing
+_ANALYSIS_IMPORT_STARTED = time.perf_counter()
+
+import functools
+import hashlib # Message hashes for the shared token cache
 import pandas as pd
+import numpy as np
 import re
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-from gensim import corpora, models
-import gensim
 import os # Added for cpu_count
-from gensim.models import CoherenceModel # Added
-import time # Added for timing
-import streamlit as st # Needed for caching
-from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline # Import transformers components
-import torch # Add torch import for GPU check
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer # Added for VADER
+import glob # Labeled data files for accuracy checks
+import itertools
+import shutil # Temporary sweep model directories
+import multiprocessing # Spawn context for every process pool
+import tempfile # On-disk Matrix Market topic corpora
+import threading
+import gc
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor # Sharded lexicon scoring, ensemble
+from analysis_runtime import cache_resource, report_error, report_warning # Streamlit-free caching/reporting
+from sentiment_cache import SentimentCache, normalize_text, package_revision # Persistent sentiment cache
+from lazy_imports import lazy_import, startup_report
+from message_rules import MessageRules # Rule table for empty/command/URL/emote-only messages
+from lexicon_engine import engine_revision, get_engine as get_lexicon_engine, score_lexicon_batch # Compiled VADER/TextBlob scoring
+from topic_model_cache import TopicModelCache, corpus_fingerprint # Persistent trained topic models
+
+# Every process pool in this module (and kick_analyze.py) uses this context. This module runs
+# inside Streamlit and the FastAPI app, where torch/tokenizer threads may already be running, and
+# forking a multi-threaded process can deadlock the child; so workers are never forked from the
+# caller. Where available they are forked from a single-threaded forkserver that has imported this
+# module and gensim once (torch/transformers stay lazy, so no model threads exist there), which
+# keeps worker start-up close to a plain fork; elsewhere they spawn.
+if "forkserver" in multiprocessing.get_all_start_methods():
+    PROCESS_POOL_CONTEXT = multiprocessing.get_context("forkserver")
+    PROCESS_POOL_CONTEXT.set_forkserver_preload([__name__, 'gensim'])
+else:
+    PROCESS_POOL_CONTEXT = multiprocessing.get_context("spawn")
+
+# Heavy NLP dependencies are imported on first use (see lazy_imports.py), so importing this
+# module stays fast when e.g. only VADER is needed
+TextBlob = lazy_import('textblob', 'TextBlob')
+nltk = lazy_import('nltk')
+stopwords = lazy_import('nltk.corpus', 'stopwords')
+WordNetLemmatizer = lazy_import('nltk.stem', 'WordNetLemmatizer')
+gensim = lazy_import('gensim')
+corpora = lazy_import('gensim.corpora')
+models = lazy_import('gensim.models')
+CoherenceModel = lazy_import('gensim.models', 'CoherenceModel')
+Sparse2Corpus = lazy_import('gensim.matutils', 'Sparse2Corpus')
+MmCorpus = lazy_import('gensim.corpora', 'MmCorpus')
+scipy_sparse = lazy_import('scipy.sparse')
+AutoModelForSequenceClassification = lazy_import('transformers', 'AutoModelForSequenceClassification')
+AutoTokenizer = lazy_import('transformers', 'AutoTokenizer')
+pipeline = lazy_import('transformers', 'pipeline')
+torch = lazy_import('torch')
+SentimentIntensityAnalyzer = lazy_import('vaderSentiment.vaderSentiment', 'SentimentIntensityAnalyzer')
+TfidfVectorizer = lazy_import('sklearn.feature_extraction.text', 'TfidfVectorizer')
+LogisticRegression = lazy_import('sklearn.linear_model', 'LogisticRegression')
+make_pipeline = lazy_import('sklearn.pipeline', 'make_pipeline')
+make_union = lazy_import('sklearn.pipeline', 'make_union')
+GroupKFold = lazy_import('sklearn.model_selection', 'GroupKFold')
+joblib = lazy_import('joblib')
 
 # Ensure NLTK data is downloaded (users should run this once)
 # try:
@@ -31,10 +76,6 @@ from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer # Added for
 #     print("NLTK data downloaded.")
 
 
-# Combine English and Turkish stopwords
-stop_words = set(stopwords.words('english')) | set(stopwords.words('turkish'))
-lemmatizer = WordNetLemmatizer()
-
 # Add custom chat/Turkish informal/slang/emote text stopwords
 custom_stopwords = {
     # Turkish Informal & Common
@@ -57,40 +98,264 @@ custom_stopwords = {
     # Add more as needed based on your specific chat logs
 }
 
-stop_words = stop_words.union(custom_stopwords)
+@functools.lru_cache(maxsize=None)
+def get_stop_words() -> frozenset:
+    """English and Turkish NLTK stopwords plus the custom chat stopwords (loaded on first use)."""
+    return frozenset(set(stopwords.words('english')) | set(stopwords.words('turkish')) | custom_stopwords)
+
+@functools.lru_cache(maxsize=None)
+def get_lemmatizer():
+    """Shared WordNetLemmatizer (loaded on first use)."""
+    return WordNetLemmatizer()
+
+def __getattr__(name):
+    # `stop_words` and `lemmatizer` used to be module-level globals built at import time
+    if name == 'stop_words':
+        return get_stop_words()
+    if name == 'lemmatizer':
+        return get_lemmatizer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Minimum word length to keep
 MIN_WORD_LENGTH = 3
 
+# Patterns used by preprocess_text, compiled once
+_URL_PATTERN = re.compile(r'http\S+')
+_NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+_DIGITS_PATTERN = re.compile(r'\d+')
+# After punctuation/digit removal a message is only word characters and whitespace, so NLTK's
+# word_tokenize reduces to a whitespace split plus the MacIntyre contractions that contain no
+# apostrophe ("cannot" -> "can not", "gonna" -> "gon na", ...), which always match whole tokens
+_CONTRACTION_PATTERN = re.compile(r'(can)(not)|(gim)(me)|(gon)(na)|(got)(ta)|(lem)(me)|(wan)(na)', re.IGNORECASE)
+
+PREPROCESS_TOKEN_CACHE_SIZE = 200000 # Distinct raw tokens whose stopword/lemma result is memoized
+
+@functools.lru_cache(maxsize=PREPROCESS_TOKEN_CACHE_SIZE)
+def _process_token(token: str) -> tuple:
+    """Contraction split, stopword/length filter and lemmatization of one whitespace token."""
+    match = _CONTRACTION_PATTERN.fullmatch(token)
+    words = [part for part in match.groups() if part is not None] if match else (token,)
+    stop_words = get_stop_words()
+    processed = []
+    for word in words:
+        # Apply stopword and length filtering
+        if word not in stop_words and len(word) >= MIN_WORD_LENGTH:
+            # Lemmatize English words (best effort)
+            try:
+                processed.append(get_lemmatizer().lemmatize(word))
+            except Exception:
+                processed.append(word) # Keep original if error
+    return tuple(processed)
+
 def preprocess_text(text):
     """Cleans, tokenizes, and lemmatizes text for topic modeling."""
     text = str(text).lower()  # Lowercase
-
-    # Remove URLs first
-    text = re.sub(r'http\S+', '', text)
+    text = _URL_PATTERN.sub('', text) # Remove URLs first
 
     # Simple check for bot commands (remove if message starts with !)
     if text.strip().startswith('!'):
         return [] # Return empty list for commands
 
-    text = re.sub(r'[^\w\s]', '', text)  # Remove punctuation
-    text = re.sub(r'\d+', '', text)      # Remove numbers
-    tokens = word_tokenize(text)         # Tokenize
+    text = _NON_WORD_PATTERN.sub('', text) # Remove punctuation
+    text = _DIGITS_PATTERN.sub('', text)   # Remove numbers
+    return [word for token in text.split() for word in _process_token(token)]
 
-    processed_tokens = []
-    for word in tokens:
-        # Apply stopword and length filtering
-        if word not in stop_words and len(word) >= MIN_WORD_LENGTH:
-            # Lemmatize English words (best effort)
-            try:
-                processed_tokens.append(lemmatizer.lemmatize(word))
-            except Exception:
-                processed_tokens.append(word) # Keep original if error
+def preprocess_messages(messages: pd.Series, token_cache=None) -> list:
+    """preprocess_text over a Series, in order; repeated messages are processed once.
+    With a TokenCache, token lists come from (and missing ones are added to) the cache."""
+    if token_cache is not None:
+        return token_cache.get_many(messages)
+    codes, uniques = pd.factorize(messages.fillna('').astype(str))
+    processed_uniques = [preprocess_text(text) for text in uniques]
+    return [processed_uniques[code] for code in codes]
+
+# --- Shared Token Cache ---
+# Topic modeling (LDA and its coherence model) and content suggestions all need the same
+# preprocessed token lists. A TokenCache is filled once per analysis run - in a process pool for
+# large logs - and every stage reads from it instead of preprocessing its own slice again.
+TOKEN_CACHE_PARALLEL_MIN_MESSAGES = 50000 # Unique messages; below this, pool start-up costs more than it saves
+TOKEN_CACHE_WORKERS = os.cpu_count() or 1
+TOKEN_CACHE_CHUNKS_PER_WORKER = 4
+
+def message_hash(text: str) -> bytes:
+    """Cache key of a message: 16-byte BLAKE2b digest of its text."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+def _preprocess_chunk(texts: list) -> tuple:
+    """Pool task: (token lists, seconds spent) for a chunk of messages."""
+    start = time.perf_counter()
+    docs = [preprocess_text(text) for text in texts]
+    return docs, time.perf_counter() - start
 
-    return processed_tokens
+class TokenCache:
+    """Preprocessed token lists keyed by message hash, shared by the analysis stages of one run."""
+
+    def __init__(self):
+        self._docs = {}
+        self.fill_seconds = 0.0     # Wall-clock time spent preprocessing (fill and misses)
+        self.compute_seconds = 0.0  # Preprocessing time summed over worker processes
+        self.processed = 0          # Messages preprocessed
+        self.requested = 0          # Unique messages requested by the stages via get_many
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _store(self, texts: list, keys: list, parallel=None, workers: int = None) -> None:
+        workers = workers or TOKEN_CACHE_WORKERS
+        use_pool = parallel if parallel is not None else len(texts) >= TOKEN_CACHE_PARALLEL_MIN_MESSAGES
+        start = time.perf_counter()
+        if not use_pool or workers < 2 or len(texts) < 2:
+            docs, compute_seconds = _preprocess_chunk(texts)
+        else:
+            chunk_size = max(1, -(-len(texts) // (workers * TOKEN_CACHE_CHUNKS_PER_WORKER))) # Ceiling division
+            chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+            docs, compute_seconds = [], 0.0
+            # executor.map yields chunk results in submission order, so positions are preserved
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=PROCESS_POOL_CONTEXT) as executor:
+                for chunk_docs, chunk_seconds in executor.map(_preprocess_chunk, chunks):
+                    docs.extend(chunk_docs)
+                    compute_seconds += chunk_seconds
+        self._docs.update(zip(keys, docs))
+        self.fill_seconds += time.perf_counter() - start
+        self.compute_seconds += compute_seconds
+        self.processed += len(texts)
+
+    def fill(self, messages: pd.Series, parallel=None, workers: int = None) -> int:
+        """Preprocesses every message not cached yet; returns how many were added.
+
+        Args:
+            messages (pd.Series): Raw chat messages (duplicates are processed once).
+            parallel: True/False forces the process pool on/off; None uses it only for at least
+                      TOKEN_CACHE_PARALLEL_MIN_MESSAGES new unique messages.
+            workers (int): Pool size, defaults to TOKEN_CACHE_WORKERS.
+        """
+        texts, keys = [], []
+        for text in pd.unique(messages.fillna('').astype(str)):
+            key = message_hash(text)
+            if key not in self._docs:
+                texts.append(text)
+                keys.append(key)
+        if texts:
+            self._store(texts, keys, parallel, workers)
+            print(f"Token cache: preprocessed {len(texts)} unique messages in {self.fill_seconds:.2f} seconds.")
+        return len(texts)
+
+    def get_many(self, messages: pd.Series) -> list:
+        """Token lists for `messages`, in order; messages missing from the cache are preprocessed."""
+        codes, uniques = pd.factorize(messages.fillna('').astype(str))
+        keys = [message_hash(text) for text in uniques]
+        missing = [(text, key) for text, key in zip(uniques, keys) if key not in self._docs]
+        if missing:
+            self._store([text for text, _ in missing], [key for _, key in missing], parallel=False)
+        self.requested += len(keys)
+        self.hits += len(keys) - len(missing)
+        docs = [self._docs[key] for key in keys]
+        return [docs[code] for code in codes]
+
+    def stats(self) -> dict:
+        """Cache size, hits and an estimate of the preprocessing time saved.
+
+        Without the cache every stage preprocesses the unique messages it receives, so the
+        baseline cost is requested messages x average per-message cost; the cache paid
+        fill_seconds of wall-clock time instead."""
+        per_message = self.compute_seconds / self.processed if self.processed else 0.0
+        return {'messages': len(self._docs), 'requested': self.requested, 'hits': self.hits,
+                'fill_seconds': self.fill_seconds,
+                'saved_seconds': max(0.0, self.requested * per_message - self.fill_seconds)}
 
 
 # --- Sentiment Analysis ---
+# Every method has a scorer that takes a list of message strings and returns (labels, scores),
+# where scores is a float32 matrix with one row per message. Scorer output is what the
+# persistent sentiment cache stores, so re-analyzing repeated chat lines costs a lookup.
+
+# --- Sentiment Scores & Thresholds ---
+# Columns of the float32 score matrix returned for each method. Lexicon methods keep their raw
+# score (VADER compound, TextBlob polarity); BERT methods keep softmax probabilities in the
+# model's id2label order.
+SENTIMENT_SCORE_COLUMNS = {
+    'textblob': ['polarity'],
+    'vader': ['compound'],
+    'bert': ['negative', 'positive'],
+    'custom_kick_bert': ['negative', 'neutral', 'positive'],
+    'custom_kick_bert_onnx': ['negative', 'neutral', 'positive'],
+    'custom_kick_student': ['negative', 'neutral', 'positive'],
+    'kick_tfidf': ['negative', 'neutral', 'positive'],
+}
+
+# Default cut-offs for lexicon scores: (positive, negative, inclusive comparison)
+# VADER uses >= 0.05 / <= -0.05, TextBlob uses > 0.1 / < -0.1
+LEXICON_THRESHOLDS = {
+    'vader': (0.05, -0.05, True),
+    'textblob': (0.1, -0.1, False),
+}
+
+def apply_sentiment_thresholds(scores, method: str, positive_threshold=None, negative_threshold=None,
+                               min_confidence: float = 0.0) -> np.ndarray:
+    """
+    Turns a score matrix into sentiment labels without re-running the model.
+
+    Args:
+        scores: Score matrix from run_sentiment_scores (n, len(SENTIMENT_SCORE_COLUMNS[method])).
+        method (str): The method that produced the scores.
+        positive_threshold / negative_threshold: Lexicon cut-offs; defaults to LEXICON_THRESHOLDS.
+        min_confidence (float): For probability methods, messages whose top probability is below
+                                this value are labelled 'neutral'. 0 keeps the plain argmax.
+
+    Returns:
+        np.ndarray: Object array of labels. Rows without scores (NaN) are labelled 'unknown'.
+    """
+    scores = np.asarray(scores)
+    if scores.dtype.kind != 'f':
+        scores = scores.astype(np.float32)
+    if scores.ndim == 1:
+        scores = scores.reshape(-1, 1)
+
+    if method in LEXICON_THRESHOLDS:
+        labels = _threshold_polarity(scores[:, 0], LEXICON_THRESHOLDS[method], positive_threshold, negative_threshold)
+    elif method == 'ensemble':
+        # Vote rows are re-decided from their vote shares (ties go to 'neutral', as in the vote);
+        # averaged rows have no vote shares and use the neutral band on the averaged polarity
+        labels = _threshold_polarity(scores[:, 0], ENSEMBLE_AVERAGE_THRESHOLDS, positive_threshold, negative_threshold)
+        shares = scores[:, 1:1 + len(ENSEMBLE_VOTE_CLASSES)]
+        voted = ~np.isnan(shares).all(axis=1)
+        labels[voted] = ENSEMBLE_VOTE_CLASSES[shares[voted].argmax(axis=1)]
+        labels[voted & (np.nan_to_num(shares, nan=0.0).max(axis=1) < min_confidence)] = 'neutral'
+    elif method == 'cascade':
+        # Rows the slow model answered use its probabilities, the rest the fast model's
+        labels = apply_sentiment_thresholds(scores[:, :_CASCADE_FAST_WIDTH], CASCADE_FAST_METHOD, min_confidence=min_confidence)
+        escalated = ~np.isnan(scores[:, _CASCADE_FAST_WIDTH:]).all(axis=1)
+        labels[escalated] = apply_sentiment_thresholds(scores[escalated, _CASCADE_FAST_WIDTH:], CASCADE_SLOW_METHOD,
+                                                       min_confidence=min_confidence)
+    else:
+        columns = np.asarray(SENTIMENT_SCORE_COLUMNS[method], dtype=object)
+        filled = np.nan_to_num(scores, nan=-1.0)
+        labels = columns[filled.argmax(axis=1)]
+        labels[filled.max(axis=1) < min_confidence] = 'neutral'
+    labels[np.isnan(scores).all(axis=1)] = 'unknown'
+    return labels
+
+def _threshold_polarity(values: np.ndarray, thresholds: tuple, positive_threshold=None, negative_threshold=None) -> np.ndarray:
+    """Labels one polarity column with (positive, negative, inclusive) cut-offs; explicit thresholds override them."""
+    default_positive, default_negative, inclusive = thresholds
+    # Compare in the scores' own precision, so float32 scores behave like the original floats
+    positive = values.dtype.type(default_positive if positive_threshold is None else positive_threshold)
+    negative = values.dtype.type(default_negative if negative_threshold is None else negative_threshold)
+    is_positive = values >= positive if inclusive else values > positive
+    is_negative = values <= negative if inclusive else values < negative
+    return np.select([is_positive, is_negative], ['positive', 'negative'], default='neutral').astype(object)
+
+def _fallback_result(messages: pd.Series, label, method: str, return_scores: bool):
+    """Result used when a model is unavailable: every row gets `label` (no label gives an empty Series)."""
+    if label is None:
+        labels = pd.Series(dtype='object')
+    else:
+        labels = pd.Series([label] * len(messages), index=messages.index, dtype='object')
+    if not return_scores:
+        return labels
+    return labels, np.full((len(labels), len(SENTIMENT_SCORE_COLUMNS.get(method, [None]))), np.nan, dtype=np.float32)
+
 def get_textblob_sentiment(text):
     """Classifies the sentiment of a text string using TextBlob."""
     # Ensure text is a string
@@ -104,14 +369,21 @@ def get_textblob_sentiment(text):
     else:
         return 'neutral'
 
-def perform_textblob_sentiment_analysis(messages: pd.Series) -> pd.Series:
+def score_textblob_sentiment(texts: list, parallel=None):
+    """Scores messages with TextBlob. Returns (labels, float32 (n, 1) polarity matrix).
+
+    `parallel`: True/False forces process-pool sharding on/off; None decides by input size.
+    """
+    polarity = score_lexicon_values('textblob', texts, parallel=parallel)
+    labels = apply_sentiment_thresholds(polarity, 'textblob') # Thresholds on float64, as get_textblob_sentiment
+    return labels.tolist(), polarity.astype(np.float32).reshape(-1, 1)
+
+def perform_textblob_sentiment_analysis(messages: pd.Series, parallel=None, return_scores: bool = False):
     """Applies TextBlob sentiment analysis to a Pandas Series of messages."""
-    # Handle potential NaN values by filling them with an empty string
-    sentiments = messages.fillna('').apply(get_textblob_sentiment)
-    return sentiments
+    return score_messages_cached(messages, 'textblob', return_scores=return_scores, parallel=parallel)
 
 # --- VADER Sentiment Analysis ---
-@st.cache_resource
+@cache_resource
 def load_vader_analyzer():
     """Loads the VADER SentimentIntensityAnalyzer."""
     return SentimentIntensityAnalyzer()
@@ -127,21 +399,371 @@ def get_vader_sentiment(text, analyzer):
     else:
         return 'neutral'
 
-def perform_vader_sentiment_analysis(messages: pd.Series) -> pd.Series:
+def score_vader_sentiment(texts: list, parallel=None):
+    """Scores messages with VADER. Returns (labels, float32 (n, 1) compound-score matrix).
+
+    `parallel`: True/False forces process-pool sharding on/off; None decides by input size.
+    """
+    compound = score_lexicon_values('vader', texts, parallel=parallel)
+    labels = apply_sentiment_thresholds(compound, 'vader')
+    return labels.tolist(), compound.astype(np.float32).reshape(-1, 1)
+
+def perform_vader_sentiment_analysis(messages: pd.Series, parallel=None, return_scores: bool = False):
     """Applies VADER sentiment analysis to a Pandas Series of messages."""
-    analyzer = load_vader_analyzer()
-    # Handle potential NaN values by filling them with an empty string
-    sentiments = messages.fillna('').apply(lambda text: get_vader_sentiment(text, analyzer))
-    return sentiments
+    return score_messages_cached(messages, 'vader', return_scores=return_scores, parallel=parallel)
+
+# --- Process-Pool Sharded Lexicon Scoring ---
+# VADER and TextBlob scores come from the compiled batch engines in lexicon_engine.py (same
+# scores as the libraries, without per-row analyzer objects). They are pure Python and
+# single-threaded, so very large inputs are still split into chunks and scored in a process
+# pool; each worker builds its lexicon index once in the pool initializer.
+LEXICON_PARALLEL_MIN_MESSAGES = 200000 # Below this, process start-up costs more than it saves
+LEXICON_PARALLEL_WORKERS = os.cpu_count() or 1
+LEXICON_CHUNKS_PER_WORKER = 4         # Several chunks per worker to even out slow chunks
+
+def _init_lexicon_worker(kind: str):
+    """Pool initializer: builds the compiled lexicon index once per worker process."""
+    get_lexicon_engine(kind)
+
+def _vader_compound_chunk(texts: list) -> np.ndarray:
+    return score_lexicon_batch('vader', texts)
+
+def _textblob_polarity_chunk(texts: list) -> np.ndarray:
+    return score_lexicon_batch('textblob', texts)
+
+_LEXICON_CHUNK_FUNCTIONS = {'vader': _vader_compound_chunk, 'textblob': _textblob_polarity_chunk}
+
+def score_lexicon_values(kind: str, texts: list, parallel=None, workers: int = None) -> np.ndarray:
+    """Returns VADER compound or TextBlob polarity values (float64) for `texts`, in input order.
+
+    Args:
+        kind (str): 'vader' or 'textblob'.
+        texts (list): Message strings.
+        parallel: True/False forces the process pool on/off; None uses it only for inputs of at
+                  least LEXICON_PARALLEL_MIN_MESSAGES messages.
+        workers (int): Pool size, defaults to LEXICON_PARALLEL_WORKERS.
+    """
+    chunk_fn = _LEXICON_CHUNK_FUNCTIONS[kind]
+    workers = workers or LEXICON_PARALLEL_WORKERS
+    use_pool = parallel if parallel is not None else len(texts) >= LEXICON_PARALLEL_MIN_MESSAGES
+    if not use_pool or workers < 2 or len(texts) < 2:
+        return chunk_fn(texts)
+
+    chunk_size = max(1, -(-len(texts) // (workers * LEXICON_CHUNKS_PER_WORKER))) # Ceiling division
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    start_time = time.time()
+    # executor.map yields chunk results in submission order, so positions are preserved
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=PROCESS_POOL_CONTEXT,
+                             initializer=_init_lexicon_worker, initargs=(kind,)) as executor:
+        values = np.fromiter(itertools.chain.from_iterable(executor.map(chunk_fn, chunks)),
+                             dtype=np.float64, count=len(texts))
+    print(f"{kind} scoring: {len(texts)} messages in {len(chunks)} chunks across {min(workers, len(chunks))} processes "
+          f"({time.time() - start_time:.2f} seconds).")
+    return values
+
+# --- Length-Bucketed BERT Inference Engine ---
+# Chat lines are mostly 3-20 tokens, so padding every batch to 512 tokens wastes most of the
+# forward pass. Messages are sorted by token length, grouped into batches that fit a padded
+# token budget (batch_size * longest_sequence), and padded only to the longest member.
+BERT_MAX_LENGTH = 512        # Hard truncation limit per message (same as the old pipeline call)
+BERT_TOKEN_BUDGET = 8192     # Max padded tokens per forward pass; tune down on small machines
+BERT_MAX_BATCH_SIZE = 256    # Upper bound on messages per batch, even for very short lines
+
+def plan_length_batches(lengths, token_budget=BERT_TOKEN_BUDGET, max_batch_size=BERT_MAX_BATCH_SIZE) -> list:
+    """Groups message positions into length-sorted batches that fit the padded token budget.
+
+    Args:
+        lengths: Sequence of token counts, one per message.
+        token_budget (int): Maximum of batch_size * longest_sequence for a single batch.
+        max_batch_size (int): Maximum number of messages in a single batch.
+
+    Returns:
+        list[np.ndarray]: Arrays of positions into `lengths`, one per batch.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    order = np.argsort(lengths, kind='stable') # Shortest first, ties keep input order
+    batches = []
+    start = 0
+    for end in range(1, len(order) + 1):
+        # Sorted ascending, so the newest member is always the longest in the batch
+        if end < len(order):
+            next_size = end - start + 1
+            if next_size <= max_batch_size and next_size * lengths[order[end]] <= token_budget:
+                continue
+        batches.append(order[start:end])
+        start = end
+    return batches
+
+def bucketed_inference(tokenizer, forward_fn, num_labels: int, texts: list, token_budget=BERT_TOKEN_BUDGET,
+                       max_batch_size=BERT_MAX_BATCH_SIZE, max_length=BERT_MAX_LENGTH, return_tensors='pt') -> np.ndarray:
+    """Length-bucketed, dynamically padded inference loop shared by the PyTorch and ONNX backends.
+
+    Args:
+        tokenizer: A Hugging Face tokenizer.
+        forward_fn: Callable taking a padded batch (as `return_tensors`) and returning logits as np.ndarray.
+        num_labels (int): Number of output classes.
+        texts (list): Message strings.
+
+    Returns:
+        np.ndarray: float32 softmax probabilities of shape (len(texts), num_labels), in the same
+                    order as `texts`. Column i corresponds to the model's id2label[i].
+    """
+    probs = np.zeros((len(texts), num_labels), dtype=np.float32)
+    if not texts:
+        return probs
+
+    # Tokenize once without padding; only the lengths are needed to plan the batches
+    encodings = tokenizer(list(texts), truncation=True, max_length=max_length)
+    lengths = [len(ids) for ids in encodings['input_ids']]
+    batches = plan_length_batches(lengths, token_budget=token_budget, max_batch_size=max_batch_size)
+
+    for batch in batches:
+        features = [{key: encodings[key][i] for key in encodings.keys()} for i in batch]
+        padded = tokenizer.pad(features, padding='longest', return_tensors=return_tensors)
+        logits = np.asarray(forward_fn(padded), dtype=np.float32)
+        logits = logits - logits.max(axis=1, keepdims=True) # Numerically stable softmax
+        exp_logits = np.exp(logits)
+        probs[batch] = exp_logits / exp_logits.sum(axis=1, keepdims=True)
+
+    print(f"BERT inference: {len(texts)} messages in {len(batches)} length-bucketed batches "
+          f"(padded tokens: {sum(len(b) * lengths[b[-1]] for b in batches)}).")
+    return probs
+
+def bucketed_bert_inference(sentiment_pipeline, texts: list, token_budget=BERT_TOKEN_BUDGET,
+                            max_batch_size=BERT_MAX_BATCH_SIZE, max_length=BERT_MAX_LENGTH) -> np.ndarray:
+    """Runs a Hugging Face text-classification pipeline's model over `texts` with dynamic padding."""
+    model = sentiment_pipeline.model
+    model.eval()
+
+    def forward(padded):
+        padded = {key: tensor.to(model.device) for key, tensor in padded.items()}
+        return model(**padded).logits.float().cpu().numpy()
+
+    with torch.inference_mode():
+        return bucketed_inference(sentiment_pipeline.tokenizer, forward, model.config.num_labels, texts,
+                                  token_budget=token_budget, max_batch_size=max_batch_size, max_length=max_length)
+
+def probs_to_pipeline_results(probs: np.ndarray, id2label: dict) -> list:
+    """Converts a probability matrix into the [{'label', 'score'}] shape the HF pipeline returns."""
+    best = probs.argmax(axis=1)
+    return [{'label': id2label[int(i)], 'score': float(probs[row, i])} for row, i in enumerate(best)]
+
+# --- Model Registry ---
+# Transformer models are ~440MB each, so they are not kept forever: the registry loads models on
+# demand, records how much memory each one holds, and evicts the least recently used models once
+# the total goes over MODEL_MEMORY_BUDGET_MB. Models listed in KICK_WARMUP_MODELS can be loaded
+# in a background thread at startup so the first analysis does not pay the load time.
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get("KICK_MODEL_MEMORY_BUDGET_MB", "1024"))
+WARMUP_MODELS = [name.strip() for name in os.environ.get("KICK_WARMUP_MODELS", "").split(",") if name.strip()]
+
+def estimate_model_bytes(model) -> int:
+    """Approximate resident size of a loaded model (parameters + buffers, or the ONNX file size)."""
+    if model is None:
+        return 0
+    if hasattr(model, 'model_bytes'):
+        return int(model.model_bytes)
+    module = getattr(model, 'model', model) # HF pipelines wrap the torch module
+    if hasattr(module, 'parameters'):
+        tensors = itertools.chain(module.parameters(), module.buffers())
+        return int(sum(tensor.numel() * tensor.element_size() for tensor in tensors))
+    return 0
+
+class ModelRegistry:
+    """Loads models by name on demand and keeps them within a memory budget (LRU eviction)."""
+
+    def __init__(self, budget_mb: float = MODEL_MEMORY_BUDGET_MB):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._loaders = {}
+        self._models = OrderedDict() # name -> {'model', 'bytes', 'loaded_at', 'last_used', 'load_seconds'}, LRU first
+        self._name_locks = {}
+        self._lock = threading.RLock()
+        self._warmup_threads = {}
+        self.evictions = 0
+
+    def register(self, name: str, loader) -> None:
+        """Registers a zero-argument loader that returns the model (or None if it cannot be loaded)."""
+        with self._lock:
+            self._loaders[name] = loader
+            self._name_locks.setdefault(name, threading.Lock())
+
+    def __contains__(self, name: str) -> bool:
+        """True if `name` has a registered loader."""
+        return name in self._loaders
+
+    def get(self, name: str):
+        """Returns the named model, loading it (and evicting others if over budget) when needed.
+
+        A failed load (loader returned None) is remembered, like the old cached loaders, until
+        the entry is evicted or the registry is cleared.
+        """
+        with self._lock:
+            if name in self._models:
+                return self._touch(name)
+            if name not in self._loaders:
+                raise KeyError(f"No model registered under {name!r}; known models: {', '.join(self._loaders)}")
+            name_lock = self._name_locks[name]
+
+        with name_lock: # Loads of different models may run concurrently, the same model only once
+            with self._lock:
+                if name in self._models:
+                    return self._touch(name)
+            start_time = time.time()
+            model = self._loaders[name]()
+            entry = {'model': model, 'bytes': estimate_model_bytes(model), 'loaded_at': time.time(),
+                     'last_used': time.time(), 'load_seconds': time.time() - start_time}
+            with self._lock:
+                self._models[name] = entry
+                self._evict_over_budget(keep=name)
+            if model is not None:
+                print(f"Model registry: loaded '{name}' ({entry['bytes'] / 1e6:.0f} MB) in {entry['load_seconds']:.2f} seconds; "
+                      f"{self.total_bytes() / 1e6:.0f}/{self.budget_bytes / 1e6:.0f} MB in use.")
+            return model
+
+    def _touch(self, name: str):
+        entry = self._models[name]
+        entry['last_used'] = time.time()
+        self._models.move_to_end(name)
+        return entry['model']
+
+    def _evict_over_budget(self, keep: str) -> None:
+        for name in list(self._models):
+            if self.total_bytes() <= self.budget_bytes:
+                break
+            if name != keep:
+                self.evict(name)
+        if self.total_bytes() > self.budget_bytes:
+            print(f"Model registry: '{keep}' alone exceeds the {self.budget_bytes / 1e6:.0f} MB budget; keeping it loaded.")
+
+    def evict(self, name: str) -> bool:
+        """Drops a loaded model so its memory can be reclaimed. Returns False if it was not loaded."""
+        with self._lock:
+            entry = self._models.pop(name, None)
+        if entry is None:
+            return False
+        if entry['model'] is not None:
+            self.evictions += 1
+            print(f"Model registry: evicted '{name}' ({entry['bytes'] / 1e6:.0f} MB, least recently used).")
+        del entry
+        gc.collect()
+        if torch.is_loaded and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        return True
+
+    def clear(self) -> None:
+        for name in list(self._models):
+            self.evict(name)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(entry['bytes'] for entry in self._models.values())
+
+    def is_loaded(self, name: str) -> bool:
+        with self._lock:
+            return name in self._models and self._models[name]['model'] is not None
+
+    def warm_up(self, names, background: bool = True) -> list:
+        """Loads `names` ahead of use, in one daemon thread per model when `background` is set.
+
+        Models that are already loaded or warming up are skipped. Returns the started threads.
+        """
+        started = []
+        for name in names:
+            with self._lock:
+                warming = self._warmup_threads.get(name)
+                if name in self._models or (warming is not None and warming.is_alive()):
+                    continue
+                if name not in self._loaders:
+                    print(f"Model registry: cannot warm up unknown model '{name}'.")
+                    continue
+                if background:
+                    thread = threading.Thread(target=self.get, args=(name,), name=f"warmup-{name}", daemon=True)
+                    self._warmup_threads[name] = thread
+                    thread.start()
+                    started.append(thread)
+                    continue
+            self.get(name)
+        return started
+
+    def stats(self) -> dict:
+        """Per-model memory and usage, plus the budget and eviction count."""
+        with self._lock:
+            models = {name: {'loaded': entry['model'] is not None, 'bytes': entry['bytes'],
+                             'load_seconds': entry['load_seconds'], 'last_used': entry['last_used']}
+                      for name, entry in self._models.items()}
+            warming = [name for name, thread in self._warmup_threads.items() if thread.is_alive()]
+        return {'models': models, 'total_bytes': sum(model['bytes'] for model in models.values()),
+                'budget_bytes': self.budget_bytes, 'evictions': self.evictions, 'warming_up': warming}
+
+model_registry = ModelRegistry()
 
 # --- NEW: BERT Sentiment Analysis using Hugging Face ---
+TURKISH_BERT_MODEL_NAME = "savasy/bert-base-turkish-sentiment-cased"
+# Path to your fine-tuned model, relative to the NLP_Final directory (where analysis.py is)
+CUSTOM_KICK_BERT_MODEL_PATH = "kick_sentiment_project/model/finetuned_kick_sentiment"
+
+# Adjust to the actual labels returned by the Turkish model
+BERT_LABEL_MAP = {'positive': 'positive', 'negative': 'negative'}
+
+# Define the expected order of labels from your LabelEncoder during training
+# le.classes_ was ['negative', 'neutral', 'positive']
+# So, LABEL_0 is negative, LABEL_1 is neutral, LABEL_2 is positive
+CUSTOM_KICK_LABEL_MAP = {
+    "LABEL_0": "negative",
+    "LABEL_1": "neutral",
+    "LABEL_2": "positive",
+    # Add direct integer mappings as well, in case the model outputs integers
+    0: "negative",
+    1: "neutral",
+    2: "positive"
+}
+
+def score_with_classifier(predict_probs, id2label: dict, num_labels: int, texts: list, label_map: dict, model_display_name: str):
+    """Scores messages with a sequence classifier, given its batched `predict_probs(texts)` function.
+
+    Empty messages are not sent to the model and are labelled 'unknown'.
+
+    Returns:
+        tuple: (labels, scores) where scores is a float32 (n, num_labels) softmax matrix
+               (rows for empty messages are NaN).
+    """
+    labels = ['unknown'] * len(texts)
+    scores = np.full((len(texts), num_labels), np.nan, dtype=np.float32)
+    non_empty_positions = [i for i, msg in enumerate(texts) if msg.strip()] # Only process non-empty messages
+    if not non_empty_positions:
+        return labels, scores
+
+    non_empty_messages = [texts[i] for i in non_empty_positions]
+    probs = predict_probs(non_empty_messages)
+    raw_results = probs_to_pipeline_results(probs, id2label)
+    print(f"Raw {model_display_name} sentiment results (sample of first 5): {raw_results[:5]}") # Log a sample of raw results
+
+    scores[non_empty_positions] = probs
+    for position, result, message in zip(non_empty_positions, raw_results, non_empty_messages):
+        raw_label = result.get('label') # Use .get() for safer access
+        sentiment = label_map.get(raw_label)
+        if sentiment:
+            labels[position] = sentiment
+        else:
+            print(f"Unexpected label from {model_display_name} model: {raw_label} for message: {message}. Check label mapping.")
+    return labels, scores
+
+def score_with_bert_pipeline(sentiment_pipeline, texts: list, label_map: dict, model_display_name: str):
+    """Scores messages with a loaded BERT pipeline using the length-bucketed engine."""
+    config = sentiment_pipeline.model.config
+    return score_with_classifier(lambda batch: bucketed_bert_inference(sentiment_pipeline, batch),
+                                 config.id2label, config.num_labels, texts, label_map, model_display_name)
+
+def _has_non_empty_messages(messages: pd.Series) -> bool:
+    return bool((messages.fillna('').astype(str).str.strip() != '').any())
 
-# Use st.cache_resource to load the model and tokenizer only once
-@st.cache_resource
 def load_bert_sentiment_pipeline():
+    """Returns the Turkish BERT pipeline, loaded once through the model registry."""
+    return model_registry.get('bert')
+
+def _load_bert_sentiment_pipeline():
     """Loads the Turkish BERT sentiment analysis model and tokenizer."""
     try:
-        model_name = "savasy/bert-base-turkish-sentiment-cased"
+        model_name = TURKISH_BERT_MODEL_NAME
         model = AutoModelForSequenceClassification.from_pretrained(model_name)
         tokenizer = AutoTokenizer.from_pretrained(model_name)
         
@@ -157,93 +779,57 @@ def load_bert_sentiment_pipeline():
         return sentiment_analyzer
     except Exception as e:
         print(f"Error loading BERT model: {e}") # Log error
-        st.error(f"Error loading BERT model '{model_name}': {e}. Ensure internet connection and model availability.")
+        report_error(f"Error loading BERT model '{model_name}': {e}. Ensure internet connection and model availability.")
         return None
 
-def perform_bert_sentiment_analysis_turkish(messages: pd.Series) -> pd.Series:
+def score_bert_turkish_sentiment(texts: list):
+    """Scores messages with the Turkish BERT model. Returns None if the model could not be loaded."""
+    sentiment_pipeline = load_bert_sentiment_pipeline()
+    if sentiment_pipeline is None:
+        return None
+    return score_with_bert_pipeline(sentiment_pipeline, texts, BERT_LABEL_MAP, "BERT")
+
+def perform_bert_sentiment_analysis_turkish(messages: pd.Series, return_scores: bool = False):
     """
     Performs sentiment analysis on a Pandas Series of Turkish text messages 
     using a pre-trained BERT model from Hugging Face.
 
     Args:
         messages (pd.Series): A Pandas Series containing the text messages.
+        return_scores (bool): Also return the float32 softmax matrix (negative, positive).
 
     Returns:
         pd.Series: A Pandas Series containing sentiment labels ('positive' or 'negative').
                    Returns an empty Series if the model could not be loaded.
+                   With return_scores, a (labels, scores) tuple.
     """
-    sentiment_pipeline = load_bert_sentiment_pipeline()
-    
-    if sentiment_pipeline is None:
-        return pd.Series(dtype='object') # Return empty series if model failed to load
-
-    # Convert Series to list for pipeline processing
-    message_list = messages.astype(str).fillna('').tolist() # Ensure strings and handle NaN
-
-    # Filter out empty strings from message_list to avoid sending them to the pipeline
-    # and keep track of original indices
-    original_indices = []
-    non_empty_messages = []
-    for i, msg in enumerate(message_list):
-        if msg.strip(): # Only process non-empty messages
-            non_empty_messages.append(msg)
-            original_indices.append(messages.index[i])
-        # else: # Optionally handle empty messages if needed, e.g. assign 'neutral' or 'unknown'
-            # print(f"Skipping empty message at original index: {messages.index[i]}")
-
-
-    if not non_empty_messages:
-        st.warning("No non-empty messages to analyze for BERT sentiment.")
+    if not _has_non_empty_messages(messages):
+        report_warning("No non-empty messages to analyze for BERT sentiment.")
         # Return a series of 'unknown' with the original index if all messages were empty
-        return pd.Series(['unknown'] * len(messages), index=messages.index, dtype='object')
+        return _fallback_result(messages, 'unknown', 'bert', return_scores)
 
-    try:
-        # The pipeline can often handle lists directly and efficiently
-        raw_results = sentiment_pipeline(non_empty_messages, truncation=True, max_length=512) # Added truncation
-        
-        print(f"Raw BERT sentiment results (sample of first 5): {raw_results[:5]}") # Log a sample of raw results
-
-        # Initialize sentiments with 'unknown' for all original messages
-        sentiments_dict = {idx: 'unknown' for idx in messages.index}
-
-        # Map results to 'positive' or 'negative' based on original indices
-        for i, result in enumerate(raw_results):
-            original_idx = original_indices[i] # Get the original index for this result
-            label = result.get('label') # Use .get() for safer access
-            # Adjust to the actual labels returned by the model
-            if label == 'positive': # Changed from 'LABEL_1'
-                sentiments_dict[original_idx] = 'positive'
-            elif label == 'negative': # Changed from 'LABEL_0'
-                sentiments_dict[original_idx] = 'negative'
-            # Optional: Handle neutral if the model provides it, or map other labels
-            # elif label == 'neutral': 
-            #     sentiments_dict[original_idx] = 'neutral'
-            else:
-                print(f"Unexpected label from BERT model: {label} for message: {non_empty_messages[i]}")
-                sentiments_dict[original_idx] = 'unknown' # Keep as unknown if label is still unexpected
-
-        # Convert the dictionary to a Series, ensuring it aligns with the original message index
-        final_sentiments = pd.Series(sentiments_dict).reindex(messages.index)
-
-
-    except Exception as e:
-        st.error(f"Error during BERT sentiment analysis pipeline: {e}")
-        # Return a series of 'unknown' with the original index on error
-        return pd.Series(['unknown'] * len(messages), index=messages.index, dtype='object') 
-
-    return final_sentiments # Ensure index alignment with input
+    result = score_messages_cached(messages, 'bert', return_scores=return_scores)
+    if result is None:
+        return _fallback_result(messages, None, 'bert', return_scores) # Return empty series if model failed to load
+    return result # Ensure index alignment with input
 
 # --- Custom Fine-Tuned Kick BERT Sentiment Analysis ---
-@st.cache_resource
 def load_custom_kick_bert_pipeline():
+    """Returns the custom Kick BERT pipeline, loaded once through the model registry."""
+    return model_registry.get('custom_kick_bert')
+
+def _load_custom_kick_bert_pipeline():
     """Loads the custom fine-tuned Kick BERT sentiment analysis model and tokenizer."""
+    return _load_local_bert_pipeline(CUSTOM_KICK_BERT_MODEL_PATH, "Custom Kick BERT",
+                                     "Please ensure the model is trained and saved correctly.")
+
+def _load_local_bert_pipeline(model_path: str, model_display_name: str, missing_hint: str):
+    """Loads a sequence-classification model saved with save_pretrained() as a HF pipeline."""
     try:
-        # Path to your fine-tuned model, relative to the NLP_Final directory (where analysis.py is)
-        model_path = "kick_sentiment_project/model/finetuned_kick_sentiment"
         # Check if the model path exists
         if not os.path.exists(model_path):
-            st.error(f"Custom model path not found: {os.path.abspath(model_path)}. Please ensure the model is trained and saved correctly.")
-            print(f"Error: Custom model path not found: {os.path.abspath(model_path)}")
+            report_error(f"{model_display_name} model path not found: {os.path.abspath(model_path)}. {missing_hint}")
+            print(f"Error: {model_display_name} model path not found: {os.path.abspath(model_path)}")
             return None
             
         model = AutoModelForSequenceClassification.from_pretrained(model_path)
@@ -251,133 +837,1535 @@ def load_custom_kick_bert_pipeline():
         
         device = 0 if torch.cuda.is_available() else -1 
         if torch.cuda.is_available():
-            print("CUDA is available. Using GPU for Custom Kick BERT sentiment analysis.")
+            print(f"CUDA is available. Using GPU for {model_display_name} sentiment analysis.")
         else:
-            print("CUDA not available. Using CPU for Custom Kick BERT sentiment analysis.")
+            print(f"CUDA not available. Using CPU for {model_display_name} sentiment analysis.")
             
         sentiment_analyzer = pipeline("sentiment-analysis", tokenizer=tokenizer, model=model, device=device)
-        print(f"Custom Kick BERT Sentiment model loaded successfully from '{model_path}' on {'GPU' if device != -1 else 'CPU'}.")
+        print(f"{model_display_name} Sentiment model loaded successfully from '{model_path}' on {'GPU' if device != -1 else 'CPU'}.")
         return sentiment_analyzer
     except Exception as e:
-        print(f"Error loading Custom Kick BERT model: {e}")
-        st.error(f"Error loading Custom Kick BERT model from '{model_path}': {e}.")
+        print(f"Error loading {model_display_name} model: {e}")
+        report_error(f"Error loading {model_display_name} model from '{model_path}': {e}.")
         return None
 
-def perform_custom_kick_bert_analysis(messages: pd.Series) -> pd.Series:
+def score_custom_kick_bert_sentiment(texts: list):
+    """Scores messages with the custom Kick BERT model. Returns None if the model could not be loaded."""
+    sentiment_pipeline = load_custom_kick_bert_pipeline()
+    if sentiment_pipeline is None:
+        return None
+    return score_with_bert_pipeline(sentiment_pipeline, texts, CUSTOM_KICK_LABEL_MAP, "Custom Kick BERT")
+
+def perform_custom_kick_bert_analysis(messages: pd.Series, return_scores: bool = False):
     """
     Performs sentiment analysis using the custom fine-tuned Kick BERT model.
     Args:
         messages (pd.Series): A Pandas Series containing the text messages.
+        return_scores (bool): Also return the float32 softmax matrix (negative, neutral, positive).
     Returns:
-        pd.Series: A Pandas Series containing sentiment labels.
+        pd.Series: A Pandas Series containing sentiment labels (or a (labels, scores) tuple).
     """
-    sentiment_pipeline = load_custom_kick_bert_pipeline()
-    
-    if sentiment_pipeline is None:
-        return pd.Series(['unknown'] * len(messages), index=messages.index, dtype='object') # Return unknown if model failed
+    if not _has_non_empty_messages(messages):
+        report_warning("No non-empty messages to analyze for Custom Kick BERT sentiment.")
+        return _fallback_result(messages, 'unknown', 'custom_kick_bert', return_scores)
+
+    result = score_messages_cached(messages, 'custom_kick_bert', return_scores=return_scores)
+    if result is None:
+        return _fallback_result(messages, 'unknown', 'custom_kick_bert', return_scores) # Return unknown if model failed
+    return result
+
+# --- Custom Kick BERT via ONNX Runtime (int8) ---
+# Exported by `python train_model.py --export-onnx-only` (run inside kick_sentiment_project/).
+# The int8 graph is dynamically quantized, which is several times faster than fp32 PyTorch on CPU.
+CUSTOM_KICK_ONNX_PATH = "kick_sentiment_project/model/finetuned_kick_sentiment_onnx"
+CUSTOM_KICK_ONNX_MODEL_FILE = os.environ.get("KICK_ONNX_MODEL_FILE", "model.int8.onnx") # or "model.onnx" for fp32
+
+class OnnxSequenceClassifier:
+    """Runs an exported BERT sequence-classification graph with ONNX Runtime on CPU."""
+
+    def __init__(self, model_dir: str, model_file: str):
+        import onnxruntime as ort # Optional dependency, only needed for this backend
+        from transformers import AutoConfig
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = os.cpu_count() or 1
+        self.session = ort.InferenceSession(os.path.join(model_dir, model_file), options,
+                                            providers=['CPUExecutionProvider'])
+        self.model_bytes = os.path.getsize(os.path.join(model_dir, model_file)) # For the model registry
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        config = AutoConfig.from_pretrained(model_dir) # Same id2label as the PyTorch model
+        self.id2label = config.id2label
+        self.num_labels = config.num_labels
 
-    message_list = messages.astype(str).fillna('').tolist()
-    original_indices = []
-    non_empty_messages = []
-    for i, msg in enumerate(message_list):
-        if msg.strip():
-            non_empty_messages.append(msg)
-            original_indices.append(messages.index[i])
+    def forward(self, padded) -> np.ndarray:
+        feed = {name: np.asarray(padded[name], dtype=np.int64) for name in self.input_names if name in padded}
+        return self.session.run(None, feed)[0]
 
-    if not non_empty_messages:
-        st.warning("No non-empty messages to analyze for Custom Kick BERT sentiment.")
-        return pd.Series(['unknown'] * len(messages), index=messages.index, dtype='object')
+    def predict_probs(self, texts: list) -> np.ndarray:
+        return bucketed_inference(self.tokenizer, self.forward, self.num_labels, texts, return_tensors='np')
 
-    sentiments_dict = {idx: 'unknown' for idx in messages.index}
+def load_custom_kick_onnx_model():
+    """Returns the custom Kick ONNX model, loaded once through the model registry."""
+    return model_registry.get('custom_kick_bert_onnx')
+
+def _load_custom_kick_onnx_model():
+    """Loads the ONNX export of the custom Kick BERT model with ONNX Runtime."""
+    model_file_path = os.path.join(CUSTOM_KICK_ONNX_PATH, CUSTOM_KICK_ONNX_MODEL_FILE)
+    if not os.path.exists(model_file_path):
+        report_error(f"ONNX model not found: {os.path.abspath(model_file_path)}. Run `python train_model.py --export-onnx-only` in kick_sentiment_project first.")
+        print(f"Error: ONNX model not found: {os.path.abspath(model_file_path)}")
+        return None
     try:
-        raw_results = sentiment_pipeline(non_empty_messages, truncation=True, max_length=512)
-        print(f"Raw Custom Kick BERT sentiment results (sample of first 5): {raw_results[:5]}")
-
-        # Define the expected order of labels from your LabelEncoder during training
-        # le.classes_ was ['negative', 'neutral', 'positive']
-        # So, LABEL_0 is negative, LABEL_1 is neutral, LABEL_2 is positive
-        label_map = { 
-            "LABEL_0": "negative", 
-            "LABEL_1": "neutral", 
-            "LABEL_2": "positive",
-            # Add direct integer mappings as well, in case the model outputs integers
-            0: "negative",
-            1: "neutral",
-            2: "positive"
-        }
-
-        for i, result in enumerate(raw_results):
-            original_idx = original_indices[i]
-            raw_label = result.get('label') # This could be 'LABEL_0', 0, 'LABEL_1', 1 etc.
-            
-            # Get the string sentiment from our map
-            # The .get() on label_map will return None if raw_label is not a key
-            sentiment = label_map.get(raw_label)
-            
-            if sentiment:
-                sentiments_dict[original_idx] = sentiment
-            else:
-                print(f"Unexpected label from Custom Kick BERT model: {raw_label} for message: {non_empty_messages[i]}. Check label mapping.")
-                sentiments_dict[original_idx] = 'unknown' 
+        onnx_model = OnnxSequenceClassifier(CUSTOM_KICK_ONNX_PATH, CUSTOM_KICK_ONNX_MODEL_FILE)
+        print(f"Custom Kick ONNX model loaded successfully from '{model_file_path}' (CPU).")
+        return onnx_model
+    except ImportError:
+        report_error("onnxruntime is not installed. Install it with `pip install onnxruntime` to use the ONNX backend.")
+        return None
+    except Exception as e:
+        print(f"Error loading Custom Kick ONNX model: {e}")
+        report_error(f"Error loading Custom Kick ONNX model from '{model_file_path}': {e}.")
+        return None
+
+model_registry.register('bert', _load_bert_sentiment_pipeline)
+model_registry.register('custom_kick_bert', _load_custom_kick_bert_pipeline)
+model_registry.register('custom_kick_bert_onnx', _load_custom_kick_onnx_model)
+
+def score_custom_kick_onnx_sentiment(texts: list):
+    """Scores messages with the ONNX export of the custom Kick model. Returns None if it could not be loaded."""
+    onnx_model = load_custom_kick_onnx_model()
+    if onnx_model is None:
+        return None
+    return score_with_classifier(onnx_model.predict_probs, onnx_model.id2label, onnx_model.num_labels,
+                                 texts, CUSTOM_KICK_LABEL_MAP, "Custom Kick ONNX")
+
+def perform_custom_kick_onnx_analysis(messages: pd.Series, return_scores: bool = False):
+    """
+    Performs sentiment analysis with the ONNX Runtime export of the custom Kick BERT model.
+    Uses the same label mapping as perform_custom_kick_bert_analysis.
+    """
+    if not _has_non_empty_messages(messages):
+        report_warning("No non-empty messages to analyze for Custom Kick ONNX sentiment.")
+        return _fallback_result(messages, 'unknown', 'custom_kick_bert_onnx', return_scores)
+
+    result = score_messages_cached(messages, 'custom_kick_bert_onnx', return_scores=return_scores)
+    if result is None:
+        return _fallback_result(messages, 'unknown', 'custom_kick_bert_onnx', return_scores)
+    return result
+
+# --- Distilled Custom Kick Student ---
+# A few-layer BERT trained on the custom Kick model's soft labels over the live chat logs, made by
+# `python train_model.py --distill` (run inside kick_sentiment_project/). Same labels as the
+# teacher at a fraction of the per-message cost, meant for live use on CPU.
+CUSTOM_KICK_STUDENT_MODEL_PATH = "kick_sentiment_project/model/distilled_kick_sentiment_student"
+
+def load_custom_kick_student_pipeline():
+    """Returns the distilled student pipeline, loaded once through the model registry."""
+    return model_registry.get('custom_kick_student')
 
-        final_sentiments = pd.Series(sentiments_dict).reindex(messages.index)
+def _load_custom_kick_student_pipeline():
+    return _load_local_bert_pipeline(CUSTOM_KICK_STUDENT_MODEL_PATH, "Custom Kick Student",
+                                     "Run `python train_model.py --distill` in kick_sentiment_project first.")
 
+model_registry.register('custom_kick_student', _load_custom_kick_student_pipeline)
+
+def score_custom_kick_student_sentiment(texts: list):
+    """Scores messages with the distilled student model. Returns None if the model could not be loaded."""
+    sentiment_pipeline = load_custom_kick_student_pipeline()
+    if sentiment_pipeline is None:
+        return None
+    return score_with_bert_pipeline(sentiment_pipeline, texts, CUSTOM_KICK_LABEL_MAP, "Custom Kick Student")
+
+def perform_custom_kick_student_analysis(messages: pd.Series, return_scores: bool = False):
+    """
+    Performs sentiment analysis with the distilled (few-layer) custom Kick student model.
+    Uses the same label mapping as perform_custom_kick_bert_analysis.
+    """
+    if not _has_non_empty_messages(messages):
+        report_warning("No non-empty messages to analyze for Custom Kick Student sentiment.")
+        return _fallback_result(messages, 'unknown', 'custom_kick_student', return_scores)
+
+    result = score_messages_cached(messages, 'custom_kick_student', return_scores=return_scores)
+    if result is None:
+        return _fallback_result(messages, 'unknown', 'custom_kick_student', return_scores)
+    return result
+
+# --- Kick TF-IDF Classifier ---
+# Character and word n-gram TF-IDF with logistic regression, trained on data/labeled_data. It
+# scores Turkish chat in microseconds per message and gives calibrated-enough class
+# probabilities to decide which messages the cascade sends on to the custom Kick BERT.
+KICK_TFIDF_MODEL_PATH = os.environ.get("KICK_TFIDF_MODEL_PATH", os.path.join(".cache", "kick_tfidf_sentiment.joblib"))
+KICK_TFIDF_C = 4.0 # Inverse regularization strength, picked by grouped cross-validation on labeled_data
+
+def fit_kick_tfidf_model(messages, labels):
+    """Fits the TF-IDF + logistic regression pipeline on raw messages and their labels."""
+    texts = [normalize_text(str(message)).lower() for message in messages]
+    model = make_pipeline(
+        make_union(TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 5), sublinear_tf=True),
+                   TfidfVectorizer(analyzer='word', ngram_range=(1, 2), sublinear_tf=True, token_pattern=r'(?u)\b\w+\b')),
+        LogisticRegression(C=KICK_TFIDF_C, max_iter=2000))
+    return model.fit(texts, list(labels))
+
+def load_kick_tfidf_model():
+    """Returns the TF-IDF classifier, loaded once through the model registry."""
+    return model_registry.get('kick_tfidf')
+
+def _load_kick_tfidf_model():
+    """Loads the saved classifier, retraining it when labeled_data is newer than the saved file."""
+    labeled_mtime = max((os.path.getmtime(path) for path in glob.glob(os.path.join(LABELED_DATA_DIR, "*.csv"))), default=0.0)
+    try:
+        if os.path.isfile(KICK_TFIDF_MODEL_PATH) and os.path.getmtime(KICK_TFIDF_MODEL_PATH) >= labeled_mtime:
+            model = joblib.load(KICK_TFIDF_MODEL_PATH)
+        else:
+            labeled_df = load_labeled_data()
+            if labeled_df.empty:
+                report_error(f"Kick TF-IDF model: no labeled data found in {os.path.abspath(LABELED_DATA_DIR)}.")
+                return None
+            start_time = time.time()
+            model = fit_kick_tfidf_model(labeled_df['message'].fillna(''), labeled_df['label'])
+            os.makedirs(os.path.dirname(KICK_TFIDF_MODEL_PATH) or ".", exist_ok=True)
+            joblib.dump(model, KICK_TFIDF_MODEL_PATH)
+            print(f"Kick TF-IDF model trained on {len(labeled_df)} labeled messages in {time.time() - start_time:.2f} seconds.")
+        model.model_bytes = os.path.getsize(KICK_TFIDF_MODEL_PATH)
+        return model
     except Exception as e:
-        st.error(f"Error during Custom Kick BERT sentiment analysis pipeline: {e}")
-        return pd.Series(['unknown'] * len(messages), index=messages.index, dtype='object') 
+        print(f"Error loading Kick TF-IDF model: {e}")
+        report_error(f"Error loading Kick TF-IDF model '{KICK_TFIDF_MODEL_PATH}': {e}. Is scikit-learn installed?")
+        return None
 
-    return final_sentiments
+model_registry.register('kick_tfidf', _load_kick_tfidf_model)
 
-# --- New Main Sentiment Dispatcher ---
-def run_sentiment_analysis(messages: pd.Series, method: str = 'bert') -> pd.Series:
+def score_kick_tfidf_sentiment(texts: list):
+    """Scores messages with the TF-IDF classifier. Returns None if the model could not be loaded."""
+    model = load_kick_tfidf_model()
+    if model is None:
+        return None
+    columns = SENTIMENT_SCORE_COLUMNS['kick_tfidf']
+    labels = ['unknown'] * len(texts)
+    scores = np.full((len(texts), len(columns)), np.nan, dtype=np.float32)
+    positions = [i for i, text in enumerate(texts) if text and text.strip()]
+    if positions:
+        probabilities = model.predict_proba([normalize_text(texts[i]).lower() for i in positions])
+        order = [list(model.classes_).index(column) for column in columns]
+        scores[positions] = probabilities[:, order]
+        for i, best in zip(positions, scores[positions].argmax(axis=1)):
+            labels[i] = columns[best]
+    return labels, scores
+
+def perform_kick_tfidf_analysis(messages: pd.Series, return_scores: bool = False):
     """
-    Runs sentiment analysis using the specified method.
+    Performs sentiment analysis with the TF-IDF classifier trained on data/labeled_data.
+    Labels are 'negative', 'neutral' or 'positive'; empty messages are 'unknown'.
+    """
+    if not _has_non_empty_messages(messages):
+        report_warning("No non-empty messages to analyze for Kick TF-IDF sentiment.")
+        return _fallback_result(messages, 'unknown', 'kick_tfidf', return_scores)
+
+    result = score_messages_cached(messages, 'kick_tfidf', return_scores=return_scores)
+    if result is None:
+        return _fallback_result(messages, 'unknown', 'kick_tfidf', return_scores)
+    return result
+
+# --- Persistent Sentiment Cache ---
+SENTIMENT_SCORERS = {
+    'textblob': score_textblob_sentiment,
+    'vader': score_vader_sentiment,
+    'bert': score_bert_turkish_sentiment,
+    'custom_kick_bert': score_custom_kick_bert_sentiment,
+    'custom_kick_bert_onnx': score_custom_kick_onnx_sentiment,
+    'custom_kick_student': score_custom_kick_student_sentiment,
+    'kick_tfidf': score_kick_tfidf_sentiment,
+}
+
+# Set KICK_SENTIMENT_CACHE=0 to always re-score every message
+SENTIMENT_CACHE_ENABLED = os.environ.get("KICK_SENTIMENT_CACHE", "1") != "0"
+_sentiment_cache = None
+
+def get_sentiment_cache():
+    """Returns the process-wide SentimentCache, or None if caching is disabled or unavailable."""
+    global _sentiment_cache
+    if not SENTIMENT_CACHE_ENABLED:
+        return None
+    if _sentiment_cache is None:
+        try:
+            _sentiment_cache = SentimentCache()
+        except Exception as e:
+            print(f"Warning: Could not open sentiment cache: {e}. Continuing without cache.")
+            return None
+    return _sentiment_cache
+
+def _latest_mtime(path: str) -> str:
+    try:
+        return str(max(os.path.getmtime(os.path.join(path, name)) for name in os.listdir(path)))
+    except (OSError, ValueError):
+        return 'missing'
+
+def sentiment_model_revision(method: str) -> str:
+    """Identifies the model behind `method`, so cached results are invalidated when it changes."""
+    # Lexicon scores come from lexicon_engine, so its source revision is part of theirs
+    if method == 'vader':
+        return f"{package_revision('vaderSentiment')}+engine-{engine_revision()}"
+    if method == 'textblob':
+        return f"{package_revision('textblob')}+engine-{engine_revision()}"
+    if method == 'bert':
+        return TURKISH_BERT_MODEL_NAME
+    if method == 'custom_kick_bert':
+        # Retraining rewrites the saved weights, so their modification time identifies the revision
+        return f"{CUSTOM_KICK_BERT_MODEL_PATH}@{_latest_mtime(CUSTOM_KICK_BERT_MODEL_PATH)}"
+    if method == 'custom_kick_bert_onnx':
+        return f"{CUSTOM_KICK_ONNX_PATH}/{CUSTOM_KICK_ONNX_MODEL_FILE}@{_latest_mtime(CUSTOM_KICK_ONNX_PATH)}"
+    if method == 'custom_kick_student':
+        return f"{CUSTOM_KICK_STUDENT_MODEL_PATH}@{_latest_mtime(CUSTOM_KICK_STUDENT_MODEL_PATH)}"
+    if method == 'kick_tfidf':
+        # The classifier is retrained from labeled_data whenever that changes
+        return f"{package_revision('scikit-learn')}+C{KICK_TFIDF_C}+{LABELED_DATA_DIR}@{_latest_mtime(LABELED_DATA_DIR)}"
+    return method
+
+def score_messages_cached(messages: pd.Series, method: str, use_cache: bool = True, return_scores: bool = False,
+                          **scorer_kwargs):
+    """
+    Labels a Series of messages with `method`, scoring only messages missing from the cache.
 
     Args:
         messages (pd.Series): A Pandas Series containing the text messages.
-        method (str): The sentiment analysis method to use.
-                      Options: 'textblob', 'bert', 'vader', 'custom_kick_bert'. Defaults to 'bert'.
+        method (str): A key of SENTIMENT_SCORERS.
+        use_cache (bool): Set to False to bypass the persistent cache.
+        return_scores (bool): Also return the float32 score matrix (see SENTIMENT_SCORE_COLUMNS).
+        **scorer_kwargs: Extra options for the method's scorer (e.g. parallel=True for lexicon methods).
 
     Returns:
-        pd.Series: A Pandas Series containing sentiment labels.
+        pd.Series | tuple | None: Sentiment labels aligned with messages.index (with return_scores,
+                                  a (labels, scores) tuple), or None if the method's model could not be loaded.
     """
+    # Handle potential NaN values by filling them with an empty string
+    texts = messages.fillna('').astype(str).map(normalize_text)
+    codes, uniques = pd.factorize(texts)
+    uniques = list(uniques)
+    unique_labels = [None] * len(uniques)
+    unique_scores = [None] * len(uniques)
+    cache = get_sentiment_cache() if use_cache else None
+    revision = sentiment_model_revision(method)
+
+    if cache is not None:
+        cached = cache.get_many(method, revision, uniques)
+        for position, text in enumerate(uniques):
+            if text in cached:
+                unique_labels[position], unique_scores[position] = cached[text]
+
+    missing = [position for position, label in enumerate(unique_labels) if label is None]
+    if missing:
+        missing_texts = [uniques[position] for position in missing]
+        try:
+            result = SENTIMENT_SCORERS[method](missing_texts, **scorer_kwargs)
+        except Exception as e:
+            report_error(f"Error during {method} sentiment analysis: {e}")
+            # Return a series of 'unknown' with the original index on error
+            return _fallback_result(messages, 'unknown', method, return_scores)
+        if result is None:
+            return None
+        missing_labels, missing_scores = result
+        for position, label, score_row in zip(missing, missing_labels, missing_scores):
+            unique_labels[position] = label
+            unique_scores[position] = score_row
+        if cache is not None:
+            cache.put_many(method, revision, zip(missing_texts, missing_labels, missing_scores))
+
+    if cache is not None:
+        print(f"Sentiment cache stats: {cache.stats()}")
+    labels = pd.Series(np.asarray(unique_labels, dtype=object)[codes], index=messages.index, dtype='object')
+    if not return_scores:
+        return labels
+    if uniques:
+        scores = np.vstack([np.asarray(row, dtype=np.float32).reshape(1, -1) for row in unique_scores])[codes]
+    else:
+        scores = np.zeros((0, len(SENTIMENT_SCORE_COLUMNS[method])), dtype=np.float32)
+    return labels, scores
+
+
+# --- Trivial-Message Fast Path ---
+# Empty rows, !commands, bare links, emote-only and punctuation-only messages are labelled from
+# the rule table in message_rules.py and never reach a model (see KICK_EMOTE_SENTIMENT_MAP).
+SENTIMENT_FAST_PATH_ENABLED = os.environ.get("KICK_SENTIMENT_FAST_PATH", "1") != "0"
+_message_rules = None
+
+def get_message_rules() -> MessageRules:
+    """Returns the process-wide rule table (the emote map is read once)."""
+    global _message_rules
+    if _message_rules is None:
+        _message_rules = MessageRules()
+    return _message_rules
+
+def set_emote_sentiment_map(emote_sentiment: dict) -> None:
+    """Replaces the emote -> sentiment map used by the fast path."""
+    global _message_rules
+    _message_rules = MessageRules(emote_sentiment)
+
+def rule_score_rows(labels, method: str) -> np.ndarray:
+    """Score rows for rule-labelled messages, shaped like `method`'s score matrix.
+
+    Score-style first columns (lexicon score, ensemble score) get +1 / -1 / 0 (the ensemble also
+    gets all of its vote share on the rule's class); probability methods get a one-hot row, or NaN
+    when the label is not one of their classes. The cascade gets the fast model's row.
+    """
+    columns = SENTIMENT_SCORE_COLUMNS.get(method, [None])
+    rows = np.full((len(labels), len(columns)), np.nan, dtype=np.float32)
+    labels = np.asarray(labels, dtype=object)
+    if method == 'cascade':
+        rows[:, :_CASCADE_FAST_WIDTH] = rule_score_rows(labels, CASCADE_FAST_METHOD)
+        return rows
+    if method in LEXICON_THRESHOLDS or method == 'ensemble':
+        rows[:, 0] = np.select([labels == 'positive', labels == 'negative'], [1.0, -1.0], default=0.0)
+        if method == 'ensemble':
+            rows[:, 1:1 + len(ENSEMBLE_VOTE_CLASSES)] = labels[:, None] == ENSEMBLE_VOTE_CLASSES[None, :]
+        return rows
+    for position, column in enumerate(columns):
+        is_label = labels == column
+        rows[is_label] = 0.0
+        rows[is_label, position] = 1.0
+    return rows
+
+# --- New Main Sentiment Dispatcher ---
+SUPPORTED_SENTIMENT_METHODS = list(SENTIMENT_SCORERS) + ['ensemble', 'cascade']
+
+# Timings and duplicate-collapse statistics of the most recent run_sentiment_analysis call
+last_sentiment_run_stats = {}
+
+def _dispatch_sentiment_method(messages: pd.Series, method: str, return_scores: bool = False, method_options: dict = None):
+    """Routes messages to the perform_* function of the requested method.
+
+    `method_options` are keyword arguments for the combined methods ('ensemble', 'cascade').
+    """
+    method_options = method_options or {}
     if method == 'textblob':
         print("Running sentiment analysis using TextBlob...")
-        return perform_textblob_sentiment_analysis(messages)
+        return perform_textblob_sentiment_analysis(messages, return_scores=return_scores)
     elif method == 'bert':
         print("Running sentiment analysis using BERT...")
-        return perform_bert_sentiment_analysis_turkish(messages)
+        return perform_bert_sentiment_analysis_turkish(messages, return_scores=return_scores)
     elif method == 'vader':
         print("Running sentiment analysis using VADER...")
-        return perform_vader_sentiment_analysis(messages)
+        return perform_vader_sentiment_analysis(messages, return_scores=return_scores)
     elif method == 'custom_kick_bert':
         print("Running sentiment analysis using Custom Fine-Tuned Kick BERT...")
-        return perform_custom_kick_bert_analysis(messages)
+        return perform_custom_kick_bert_analysis(messages, return_scores=return_scores)
+    elif method == 'custom_kick_bert_onnx':
+        print("Running sentiment analysis using Custom Kick BERT (ONNX Runtime)...")
+        return perform_custom_kick_onnx_analysis(messages, return_scores=return_scores)
+    elif method == 'custom_kick_student':
+        print("Running sentiment analysis using the distilled Custom Kick Student model...")
+        return perform_custom_kick_student_analysis(messages, return_scores=return_scores)
+    elif method == 'kick_tfidf':
+        print("Running sentiment analysis using the Kick TF-IDF classifier...")
+        return perform_kick_tfidf_analysis(messages, return_scores=return_scores)
+    elif method == 'ensemble':
+        print(f"Running sentiment analysis using an ensemble of {', '.join(ENSEMBLE_MEMBERS)}...")
+        return perform_ensemble_sentiment_analysis(messages, return_scores=return_scores, **method_options)
+    elif method == 'cascade':
+        print(f"Running sentiment analysis using a cascade ({method_options.get('fast_method', CASCADE_FAST_METHOD)} -> "
+              f"{method_options.get('slow_method', CASCADE_SLOW_METHOD)} for uncertain messages)...")
+        return perform_cascade_sentiment_analysis(messages, return_scores=return_scores, **method_options)
     else:
-        st.error(f"Unknown sentiment analysis method: {method}. Supported methods are 'textblob', 'bert', 'vader', and 'custom_kick_bert'.")
+        report_error(f"Unknown sentiment analysis method: {method}. Supported methods are {', '.join(repr(m) for m in SUPPORTED_SENTIMENT_METHODS)}.")
         # Return neutral for all if method is unknown, or handle as preferred
-        return pd.Series(['neutral'] * len(messages), index=messages.index, dtype='object')
+        return _fallback_result(messages, 'neutral', method, return_scores)
+
+def run_sentiment_scores(messages: pd.Series, method: str = 'bert', method_options: dict = None, fast_path: bool = None):
+    """
+    Runs sentiment analysis and keeps the numeric scores the model computed, not only the labels.
+
+    Chat repeats itself heavily, so messages are first collapsed to their unique (whitespace
+    normalized) strings; each unique string is scored once and results are scattered back.
+    Trivial messages (empty, commands, URLs, emotes) are then labelled by the rule table and
+    only the rest reach the model. Timings, the collapse ratio and per-rule counts are stored
+    in `last_sentiment_run_stats`.
+
+    Args:
+        messages (pd.Series): A Pandas Series containing the text messages.
+        method (str): Any run_sentiment_analysis method.
+        method_options (dict): Keyword arguments for 'ensemble' / 'cascade' (e.g. {'combine': 'average'}).
+        fast_path (bool): Apply the trivial-message rule table; defaults to SENTIMENT_FAST_PATH_ENABLED.
+
+    Returns:
+        tuple: (labels, scores, score_columns) where labels is a pd.Series aligned with
+               messages.index, scores is a float32 np.ndarray of shape (len(messages), k) and
+               score_columns names its k columns. Pass scores to apply_sentiment_thresholds
+               to re-threshold without re-running the model. If the model cannot be loaded,
+               every label is 'unknown' and every score NaN.
+    """
+    start_time = time.time()
+    score_columns = SENTIMENT_SCORE_COLUMNS.get(method, [None])
+
+    # Exact-duplicate collapse: codes[i] is the position of message i in `uniques`
+    texts = messages.fillna('').astype(str).map(normalize_text)
+    codes, uniques = pd.factorize(texts)
+    unique_messages = pd.Series(uniques, dtype='object')
+
+    use_fast_path = SENTIMENT_FAST_PATH_ENABLED if fast_path is None else fast_path
+    if use_fast_path:
+        unique_rules, unique_labels = get_message_rules().classify_many(uniques)
+    else:
+        unique_rules = unique_labels = np.full(len(uniques), None, dtype=object)
+    unique_scores = rule_score_rows(unique_labels, method)
+    # A rule label the method cannot score (e.g. 'neutral' for two-class BERT) would not survive
+    # re-thresholding, so those messages get the method's own label instead (empty ones: 'unknown')
+    unscorable = ~pd.isna(unique_rules) & np.isnan(unique_scores).all(axis=1)
+    unique_rules[unscorable] = None
+    unique_labels[unscorable] = None
+    model_positions = np.flatnonzero(pd.isna(unique_rules)) # Messages no rule matched
+
+    if len(model_positions):
+        model_messages = unique_messages.iloc[model_positions].reset_index(drop=True)
+        model_sentiments, model_scores = _dispatch_sentiment_method(model_messages, method, return_scores=True,
+                                                                    method_options=method_options)
+        if len(model_sentiments) != len(model_messages) or (
+                (model_sentiments == 'unknown').all() and model_messages.str.strip().astype(bool).any()):
+            # Model failed to load: every row is 'unknown' (rule labels are not mixed in), so callers can tell
+            return (pd.Series('unknown', index=messages.index, dtype='object'),
+                    np.full((len(messages), len(score_columns)), np.nan, dtype=np.float32), score_columns)
+        unique_labels[model_positions] = model_sentiments.to_numpy()
+        unique_scores[model_positions] = np.asarray(model_scores, dtype=np.float32)
+
+    # Scatter labels and score rows back to every original row with a vectorized take
+    sentiments = pd.Series(unique_labels[codes], index=messages.index, dtype='object')
+    scores = unique_scores[codes]
+    rule_counts = {rule: int(count) for rule, count in pd.Series(unique_rules[codes]).value_counts().items()}
+
+    duration = time.time() - start_time
+    collapse_ratio = 1 - len(uniques) / len(messages) if len(messages) else 0.0
+    last_sentiment_run_stats.clear()
+    last_sentiment_run_stats.update({
+        'method': method,
+        'total_messages': len(messages),
+        'unique_messages': len(uniques),
+        'collapse_ratio': collapse_ratio,
+        'duration_seconds': duration,
+        'messages_per_second': len(messages) / duration if duration > 0 else float('inf'),
+        'rule_counts': rule_counts, # Rows labelled by each fast-path rule
+        'model_messages': len(model_positions), # Unique messages that reached the model
+    })
+    print(f"Sentiment analysis ({method}): {len(messages)} messages -> {len(uniques)} unique "
+          f"({collapse_ratio:.1%} duplicates collapsed) -> {len(model_positions)} sent to the model "
+          f"(fast path: {rule_counts or 'none'}) in {duration:.2f} seconds")
+    return sentiments, scores, score_columns
+
+def run_sentiment_analysis(messages: pd.Series, method: str = 'bert', method_options: dict = None) -> pd.Series:
+    """
+    Runs sentiment analysis using the specified method.
+
+    Args:
+        messages (pd.Series): A Pandas Series containing the text messages.
+        method (str): The sentiment analysis method to use.
+                      Options: 'textblob', 'bert', 'vader', 'custom_kick_bert',
+                      'custom_kick_bert_onnx', 'custom_kick_student', 'kick_tfidf', 'ensemble', 'cascade'.
+                      Defaults to 'bert'.
+        method_options (dict): Keyword arguments for 'ensemble' / 'cascade'.
+
+    Returns:
+        pd.Series: A Pandas Series containing sentiment labels.
+    """
+    sentiments, _, _ = run_sentiment_scores(messages, method=method, method_options=method_options)
+    return sentiments
+
+# --- Multi-Model Ensemble ---
+# Runs several methods over the same (already deduplicated) messages. The lexicon models are
+# pure Python and run in their own threads while the transformer models score their batches
+# in another, so their cost is hidden behind BERT (PyTorch releases the GIL inside its kernels).
+ENSEMBLE_MEMBERS = ('vader', 'textblob', 'bert', 'custom_kick_bert')
+ENSEMBLE_TRANSFORMER_MEMBERS = ('bert', 'custom_kick_bert', 'custom_kick_bert_onnx', 'custom_kick_student')
+ENSEMBLE_COMBINE = 'vote'  # 'vote' (weighted majority) or 'average' (weighted score averaging)
+ENSEMBLE_WEIGHTS = {}      # Optional per-member weights, e.g. {'custom_kick_bert': 2.0}; default 1.0
+ENSEMBLE_NEUTRAL_BAND = 0.05 # Averaged polarity within +/- this band is 'neutral'
+ENSEMBLE_AVERAGE_THRESHOLDS = (ENSEMBLE_NEUTRAL_BAND, -ENSEMBLE_NEUTRAL_BAND, True) # Same form as LEXICON_THRESHOLDS
+ENSEMBLE_VOTE_CLASSES = np.array(['neutral', 'positive', 'negative'], dtype=object) # argmax picks the first on ties
+
+# Score matrix: the combined score (vote margin or averaged polarity), the weighted vote share of
+# each class (NaN when combining by average), then one polarity column per member
+SENTIMENT_SCORE_COLUMNS['ensemble'] = (['score'] + [f"{label}_votes" for label in ENSEMBLE_VOTE_CLASSES]
+                                       + [f"{member}_polarity" for member in ENSEMBLE_MEMBERS])
+
+# Per-model latency and agreement of the most recent ensemble run
+last_ensemble_report = {}
+
+def sentiment_polarity(scores: np.ndarray, method: str) -> np.ndarray:
+    """Maps a method's score matrix to one polarity value per message in [-1, 1].
+
+    Lexicon methods use their raw score; probability methods use P(positive) - P(negative).
+    """
+    scores = np.asarray(scores, dtype=np.float32)
+    if method in LEXICON_THRESHOLDS or method == 'ensemble':
+        return scores[:, 0]
+    if method == 'cascade':
+        # The slow model's polarity where it answered, otherwise the fast model's
+        fast = sentiment_polarity(scores[:, :_CASCADE_FAST_WIDTH], CASCADE_FAST_METHOD)
+        slow = sentiment_polarity(scores[:, _CASCADE_FAST_WIDTH:], CASCADE_SLOW_METHOD)
+        return np.where(np.isnan(slow), fast, slow)
+    columns = SENTIMENT_SCORE_COLUMNS[method]
+    return scores[:, columns.index('positive')] - scores[:, columns.index('negative')]
+
+def _combine_votes(member_labels: dict, weights: dict) -> tuple:
+    """Weighted majority vote; ties and messages without votes go to 'neutral'.
+
+    Returns (labels, vote margin = weighted share of positive minus negative votes,
+    weighted vote share of each ENSEMBLE_VOTE_CLASSES class).
+    """
+    classes = ENSEMBLE_VOTE_CLASSES
+    n_messages = len(next(iter(member_labels.values())))
+    tally = np.zeros((n_messages, len(classes)), dtype=np.float32)
+    for member, labels in member_labels.items():
+        tally += weights[member] * (np.asarray(labels, dtype=object)[:, None] == classes[None, :])
+    total = tally.sum(axis=1)
+    shares = np.divide(tally, total[:, None], out=np.zeros_like(tally), where=total[:, None] > 0)
+    return classes[shares.argmax(axis=1)], shares[:, 1] - shares[:, 2], shares
+
+def _combine_average(member_polarity: dict, weights: dict) -> tuple:
+    """Weighted average of member polarities (members without a score for a message are skipped)."""
+    polarity = np.vstack(list(member_polarity.values()))
+    member_weights = np.array([weights[member] for member in member_polarity], dtype=np.float32)[:, None]
+    present = ~np.isnan(polarity)
+    weight_sum = (member_weights * present).sum(axis=0)
+    weighted = np.where(present, polarity, 0.0) * member_weights
+    averaged = np.divide(weighted.sum(axis=0), weight_sum, out=np.full(polarity.shape[1], np.nan, dtype=np.float32),
+                         where=weight_sum > 0).astype(np.float32)
+    return _threshold_polarity(averaged, ENSEMBLE_AVERAGE_THRESHOLDS), averaged
+
+def perform_ensemble_sentiment_analysis(messages: pd.Series, members=None, combine: str = None, weights: dict = None,
+                                        return_scores: bool = False):
+    """
+    Runs several sentiment models concurrently over the same messages and combines their outputs.
+
+    Args:
+        messages (pd.Series): A Pandas Series containing the text messages.
+        members: Methods to combine, defaults to ENSEMBLE_MEMBERS.
+        combine (str): 'vote' or 'average', defaults to ENSEMBLE_COMBINE.
+        weights (dict): Per-member weights, defaults to ENSEMBLE_WEIGHTS (missing members weigh 1.0).
+        return_scores (bool): Also return the score matrix: the combined score, the vote share of
+                              each class (NaN when averaging), then one polarity column per member
+                              (NaN for members that did not run).
+
+    Returns:
+        pd.Series: Combined sentiment labels (or a (labels, scores) tuple).
+        Per-member latency is stored in `last_ensemble_report`.
+    """
+    members = tuple(members or ENSEMBLE_MEMBERS)
+    combine = combine or ENSEMBLE_COMBINE
+    weights = {member: float((weights or ENSEMBLE_WEIGHTS).get(member, 1.0)) for member in members}
+    latencies = {}
+
+    def run_member(member):
+        member_start = time.time()
+        labels, scores = _dispatch_sentiment_method(messages, member, return_scores=True)
+        latencies[member] = time.time() - member_start
+        return member, labels, scores
+
+    def run_transformers(transformer_members):
+        # Transformer models share the CPU cores, so they run one after another
+        return [run_member(member) for member in transformer_members]
+
+    start_time = time.time()
+    lexicon_members = [member for member in members if member not in ENSEMBLE_TRANSFORMER_MEMBERS]
+    transformer_members = [member for member in members if member in ENSEMBLE_TRANSFORMER_MEMBERS]
+    with ThreadPoolExecutor(max_workers=len(lexicon_members) + 1) as executor:
+        futures = [executor.submit(run_member, member) for member in lexicon_members]
+        transformer_future = executor.submit(run_transformers, transformer_members) if transformer_members else None
+        results = [future.result() for future in futures]
+        if transformer_future is not None:
+            results.extend(transformer_future.result())
+    results.sort(key=lambda result: members.index(result[0]))
+
+    member_labels, member_polarity, excluded = {}, {}, []
+    for member, labels, scores in results:
+        # A model that failed to load returns an empty or all-'unknown' result and does not vote
+        if len(labels) != len(messages) or (len(labels) and (labels == 'unknown').all()):
+            excluded.append(member)
+            continue
+        member_labels[member] = labels.to_numpy()
+        member_polarity[member] = sentiment_polarity(scores, member)
+
+    if not member_labels:
+        report_error("No ensemble member could produce sentiment results.")
+        return _fallback_result(messages, 'unknown', 'ensemble', return_scores)
+
+    vote_shares = None
+    if combine == 'average':
+        combined_labels, combined_score = _combine_average(member_polarity, weights)
+    else:
+        combined_labels, combined_score, vote_shares = _combine_votes(member_labels, weights)
+
+    sentiments = pd.Series(combined_labels, index=messages.index, dtype='object')
+    agreement = {member: float((labels == combined_labels).mean()) if len(labels) else 0.0
+                 for member, labels in member_labels.items()}
+    last_ensemble_report.clear()
+    last_ensemble_report.update({
+        'combine': combine,
+        'messages': len(messages),
+        'members': list(member_labels),
+        'excluded': excluded,
+        'latency_seconds': latencies,
+        'wall_clock_seconds': time.time() - start_time,
+        'agreement_with_ensemble': agreement,
+    })
+    print(f"Ensemble ({combine}) latency per model: "
+          + ", ".join(f"{member}={seconds:.2f}s" for member, seconds in latencies.items())
+          + f" | wall clock {last_ensemble_report['wall_clock_seconds']:.2f}s"
+          + (f" | excluded: {', '.join(excluded)}" if excluded else ""))
+    if not return_scores:
+        return sentiments
+
+    ensemble_members = [column[:-len('_polarity')] for column in SENTIMENT_SCORE_COLUMNS['ensemble'] if column.endswith('_polarity')]
+    first_member = 1 + len(ENSEMBLE_VOTE_CLASSES)
+    scores = np.full((len(messages), first_member + len(ensemble_members)), np.nan, dtype=np.float32)
+    scores[:, 0] = combined_score
+    if vote_shares is not None:
+        scores[:, 1:first_member] = vote_shares
+    for position, member in enumerate(ensemble_members, start=first_member):
+        if member in member_polarity:
+            scores[:, position] = member_polarity[member]
+    return sentiments, scores
+
+# --- Confidence-Gated Cascade ---
+# Most chat lines are easy, so a fast Turkish classifier scores everything and only messages it
+# is unsure about (top class probability below CASCADE_MIN_CONFIDENCE) are escalated to the
+# custom Kick BERT. On data/labeled_data (grouped cross-validation) the default escalates ~25% of
+# messages, and the kept 75% are labelled with 0.71 accuracy.
+CASCADE_FAST_METHOD = 'kick_tfidf'
+CASCADE_SLOW_METHOD = 'custom_kick_bert'
+CASCADE_MIN_CONFIDENCE = float(os.environ.get("KICK_CASCADE_MIN_CONFIDENCE", "0.6"))
+
+# Score matrix: the fast model's probabilities, then the slow model's (NaN unless escalated)
+SENTIMENT_SCORE_COLUMNS['cascade'] = ([f"fast_{column}" for column in SENTIMENT_SCORE_COLUMNS[CASCADE_FAST_METHOD]]
+                                      + SENTIMENT_SCORE_COLUMNS[CASCADE_SLOW_METHOD])
+_CASCADE_FAST_WIDTH = len(SENTIMENT_SCORE_COLUMNS[CASCADE_FAST_METHOD])
+
+# Escalation rate and timings of the most recent cascade run
+last_cascade_report = {}
+
+def cascade_escalation_mask(fast_probabilities: np.ndarray, min_confidence: float = None) -> np.ndarray:
+    """True for messages whose top fast-model probability is below `min_confidence` (or missing)."""
+    min_confidence = CASCADE_MIN_CONFIDENCE if min_confidence is None else min_confidence
+    fast_probabilities = np.asarray(fast_probabilities, dtype=np.float32)
+    missing = np.isnan(fast_probabilities).all(axis=1)
+    return missing | (np.nan_to_num(fast_probabilities, nan=0.0).max(axis=1) < min_confidence)
+
+def perform_cascade_sentiment_analysis(messages: pd.Series, fast_method: str = None, slow_method: str = None,
+                                       min_confidence: float = None, return_scores: bool = False):
+    """
+    Scores all messages with a fast model and re-scores only the uncertain ones with a slow model.
+
+    Args:
+        messages (pd.Series): A Pandas Series containing the text messages.
+        fast_method (str): Model used for every message, defaults to CASCADE_FAST_METHOD.
+        slow_method (str): Model used for escalated messages, defaults to CASCADE_SLOW_METHOD.
+                           Both must score the three Kick classes (negative, neutral, positive).
+        min_confidence (float): Messages whose top fast-model probability is below this value
+                                are escalated, defaults to CASCADE_MIN_CONFIDENCE.
+        return_scores (bool): Also return the score matrix (the fast model's probabilities
+                              followed by the slow model's, NaN for messages that were not escalated).
+
+    Returns:
+        pd.Series: Sentiment labels (or a (labels, scores) tuple). The escalation rate is
+        stored in `last_cascade_report`; if the slow model cannot be loaded the fast labels are kept.
+    """
+    fast_method = fast_method or CASCADE_FAST_METHOD
+    slow_method = slow_method or CASCADE_SLOW_METHOD
+    min_confidence = CASCADE_MIN_CONFIDENCE if min_confidence is None else float(min_confidence)
+    for role, chosen, default in (('fast_method', fast_method, CASCADE_FAST_METHOD), ('slow_method', slow_method, CASCADE_SLOW_METHOD)):
+        if SENTIMENT_SCORE_COLUMNS.get(chosen) != SENTIMENT_SCORE_COLUMNS[default]:
+            raise ValueError(f"Cascade {role} must score {SENTIMENT_SCORE_COLUMNS[default]} like {default!r}; got {chosen!r}.")
+
+    start_time = time.time()
+    fast_labels, fast_scores = _dispatch_sentiment_method(messages, fast_method, return_scores=True)
+    fast_seconds = time.time() - start_time
+    # If the fast model cannot be loaded its scores are all NaN and every message is escalated
+    escalate = cascade_escalation_mask(fast_scores, min_confidence)
+
+    labels = fast_labels.to_numpy().copy()
+    slow_columns = SENTIMENT_SCORE_COLUMNS[slow_method]
+    slow_scores = np.full((len(messages), len(slow_columns)), np.nan, dtype=np.float32)
+    slow_seconds, slow_failed = 0.0, False
+    if escalate.any():
+        slow_start = time.time()
+        escalated_labels, escalated_scores = _dispatch_sentiment_method(messages[escalate], slow_method, return_scores=True)
+        slow_seconds = time.time() - slow_start
+        slow_failed = bool(len(escalated_labels) != int(escalate.sum()) or (escalated_labels == 'unknown').all())
+        if not slow_failed:
+            escalated_labels = escalated_labels.to_numpy()
+            answered = escalated_labels != 'unknown' # Empty messages keep the fast label
+            labels[np.flatnonzero(escalate)[answered]] = escalated_labels[answered]
+            slow_scores[escalate] = escalated_scores
+        else:
+            report_warning(f"Cascade: {slow_method} could not score the uncertain messages; keeping {fast_method} labels.")
+
+    escalation_rate = float(escalate.mean()) if len(messages) else 0.0
+    last_cascade_report.clear()
+    last_cascade_report.update({
+        'fast_method': fast_method,
+        'slow_method': slow_method,
+        'min_confidence': min_confidence,
+        'messages': len(messages),
+        'escalated': int(escalate.sum()),
+        'escalation_rate': escalation_rate,
+        'slow_model_failed': slow_failed,
+        'fast_seconds': fast_seconds,
+        'slow_seconds': slow_seconds,
+    })
+    print(f"Cascade: {int(escalate.sum())}/{len(messages)} messages ({escalation_rate:.1%}) escalated to {slow_method} "
+          f"(min confidence {min_confidence:.2f}); {fast_method} {fast_seconds:.2f}s, {slow_method} {slow_seconds:.2f}s")
+
+    sentiments = pd.Series(labels, index=messages.index, dtype='object')
+    if not return_scores:
+        return sentiments
+    return sentiments, np.column_stack([fast_scores, slow_scores]).astype(np.float32)
+
+def sentiment_method_models(method: str, method_options: dict = None) -> list:
+    """Model registry names that `method` loads (none for the lexicon methods), e.g. to warm them up."""
+    method_options = method_options or {}
+    if method == 'ensemble':
+        methods = method_options.get('members') or ENSEMBLE_MEMBERS
+    elif method == 'cascade':
+        methods = (method_options.get('fast_method') or CASCADE_FAST_METHOD, method_options.get('slow_method') or CASCADE_SLOW_METHOD)
+    else:
+        methods = (method,)
+    return [name for name in methods if name in model_registry]
+
+# --- Chunked Streaming Sentiment API ---
+# Scores arbitrarily large chat exports chunk by chunk, so memory stays bounded by the chunk size.
+STREAM_CHUNK_SIZE = 50000
+TEXT_COLUMN_CANDIDATES = ('message', 'content') # Same preference order as main.py
+
+def _detect_text_column(frame: pd.DataFrame) -> str:
+    for column in TEXT_COLUMN_CANDIDATES:
+        if column in frame.columns:
+            return column
+    raise ValueError(f"No text column found; expected one of {TEXT_COLUMN_CANDIDATES}, got {frame.columns.tolist()}.")
+
+def _source_size_bytes(source):
+    """Total size of a CSV path or file-like object, or None if it cannot be determined."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    size = getattr(source, 'size', None) # Streamlit UploadedFile
+    if size is None and hasattr(source, 'seek') and hasattr(source, 'tell'):
+        position = source.tell()
+        source.seek(0, os.SEEK_END)
+        size = source.tell()
+        source.seek(position)
+    return size
+
+def _iter_source_chunks(source, chunksize: int, usecols):
+    """Yields (DataFrame chunk, fraction of the source consumed or None)."""
+    if isinstance(source, (str, os.PathLike)) or hasattr(source, 'read'):
+        total_bytes = _source_size_bytes(source)
+        handle = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+        try:
+            for chunk in pd.read_csv(handle, chunksize=chunksize, usecols=usecols, encoding='utf-8-sig'):
+                fraction = min(handle.tell() / total_bytes, 1.0) if total_bytes else None
+                yield chunk, fraction
+        finally:
+            if handle is not source:
+                handle.close()
+        return
+
+    if isinstance(source, (pd.DataFrame, pd.Series)):
+        # An in-memory frame or Series is sliced into chunks of `chunksize` rows
+        source = [source.iloc[start:start + chunksize] for start in range(0, len(source), chunksize)]
+
+    total_chunks = len(source) if hasattr(source, '__len__') else None
+    for chunk_number, chunk in enumerate(source, start=1):
+        if isinstance(chunk, pd.DataFrame):
+            frame = chunk.copy() # Do not mutate the caller's frame
+        else:
+            frame = pd.DataFrame({'message': chunk if isinstance(chunk, pd.Series) else pd.Series(list(chunk), dtype='object')})
+        yield frame, (chunk_number / total_chunks if total_chunks else None)
+
+def _merge_method_report(total: dict, report: dict) -> None:
+    """Adds one chunk's ensemble or cascade report into `total` (counts and timings are summed)."""
+    if not report:
+        return
+    if not total:
+        total.update({key: (dict(value) if isinstance(value, dict) else list(value) if isinstance(value, list) else value)
+                      for key, value in report.items()})
+        return
+    previous_messages, messages = total.get('messages', 0), report.get('messages', 0)
+    for key in ('messages', 'escalated', 'fast_seconds', 'slow_seconds', 'wall_clock_seconds'):
+        if key in report:
+            total[key] = total.get(key, 0) + report[key]
+    if 'escalated' in total:
+        total['escalation_rate'] = total['escalated'] / total['messages'] if total['messages'] else 0.0
+        total['slow_model_failed'] = total['slow_model_failed'] or report['slow_model_failed']
+    if 'latency_seconds' in report:
+        for member, seconds in report['latency_seconds'].items():
+            total['latency_seconds'][member] = total['latency_seconds'].get(member, 0.0) + seconds
+        total['excluded'] = sorted(set(total['excluded']) | set(report['excluded']))
+        total['members'] = [member for member in dict.fromkeys(total['members'] + report['members'])
+                            if member not in total['excluded']]
+        # Agreement is weighted by the number of messages each chunk sent to the ensemble
+        agreement = total['agreement_with_ensemble']
+        for member, share in report['agreement_with_ensemble'].items():
+            agreement[member] = ((agreement.get(member, 0.0) * previous_messages + share * messages)
+                                 / (previous_messages + messages) if previous_messages + messages else 0.0)
+
+def iter_sentiment_analysis(source, method: str = 'bert', chunksize: int = STREAM_CHUNK_SIZE,
+                            progress_callback=None, text_column: str = None, usecols=None,
+                            sentiment_column: str = 'sentiment', include_scores: bool = False,
+                            method_options: dict = None):
+    """
+    Generator variant of run_sentiment_analysis that scores a message stream chunk by chunk.
+
+    Args:
+        source: A CSV path or file-like object (read with pandas `chunksize`), an in-memory
+                DataFrame/Series, or an iterable of message chunks (pd.Series, lists of strings,
+                or DataFrames with a text column).
+        method (str): Any run_sentiment_analysis method.
+        chunksize (int): Rows per chunk when reading a CSV or slicing a DataFrame/Series.
+        progress_callback: Optional callable(rows_done, fraction) called after every chunk;
+                           fraction is in [0, 1], or None when the total size is unknown.
+        text_column (str): Column holding the chat text; defaults to 'message', then 'content'.
+        usecols: Columns to read from a CSV (keeps memory down for wide exports).
+        sentiment_column (str): Name of the column added to every yielded chunk.
+        include_scores (bool): Also add float32 score columns named '<sentiment_column>_<score column>'.
+        method_options (dict): Keyword arguments for 'ensemble' / 'cascade'.
+
+    Yields:
+        pd.DataFrame: Each chunk with the sentiment labels added as `sentiment_column`.
+        Once the stream is exhausted, `last_sentiment_run_stats` and the ensemble/cascade
+        reports hold totals for the whole stream.
+    """
+    start_time = time.time()
+    rows_done = 0
+    unique_total = 0
+    model_total = 0
+    rule_totals = {}
+    ensemble_total, cascade_total = {}, {}
+    chunk_count = 0
+    for frame, fraction in _iter_source_chunks(source, chunksize, usecols):
+        column = text_column or _detect_text_column(frame)
+        # Chunks answered entirely by the rule table do not run the model, so clear the last reports
+        last_ensemble_report.clear()
+        last_cascade_report.clear()
+        labels, scores, score_columns = run_sentiment_scores(frame[column], method=method, method_options=method_options)
+        _merge_method_report(ensemble_total, last_ensemble_report)
+        _merge_method_report(cascade_total, last_cascade_report)
+        # A model that failed to load labels the whole chunk 'unknown'
+        frame[sentiment_column] = labels.reindex(frame.index).fillna('unknown')
+        if include_scores:
+            for position, score_column in enumerate(score_columns):
+                values = scores[:, position] if len(scores) == len(frame) else np.nan
+                frame[f"{sentiment_column}_{score_column}"] = np.asarray(values, dtype=np.float32)
+        rows_done += len(frame)
+        unique_total += last_sentiment_run_stats.get('unique_messages', len(frame))
+        model_total += last_sentiment_run_stats.get('model_messages', 0)
+        for rule, count in last_sentiment_run_stats.get('rule_counts', {}).items():
+            rule_totals[rule] = rule_totals.get(rule, 0) + count
+        chunk_count += 1
+        if progress_callback is not None:
+            progress_callback(rows_done, fraction)
+        yield frame
+
+    # Replace the per-chunk statistics with totals for the whole stream
+    duration = time.time() - start_time
+    last_sentiment_run_stats.clear()
+    last_sentiment_run_stats.update({
+        'method': method,
+        'total_messages': rows_done,
+        'unique_messages': unique_total,
+        'collapse_ratio': 1 - unique_total / rows_done if rows_done else 0.0,
+        'duration_seconds': duration,
+        'messages_per_second': rows_done / duration if duration > 0 else float('inf'),
+        'chunks': chunk_count,
+        'rule_counts': rule_totals,
+        'model_messages': model_total,
+    })
+    # Ensemble and cascade reports also cover the whole stream, not just its last chunk
+    last_ensemble_report.clear()
+    last_ensemble_report.update(ensemble_total)
+    last_cascade_report.clear()
+    last_cascade_report.update(cascade_total)
+    print(f"Streamed sentiment analysis ({method}): {rows_done} messages in {chunk_count} chunks, {duration:.2f} seconds")
+
+# Topic modeling and suggestions run on a uniform sample of the streamed rows, so they stay
+# bounded too; below this many rows the sample is the whole stream.
+TOPIC_SAMPLE_ROWS = int(os.environ.get("KICK_TOPIC_SAMPLE_ROWS", "200000"))
+
+class ChunkReservoir:
+    """Uniform random sample of at most `capacity` rows from a stream of DataFrame chunks.
+
+    Reservoir sampling (Algorithm R), one vectorized step per chunk. The sample is returned in
+    stream order, and the fixed seed makes the same stream give the same sample (and so the
+    same topic cache key).
+    """
+
+    def __init__(self, capacity: int = TOPIC_SAMPLE_ROWS, columns=None, random_state: int = 100):
+        self.capacity = capacity
+        self.columns = columns
+        self.rows_seen = 0
+        self._rng = np.random.default_rng(random_state)
+        self._positions = np.empty(0, dtype=np.int64)
+        self._parts = []   # Chunks while the reservoir is still filling
+        self._sample = None
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        """Offers every row of `chunk` to the sample."""
+        if self.columns is not None:
+            chunk = chunk[self.columns]
+        chunk = chunk.reset_index(drop=True)
+        positions = np.arange(self.rows_seen, self.rows_seen + len(chunk), dtype=np.int64)
+        self.rows_seen += len(chunk)
+        free = self.capacity - len(self._positions)
+        if free > 0:
+            # Filling: keep the first rows as they are
+            self._parts.append(chunk.iloc[:free])
+            self._positions = np.concatenate([self._positions, positions[:free]])
+            chunk, positions = chunk.iloc[free:].reset_index(drop=True), positions[free:]
+        if chunk.empty:
+            return
+        if self._sample is None:
+            self._sample = pd.concat(self._parts, ignore_index=True)
+            self._parts = []
+        # Row t (0-based) replaces a random slot with probability capacity / (t + 1)
+        slots = (self._rng.random(len(chunk)) * (positions + 1)).astype(np.int64)
+        replacing = np.flatnonzero(slots < self.capacity)
+        # When two rows of this chunk pick the same slot, the later one wins, as in the sequential algorithm
+        last_per_slot = len(replacing) - 1 - np.unique(slots[replacing][::-1], return_index=True)[1]
+        replacing = replacing[last_per_slot]
+        self._sample.iloc[slots[replacing]] = chunk.iloc[replacing].to_numpy()
+        self._positions[slots[replacing]] = positions[replacing]
+
+    def frame(self) -> pd.DataFrame:
+        """The sampled rows in stream order."""
+        sample = self._sample if self._sample is not None else (
+            pd.concat(self._parts, ignore_index=True) if self._parts else pd.DataFrame(columns=self.columns))
+        order = np.argsort(self._positions, kind='stable')
+        return sample.iloc[order].reset_index(drop=True)
+
+# --- Accuracy Check Against Labeled Data ---
+LABELED_DATA_DIR = os.path.join("data", "labeled_data")
+
+def load_labeled_data(labeled_dir: str = LABELED_DATA_DIR) -> pd.DataFrame:
+    """Loads every labeled CSV into one DataFrame with 'message', 'label' and 'source' columns.
+
+    Files may use either a 'message' or a 'content' column for the chat text (as in train_model.py).
+    """
+    frames = []
+    for file_path in sorted(glob.glob(os.path.join(labeled_dir, "*.csv"))):
+        labeled_df = pd.read_csv(file_path)
+        text_column = 'message' if 'message' in labeled_df.columns else 'content'
+        if text_column not in labeled_df.columns or 'label' not in labeled_df.columns:
+            print(f"Warning: Skipping {file_path}, expected ('message' or 'content') and 'label' columns.")
+            continue
+        frame = labeled_df[[text_column, 'label']].rename(columns={text_column: 'message'})
+        frame['source'] = os.path.basename(file_path)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=['message', 'label', 'source'])
+    return pd.concat(frames, ignore_index=True)
+
+KICK_TFIDF_CV_FOLDS = 5
+
+def kick_tfidf_out_of_fold_scores(labeled_df: pd.DataFrame, folds: int = KICK_TFIDF_CV_FOLDS) -> np.ndarray:
+    """Class probabilities of the TF-IDF classifier for labeled messages it was not trained on.
+
+    Grouped k-fold: every repeat of a (normalized) message lands in the same fold, so a message
+    is never scored by a model that saw it. Columns follow SENTIMENT_SCORE_COLUMNS['kick_tfidf'].
+    """
+    columns = SENTIMENT_SCORE_COLUMNS['kick_tfidf']
+    messages = labeled_df['message'].fillna('').astype(str)
+    texts = np.asarray([normalize_text(message).lower() for message in messages], dtype=object)
+    groups = pd.factorize(texts)[0]
+    scores = np.full((len(labeled_df), len(columns)), np.nan, dtype=np.float32)
+    for train, test in GroupKFold(n_splits=min(folds, groups.max() + 1)).split(texts, groups=groups):
+        model = fit_kick_tfidf_model(messages.iloc[train], labeled_df['label'].iloc[train])
+        order = [list(model.classes_).index(column) for column in columns]
+        scores[test] = model.predict_proba(list(texts[test]))[:, order]
+    scores[(messages.str.strip() == '').to_numpy()] = np.nan # Empty messages are 'unknown', as in the scorer
+    return scores
+
+def _labeled_method_scores(labeled_df: pd.DataFrame, method: str) -> tuple:
+    """(labels, scores) of `method` on labeled messages; out-of-fold for kick_tfidf, which is trained on them."""
+    if method == 'kick_tfidf':
+        scores = kick_tfidf_out_of_fold_scores(labeled_df)
+        return apply_sentiment_thresholds(scores, method), scores
+    labels, scores, _ = run_sentiment_scores(labeled_df['message'], method=method)
+    return labels.to_numpy(), scores
+
+def _labeled_cascade_predictions(labeled_df: pd.DataFrame, method_options: dict = None) -> tuple:
+    """Cascade labels on labeled messages with out-of-fold fast scores; returns (labels, escalation rate)."""
+    method_options = method_options or {}
+    slow_method = method_options.get('slow_method') or CASCADE_SLOW_METHOD
+    labels, fast_scores = _labeled_method_scores(labeled_df, method_options.get('fast_method') or CASCADE_FAST_METHOD)
+    escalate = cascade_escalation_mask(fast_scores, method_options.get('min_confidence'))
+    if escalate.any():
+        slow_labels = run_sentiment_analysis(labeled_df['message'][escalate], method=slow_method).to_numpy()
+        if len(slow_labels) == int(escalate.sum()) and not (slow_labels == 'unknown').all():
+            answered = slow_labels != 'unknown' # Empty messages keep the fast label
+            labels[np.flatnonzero(escalate)[answered]] = slow_labels[answered]
+        else:
+            report_warning(f"Cascade evaluation: {slow_method} could not be loaded; keeping the fast labels.")
+    return labels, float(escalate.mean())
+
+def evaluate_sentiment_method(method: str, labeled_dir: str = LABELED_DATA_DIR, method_options: dict = None) -> dict:
+    """Runs `method` over data/labeled_data and reports accuracy (overall and per file) and duration.
+
+    Note: the custom Kick models were trained on this data, so their accuracy here is optimistic;
+    it is still the right yardstick for comparing backends of the same model (e.g. fp32 vs int8).
+    kick_tfidf (alone or as the cascade's fast model) is retrained here and scored out-of-fold,
+    so its accuracy and the cascade's escalation rate are not in-sample.
+    """
+    labeled_df = load_labeled_data(labeled_dir)
+    if labeled_df.empty:
+        print(f"Warning: No labeled data found in {os.path.abspath(labeled_dir)}.")
+        return {'method': method, 'accuracy': None, 'per_file': {}, 'duration_seconds': 0, 'messages': 0}
+
+    start_time = time.time()
+    escalation_rate = None
+    if method == 'kick_tfidf':
+        predictions = pd.Series(_labeled_method_scores(labeled_df, method)[0])
+    elif method == 'cascade':
+        labels, escalation_rate = _labeled_cascade_predictions(labeled_df, method_options)
+        predictions = pd.Series(labels)
+    else:
+        predictions = run_sentiment_analysis(labeled_df['message'], method=method, method_options=method_options)
+    duration = time.time() - start_time
+    if len(predictions) != len(labeled_df) or (predictions == 'unknown').all():
+        return {'method': method, 'accuracy': None, 'per_file': {}, 'duration_seconds': duration, 'messages': len(labeled_df)}
+
+    correct = predictions.to_numpy() == labeled_df['label'].to_numpy()
+    per_file = pd.Series(correct).groupby(labeled_df['source']).mean().to_dict()
+    report = {
+        'method': method,
+        'accuracy': float(correct.mean()),
+        'per_file': {source: float(accuracy) for source, accuracy in per_file.items()},
+        'duration_seconds': duration,
+        'messages': len(labeled_df),
+    }
+    if method == 'cascade':
+        # Share of labeled messages that needed the slow model
+        report['escalation_rate'] = escalation_rate
+    print(f"Accuracy of '{method}' on {len(labeled_df)} labeled messages: {report['accuracy']:.4f} ({duration:.2f} seconds)")
+    return report
+
+def tune_cascade_confidence(min_confidences, fast_method: str = None, slow_method: str = None,
+                            labeled_dir: str = LABELED_DATA_DIR) -> list:
+    """Accuracy and escalation rate on data/labeled_data for each candidate minimum confidence.
+
+    Both models score the labeled messages once; every threshold is then simulated from those
+    scores. kick_tfidf is trained on this same data, so as the fast model it is scored
+    out-of-fold (in-sample it is overconfident and would escalate too little). The slow custom
+    Kick model was trained on it too, so the accuracy is still an upper bound.
+
+    Returns:
+        list[dict]: One {'min_confidence', 'accuracy', 'escalation_rate'} entry per threshold.
+    """
+    fast_method = fast_method or CASCADE_FAST_METHOD
+    slow_method = slow_method or CASCADE_SLOW_METHOD
+    labeled_df = load_labeled_data(labeled_dir)
+    if labeled_df.empty:
+        print(f"Warning: No labeled data found in {os.path.abspath(labeled_dir)}.")
+        return []
+
+    slow_labels = run_sentiment_analysis(labeled_df['message'], method=slow_method)
+    if len(slow_labels) != len(labeled_df) or (slow_labels == 'unknown').all():
+        report_warning(f"Cascade tuning: {slow_method} could not be loaded.")
+        return []
+    fast_labels, fast_scores = _labeled_method_scores(labeled_df, fast_method)
+    truth = labeled_df['label'].to_numpy()
+
+    results = []
+    for min_confidence in min_confidences:
+        escalate = cascade_escalation_mask(fast_scores, min_confidence) & (slow_labels.to_numpy() != 'unknown')
+        labels = np.where(escalate, slow_labels.to_numpy(), fast_labels)
+        results.append({'min_confidence': float(min_confidence), 'accuracy': float((labels == truth).mean()),
+                        'escalation_rate': float(escalate.mean())})
+        print(f"Cascade min confidence {min_confidence:.2f}: accuracy {results[-1]['accuracy']:.4f}, "
+              f"escalation rate {results[-1]['escalation_rate']:.1%}")
+    return results
+
+# --- Topic Coherence ---
+# Full c_v slides a window over every document and often takes as long as training the LDA
+# itself. perform_topic_modeling can instead report u_mass (document co-occurrence counts, fast),
+# c_v averaged over random document samples with a confidence interval, or full c_v computed in
+# a background process while the topics are returned immediately.
+COHERENCE_MODES = ('c_v', 'u_mass', 'c_v_sampled', 'c_v_background')
+DEFAULT_COHERENCE_MODE = os.environ.get("KICK_COHERENCE_MODE", "c_v")
+COHERENCE_TOPN = 20            # Top words per topic that are scored (CoherenceModel's default)
+COHERENCE_SAMPLE_SIZE = 5000   # Documents per c_v sample
+COHERENCE_SAMPLE_REPEATS = 3   # Independent samples behind the confidence interval
+COHERENCE_CONFIDENCE_Z = 1.96  # 95% normal interval
+
+# Mode, score, confidence interval and timing of the most recent perform_topic_modeling run;
+# in 'c_v_background' mode 'future' resolves to the full c_v score
+last_coherence_report = {}
+
+_coherence_executor = None
+_coherence_executor_lock = threading.Lock()
+
+def topic_word_lists(lda_model, topn: int = COHERENCE_TOPN) -> list:
+    """Top `topn` words of every topic (what CoherenceModel scores for a model)."""
+    return [[word for word, _ in lda_model.show_topic(i, topn=topn)] for i in range(lda_model.num_topics)]
+
+def compute_coherence(topics: list, texts: list, dictionary, coherence: str = 'c_v', processes: int = -1,
+                      corpus=None) -> float:
+    """Coherence of topic word lists over tokenized `texts` with gensim's CoherenceModel.
+    u_mass only needs document frequencies, so it reads `corpus` (any BoW corpus) when given."""
+    if coherence == 'u_mass' and corpus is not None:
+        return CoherenceModel(topics=topics, corpus=corpus, dictionary=dictionary, coherence=coherence).get_coherence()
+    return CoherenceModel(topics=topics, texts=texts, dictionary=dictionary, coherence=coherence,
+                          processes=processes).get_coherence()
+
+def sampled_coherence(topics: list, texts: list, dictionary, sample_size: int = COHERENCE_SAMPLE_SIZE,
+                      repeats: int = COHERENCE_SAMPLE_REPEATS, seed: int = 100) -> tuple:
+    """c_v averaged over `repeats` random samples of `sample_size` documents.
+    Returns: (mean score, (ci_low, ci_high)); small inputs are scored in full with a zero-width interval.
+    """
+    if len(texts) <= sample_size:
+        score = compute_coherence(topics, texts, dictionary)
+        return score, (score, score)
+    rng = np.random.default_rng(seed)
+    scores = [compute_coherence(topics, [texts[i] for i in rng.choice(len(texts), size=sample_size, replace=False)], dictionary)
+              for _ in range(repeats)]
+    mean = float(np.mean(scores))
+    half_width = COHERENCE_CONFIDENCE_Z * float(np.std(scores, ddof=1)) / np.sqrt(repeats) if repeats > 1 else 0.0
+    return mean, (float(mean - half_width), float(mean + half_width))
+
+def start_background_coherence(topics: list, texts: list, dictionary, coherence: str = 'c_v'):
+    """Submits compute_coherence to a long-lived background process; returns its Future."""
+    global _coherence_executor
+    with _coherence_executor_lock:
+        if _coherence_executor is None:
+            _coherence_executor = ProcessPoolExecutor(max_workers=1, mp_context=PROCESS_POOL_CONTEXT)
+    return _coherence_executor.submit(compute_coherence, topics, texts, dictionary, coherence)
+
+def _score_topic_coherence(lda_model, processed_docs: list, dictionary, mode: str, corpus=None) -> tuple:
+    """Scores a trained model's coherence in `mode`; returns (score or None, report dict)."""
+    start_time = time.time()
+    topics = topic_word_lists(lda_model)
+    report = {'mode': mode, 'score': None, 'ci': None, 'documents': len(processed_docs), 'future': None}
+    if mode == 'c_v_background':
+        report['future'] = start_background_coherence(topics, processed_docs, dictionary)
+        print("Coherence Score (c_v): computing in a background process.")
+    elif mode == 'c_v_sampled':
+        report['score'], report['ci'] = sampled_coherence(topics, processed_docs, dictionary)
+        report['documents'] = min(len(processed_docs), COHERENCE_SAMPLE_SIZE)
+        print(f"Coherence Score (c_v, sampled): {report['score']:.4f} "
+              f"(95% CI {report['ci'][0]:.4f} - {report['ci'][1]:.4f})")
+    else:
+        report['score'] = compute_coherence(topics, processed_docs, dictionary, coherence=mode, corpus=corpus)
+        print(f"Coherence Score ({mode}): {report['score']}")
+    report['seconds'] = time.time() - start_time
+    return report['score'], report
+
+# --- Topic Corpus ---
+# A list of (id, count) tuple lists costs tens of bytes per token in small Python objects, which
+# adds up to hundreds of megabytes or more for a million chat messages. The corpus is instead kept
+# as a documents x terms SciPy CSR matrix (8 bytes per distinct token per document) and streamed
+# to LDA and u_mass coherence through gensim's Sparse2Corpus, one document's BoW at a time.
+# 'mm' serializes the matrix to a Matrix Market file and streams it from disk (MmCorpus);
+# 'list' is the original layout.
+TOPIC_CORPUS_FORMATS = ('csr', 'mm', 'list')
+TOPIC_CORPUS_FORMAT = os.environ.get("KICK_TOPIC_CORPUS_FORMAT", "csr")
+
+def build_bow_matrix(processed_docs: list, dictionary):
+    """Documents x terms CSR count matrix of token lists; tokens missing from `dictionary` are skipped."""
+    token2id = dictionary.token2id
+    lengths = np.fromiter((len(doc) for doc in processed_docs), dtype=np.int64, count=len(processed_docs))
+    # Flat id/row arrays (4 bytes per token) instead of per-document Python lists
+    ids = np.fromiter((token2id.get(token, -1) for doc in processed_docs for token in doc), dtype=np.int32,
+                      count=int(lengths.sum()))
+    rows = np.repeat(np.arange(len(processed_docs), dtype=np.int32), lengths)
+    known = ids >= 0
+    # COO -> CSR sums repeated (document, token) pairs into counts, with ids sorted like doc2bow
+    return scipy_sparse.coo_matrix((np.ones(int(known.sum()), dtype=np.float32), (rows[known], ids[known])),
+                                   shape=(len(processed_docs), len(dictionary))).tocsr()
+
+def build_topic_corpus(processed_docs: list, dictionary, corpus_format: str = None):
+    """BoW corpus for LDA in `corpus_format` (default TOPIC_CORPUS_FORMAT).
+    Returns: (corpus, path of the temporary Matrix Market file or None) - delete the file when done.
+    """
+    corpus_format = corpus_format or TOPIC_CORPUS_FORMAT
+    if corpus_format not in TOPIC_CORPUS_FORMATS:
+        raise ValueError(f"Unknown topic corpus format {corpus_format!r}; expected one of {', '.join(TOPIC_CORPUS_FORMATS)}.")
+    if corpus_format == 'list':
+        return [dictionary.doc2bow(doc) for doc in processed_docs], None
+    corpus = Sparse2Corpus(build_bow_matrix(processed_docs, dictionary), documents_columns=False)
+    if corpus_format == 'csr':
+        return corpus, None
+    fd, path = tempfile.mkstemp(suffix=".mm", prefix="kick-topics-")
+    os.close(fd)
+    MmCorpus.serialize(path, corpus, id2word=dictionary)
+    return MmCorpus(path), path
+
+def _remove_corpus_file(path: str):
+    if path is None:
+        return
+    for name in (path, f"{path}.index"):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+# --- Topic Vocabulary Reduction ---
+# preprocess_text lemmatizes with the English WordNet lemmatizer, so Turkish inflections
+# ("oyun", "oyunu", "oyunda") stay separate terms, and the Dictionary was never pruned. Before LDA
+# the token lists go through a vocabulary stage:
+#   1. memoized Turkish stemming (snowballstemmer's Turkish stemmer when installed, held to the
+#      same safety rules as the conservative suffix stripper used otherwise); every stem is shown
+#      as its most frequent surface word
+#   2. gensim Phrases bigram detection ("pes_etmek" style tokens for frequent word pairs)
+#   3. Dictionary.filter_extremes with a hard cap on the number of terms
+# Set KICK_TOPIC_VOCAB_REDUCTION=0 to train on the preprocessed tokens as they are.
+TOPIC_VOCAB_REDUCTION_ENABLED = os.environ.get("KICK_TOPIC_VOCAB_REDUCTION", "1") != "0"
+VOCAB_PHRASE_MIN_COUNT = 5          # Bigram must occur at least this often
+VOCAB_PHRASE_THRESHOLD = 10.0       # gensim Phrases score threshold (higher: fewer phrases)
+VOCAB_MIN_DOCUMENTS = 2             # Terms in fewer messages are dropped...
+VOCAB_MAX_DOCUMENT_FRACTION = 0.5   # ...as are terms in more than this share of messages
+VOCAB_FILTER_MIN_DOCUMENTS = 500    # Frequency filters only apply to corpora at least this large
+VOCAB_MAX_TERMS = int(os.environ.get("KICK_TOPIC_VOCAB_MAX_TERMS", "20000")) # Hard vocabulary cap
+MIN_STEM_LENGTH = 2                 # Shorter stems keep the original word
+
+# Fallback when snowballstemmer is not installed: one pass that strips a single plural/case
+# ending, chosen from unambiguous multi-letter suffixes only. Bare vowels and "-ın/-in/-un" are
+# left out, as are stems shorter than FALLBACK_MIN_STEM_LENGTH, because they cut word roots
+# ("yayın" -> "yay", "oyun" -> "oy", "dünya" -> "dün"); under-stemming only costs a few terms.
+_TURKISH_SUFFIXES = sorted(['lar', 'ler', 'ları', 'leri', 'lara', 'lere', 'ların', 'lerin', 'larda', 'lerde',
+                            'lardan', 'lerden', 'larla', 'lerle', 'dan', 'den', 'tan', 'ten', 'da', 'de', 'ta', 'te',
+                            'nın', 'nin', 'nun', 'nün', 'yı', 'yi', 'yu', 'yü', 'ya', 'ye', 'yla', 'yle'],
+                           key=len, reverse=True)
+FALLBACK_MIN_STEM_LENGTH = 4
+
+# Term counts of the most recent vocabulary reduction (perform_topic_modeling / sweep_topic_counts)
+last_vocabulary_report = {}
+
+def _strip_turkish_suffix(word: str) -> str:
+    """Strips the longest matching suffix once, if the stem keeps FALLBACK_MIN_STEM_LENGTH letters
+    ("yayınlarda" -> "yayın", "oyunda" -> "oyun"; "yayın" and "hatta" stay as they are)."""
+    for suffix in _TURKISH_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= FALLBACK_MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+    return word
+
+def _is_suffix_chain(ending: str) -> bool:
+    """True if `ending` splits into _TURKISH_SUFFIXES ("larından" = "ların" + "dan")."""
+    return not ending or any(ending.startswith(suffix) and _is_suffix_chain(ending[len(suffix):])
+                             for suffix in _TURKISH_SUFFIXES)
+
+def _guard_snowball_stemmer(stem_word):
+    """Wraps snowball's Turkish stemWord so it cannot cut word roots.
+
+    Snowball strips any suffix-shaped ending ("yayın" -> "yay", "oyun" -> "oy", "kaya" -> "ka").
+    Its stem is kept only when it keeps FALLBACK_MIN_STEM_LENGTH letters and the removed ending is
+    a chain of the fallback's unambiguous suffixes ("kanallarından" -> "kanal"); otherwise the
+    word goes through the fallback stripper.
+    """
+    def stem(word: str) -> str:
+        stemmed = stem_word(word)
+        if (stemmed != word and word.startswith(stemmed) and len(stemmed) >= FALLBACK_MIN_STEM_LENGTH
+                and _is_suffix_chain(word[len(stemmed):])):
+            return stemmed
+        return _strip_turkish_suffix(word)
+    return stem
+
+@functools.lru_cache(maxsize=1)
+def get_turkish_stemmer():
+    """word -> stem function: guarded snowballstemmer Turkish stemmer, or the suffix-stripping fallback."""
+    try:
+        import snowballstemmer
+    except ImportError:
+        print("snowballstemmer not installed; using the built-in Turkish suffix stripper.")
+        return _strip_turkish_suffix
+    return _guard_snowball_stemmer(snowballstemmer.stemmer('turkish').stemWord)
+
+def turkish_stemmer_revision() -> str:
+    """Identifies the stemmer behind stem_token (part of the topic model cache key)."""
+    rules = hashlib.sha1(repr((_TURKISH_SUFFIXES, FALLBACK_MIN_STEM_LENGTH)).encode('utf-8')).hexdigest()[:12]
+    if get_turkish_stemmer() is _strip_turkish_suffix:
+        return f"fallback-{rules}"
+    return f"{package_revision('snowballstemmer')}+guard-{rules}"
+
+@functools.lru_cache(maxsize=PREPROCESS_TOKEN_CACHE_SIZE)
+def stem_token(word: str) -> str:
+    """Memoized Turkish stem of one preprocessed token."""
+    stem = get_turkish_stemmer()(word)
+    return stem if len(stem) >= MIN_STEM_LENGTH else word
+
+def reduce_vocabulary(processed_docs: list) -> tuple:
+    """Stems, joins frequent bigrams and prunes the vocabulary of preprocessed token lists.
+    Returns: (documents restricted to the kept terms, empty ones dropped; Dictionary; report dict)
+    """
+    start_time = time.time()
+    raw_terms = len({token for doc in processed_docs for token in doc})
+
+    # 1. Stems, each shown as its most frequent surface form
+    surface_counts = {}
+    for doc in processed_docs:
+        for token in doc:
+            counts = surface_counts.setdefault(stem_token(token), {})
+            counts[token] = counts.get(token, 0) + 1
+    display = {stem: max(counts, key=counts.get) for stem, counts in surface_counts.items()}
+    docs = [[display[stem_token(token)] for token in doc] for doc in processed_docs]
+
+    # 2. Bigram phrases
+    phrases = gensim.models.phrases.Phrases(docs, min_count=VOCAB_PHRASE_MIN_COUNT, threshold=VOCAB_PHRASE_THRESHOLD,
+                                            delimiter='_').freeze()
+    docs = [phrases[doc] for doc in docs]
+    dictionary = corpora.Dictionary(docs)
+    phrase_terms = len(dictionary)
+
+    # 3. Frequency filters and the hard cap
+    if len(docs) >= VOCAB_FILTER_MIN_DOCUMENTS:
+        dictionary.filter_extremes(no_below=VOCAB_MIN_DOCUMENTS, no_above=VOCAB_MAX_DOCUMENT_FRACTION, keep_n=VOCAB_MAX_TERMS)
+    else:
+        dictionary.filter_extremes(no_below=1, no_above=1.0, keep_n=VOCAB_MAX_TERMS)
+    token2id = dictionary.token2id
+    docs = [kept for kept in ([token for token in doc if token in token2id] for doc in docs) if kept]
+
+    report = {'raw_terms': raw_terms, 'stemmed_terms': len(display), 'phrase_terms': phrase_terms,
+              'bigrams': sum(1 for term in dictionary.token2id if '_' in term), 'final_terms': len(dictionary),
+              'documents': len(docs), 'dropped_documents': len(processed_docs) - len(docs),
+              'reduction': 1 - len(dictionary) / raw_terms if raw_terms else 0.0, 'seconds': time.time() - start_time}
+    print(f"Vocabulary: {raw_terms} terms -> {report['stemmed_terms']} stemmed -> {phrase_terms} with phrases -> "
+          f"{report['final_terms']} kept ({report['reduction']:.1%} smaller, {report['seconds']:.2f} seconds).")
+    return docs, dictionary, report
+
+def prepare_topic_vocabulary(processed_docs: list, reduce: bool = None) -> tuple:
+    """(documents, Dictionary) for LDA: reduce_vocabulary's output, or the token lists unchanged."""
+    last_vocabulary_report.clear()
+    if not (TOPIC_VOCAB_REDUCTION_ENABLED if reduce is None else reduce):
+        return processed_docs, corpora.Dictionary(processed_docs)
+    docs, dictionary, report = reduce_vocabulary(processed_docs)
+    last_vocabulary_report.update(report)
+    return docs, dictionary
+
+# --- Topic Model Cache ---
+# Set KICK_TOPIC_CACHE=0 to always retrain; see topic_model_cache.py for the directory and size bound
+TOPIC_MODEL_CACHE_ENABLED = os.environ.get("KICK_TOPIC_CACHE", "1") != "0"
+_topic_model_cache = None
+
+def get_topic_model_cache():
+    """Returns the process-wide TopicModelCache, or None if caching is disabled or unavailable."""
+    global _topic_model_cache
+    if not TOPIC_MODEL_CACHE_ENABLED:
+        return None
+    if _topic_model_cache is None:
+        try:
+            _topic_model_cache = TopicModelCache()
+        except Exception as e:
+            print(f"Warning: Could not open topic model cache: {e}. Continuing without cache.")
+            return None
+    return _topic_model_cache
+
+# LdaMulticore worker count; 0 uses all cores except one. Batch runs that already spread files
+# across processes cap it (kick_analyze sets it to each process's share of the cores).
+LDA_WORKERS = int(os.environ.get("KICK_LDA_WORKERS", "0"))
+
+def _lda_workers() -> int:
+    """LdaMulticore workers: LDA_WORKERS if set, else all cores except one (1 if the CPU count is unknown)."""
+    if LDA_WORKERS > 0:
+        return LDA_WORKERS
+    try:
+        return max(1, os.cpu_count() - 1)
+    except (NotImplementedError, TypeError):
+        print("Warning: Could not determine CPU count. Defaulting to 1 worker.")
+        return 1
+
+def _coherence_meta_field(mode: str) -> str:
+    """Cache metadata field holding a coherence result; background c_v is the same score as c_v."""
+    return f"coherence_{'c_v' if mode == 'c_v_background' else mode}"
+
+def _store_coherence(topic_cache, cache_key: str, report: dict):
+    """Saves a coherence report into the cached entry's metadata, once its score is known."""
+    def store(score):
+        topic_cache.update_meta(cache_key, **{_coherence_meta_field(report['mode']): {
+            'score': float(score), 'ci': report.get('ci'), 'documents': report.get('documents')}})
+    if report.get('future') is not None:
+        # Written once the background process has computed it
+        report['future'].add_done_callback(
+            lambda done: store(done.result()) if not done.cancelled() and done.exception() is None else None)
+    elif report.get('score') is not None:
+        store(report['score'])
+
+def _load_cached_topic_model(cached: tuple, processed_docs: list, coherence_mode: str, topic_cache, cache_key: str,
+                             start_time: float, vocabulary_reduction: bool):
+    """perform_topic_modeling's return value (and the coherence/vocabulary reports) for a cache hit.
+    Coherence is stored per mode; a mode not computed for this model yet is computed now and added."""
+    global last_coherence_report
+    lda_model, meta = cached
+    topics = {int(topic_id): [tuple(pair) for pair in words] for topic_id, words in meta['topics'].items()}
+    stored = meta.get(_coherence_meta_field(coherence_mode))
+    if stored is not None:
+        coherence_score = stored['score']
+        last_coherence_report = {'mode': coherence_mode, 'score': coherence_score, 'ci': stored.get('ci'),
+                                 'documents': stored.get('documents'), 'future': None, 'seconds': 0.0, 'cached': True}
+    else:
+        # Only the coherence is computed; the model itself is not retrained
+        texts, _ = prepare_topic_vocabulary(processed_docs, vocabulary_reduction)
+        corpus, corpus_path = build_topic_corpus(texts, lda_model.id2word) if coherence_mode == 'u_mass' else (None, None)
+        try:
+            coherence_score, last_coherence_report = _score_topic_coherence(lda_model, texts, lda_model.id2word,
+                                                                            coherence_mode, corpus=corpus)
+            last_coherence_report['cached'] = False
+            _store_coherence(topic_cache, cache_key, last_coherence_report)
+        except Exception as ce:
+            print(f"Warning: Could not calculate coherence score: {ce}")
+            coherence_score, last_coherence_report = None, {}
+        finally:
+            _remove_corpus_file(corpus_path)
+    last_vocabulary_report.clear()
+    last_vocabulary_report.update(meta.get('vocabulary_report') or {})
+    duration = time.time() - start_time
+    print(f"Topic model cache hit: loaded in {duration:.3f} seconds (training took {meta['train_seconds']:.2f} seconds).")
+    return lda_model, topics, coherence_score, duration
 
 # --- Topic Modeling ---
-def perform_topic_modeling(messages: pd.Series, num_topics=5, num_words=5):
+def perform_topic_modeling(messages: pd.Series, num_topics=5, num_words=5, token_cache=None, coherence_mode=None,
+                           vocabulary_reduction=None):
     """Performs LDA topic modeling and calculates coherence.
+    Token lists come from `token_cache` (a TokenCache) when given; the coherence model reuses them.
+    `coherence_mode` is one of COHERENCE_MODES (default DEFAULT_COHERENCE_MODE); details of the
+    score, including the background Future in 'c_v_background' mode, go to last_coherence_report.
+    `vocabulary_reduction` (default TOPIC_VOCAB_REDUCTION_ENABLED) runs the stemming/phrase/pruning
+    vocabulary stage first; its term counts go to last_vocabulary_report.
+    Trained models are saved to the topic model cache (get_topic_model_cache) under a fingerprint
+    of the preprocessed corpus and the training parameters; a repeated call loads the model instead
+    (coherence is cached per mode, so switching modes only computes the new score).
     Returns: lda_model, topics, coherence_score, duration_seconds
     """
+    global last_coherence_report
+    coherence_mode = coherence_mode or DEFAULT_COHERENCE_MODE
+    if coherence_mode not in COHERENCE_MODES:
+        raise ValueError(f"Unknown coherence mode {coherence_mode!r}; expected one of {', '.join(COHERENCE_MODES)}.")
+    last_coherence_report = {}
     start_time = time.time() # Start timing
 
-    processed_docs = messages.fillna('').apply(preprocess_text)
-    processed_docs = [doc for doc in processed_docs if doc]
+    processed_docs = [doc for doc in preprocess_messages(messages, token_cache) if doc]
     
     if not processed_docs:
         print("Warning: No processable documents found for topic modeling.")
         # Return None for model, empty dict for topics, None for score, and 0 duration
         return None, {}, None, 0
 
-    dictionary = corpora.Dictionary(processed_docs)
-    corpus = [dictionary.doc2bow(doc) for doc in processed_docs]
+    vocabulary_reduction = TOPIC_VOCAB_REDUCTION_ENABLED if vocabulary_reduction is None else vocabulary_reduction
+    workers = _lda_workers() # LdaMulticore results depend on the worker count, so it is part of the key
+    topic_cache = get_topic_model_cache()
+    cache_key = None
+    if topic_cache is not None:
+        vocabulary_params = ({'phrase_min_count': VOCAB_PHRASE_MIN_COUNT, 'phrase_threshold': VOCAB_PHRASE_THRESHOLD,
+                              'min_documents': VOCAB_MIN_DOCUMENTS, 'max_document_fraction': VOCAB_MAX_DOCUMENT_FRACTION,
+                              'max_terms': VOCAB_MAX_TERMS, 'stemmer': turkish_stemmer_revision()}
+                             if vocabulary_reduction else None)
+        cache_key = corpus_fingerprint(processed_docs, {'num_topics': num_topics, 'num_words': num_words, 'workers': workers,
+                                                        'vocabulary': vocabulary_params,
+                                                        'gensim': package_revision('gensim')})
+        cached = topic_cache.get(cache_key)
+        if cached is not None:
+            return _load_cached_topic_model(cached, processed_docs, coherence_mode, topic_cache, cache_key, start_time,
+                                            vocabulary_reduction)
 
-    if not corpus:
+    processed_docs, dictionary = prepare_topic_vocabulary(processed_docs, vocabulary_reduction)
+    corpus, corpus_path = build_topic_corpus(processed_docs, dictionary)
+
+    if len(corpus) == 0:
         print("Warning: Corpus is empty after creating Bag-of-Words.")
+        _remove_corpus_file(corpus_path)
         # Return None for model, empty dict for topics, None for score, and 0 duration
         return None, {}, None, 0
 
@@ -385,14 +2373,6 @@ def perform_topic_modeling(messages: pd.Series, num_topics=5, num_words=5):
     topics = {}
     coherence_score = None
     try:
-        # Determine number of workers for LdaMulticore
-        # Use all cores except one, but default to 1 if cpu_count fails
-        try:
-            workers = max(1, os.cpu_count() - 1)
-        except NotImplementedError:
-            workers = 1
-            print("Warning: Could not determine CPU count. Defaulting to 1 worker.")
-
         # Prefer LdaMulticore if multiple workers can be used
         if workers > 1:
             print(f"Using LdaMulticore with {workers} workers.")
@@ -421,14 +2401,10 @@ def perform_topic_modeling(messages: pd.Series, num_topics=5, num_words=5):
             formatted_topics = {i: [(word, f"{weight:.3f}") for word, weight in lda_model.show_topic(i, topn=num_words)] 
                                 for i in range(min(num_topics, lda_model.num_topics))}
             
-            # Calculate Coherence Score (C_v)
+            # Calculate Coherence Score (c_v, u_mass, sampled or background c_v)
             try:
-                coherence_model_lda = CoherenceModel(model=lda_model, 
-                                                   texts=processed_docs, 
-                                                   dictionary=dictionary, 
-                                                   coherence='c_v')
-                coherence_score = coherence_model_lda.get_coherence()
-                print(f"Coherence Score (C_v): {coherence_score}")
+                coherence_score, last_coherence_report = _score_topic_coherence(lda_model, processed_docs, dictionary,
+                                                                                coherence_mode, corpus=corpus)
             except Exception as ce:
                 print(f"Warning: Could not calculate coherence score: {ce}")
                 coherence_score = None
@@ -437,6 +2413,18 @@ def perform_topic_modeling(messages: pd.Series, num_topics=5, num_words=5):
             duration = end_time - start_time
             print(f"Topic modeling duration: {duration:.2f} seconds")
 
+            if topic_cache is not None:
+                try:
+                    topic_cache.put(cache_key, lda_model, dictionary, {
+                        'topics': formatted_topics,
+                        'train_seconds': duration,
+                        'vocabulary_report': dict(last_vocabulary_report),
+                    })
+                    if last_coherence_report:
+                        _store_coherence(topic_cache, cache_key, last_coherence_report)
+                except Exception as e:
+                    print(f"Warning: Could not save topic model to cache: {e}")
+
             return lda_model, formatted_topics, coherence_score, duration # Return duration
         else:
              print("Error: LDA model was not successfully trained.")
@@ -447,10 +2435,218 @@ def perform_topic_modeling(messages: pd.Series, num_topics=5, num_words=5):
         print(f"Error during LDA model training or coherence calculation: {e}")
         # Return None/empty values and 0 duration on error
         return None, {}, None, 0
+    finally:
+        _remove_corpus_file(corpus_path)
+
+# --- Topic Count Sweep ---
+# Picks num_topics by coherence instead of a hand-tuned constant. The Dictionary and BoW corpus
+# are built once and handed to every worker process through the pool initializer (pickled once
+# per worker). Each worker trains a
+# single-core LdaModel for one topic count, saves it to a temporary directory and returns its
+# coherence, topics and model path; the parent loads only the winner, so the sweep takes about one
+# training run of wall-clock time when there are as many cores as topic counts.
+TOPIC_SWEEP_COUNTS = tuple(range(2, 11))
+TOPIC_SWEEP_WORKERS = os.cpu_count() or 1
+TOPIC_SWEEP_COHERENCE_MODES = ('c_v', 'u_mass') # Both: higher is better
+
+_sweep_shared = {} # Corpus, dictionary and texts of the sweep running in this worker process
+
+def _init_sweep_worker(shared: dict):
+    """Pool initializer: keeps the read-only sweep inputs for every task of this worker."""
+    global _sweep_shared
+    _sweep_shared = shared
+
+def _train_sweep_model(num_topics: int, keep_model: bool = False) -> dict:
+    """Pool task: trains LDA with `num_topics` on the shared corpus and scores its coherence.
+
+    The model is saved under the shared 'model_dir' (its path is returned as 'model_path'), so
+    the parent can load the winner without a pickled model per topic count travelling back;
+    `keep_model` returns the model itself instead, for in-process runs.
+    """
+    start_time = time.time()
+    dictionary = _sweep_shared['dictionary']
+    lda_model = gensim.models.LdaModel(corpus=_sweep_shared['corpus'], id2word=dictionary, num_topics=num_topics,
+                                       random_state=100, update_every=1, chunksize=100, passes=10, alpha='auto')
+    coherence = compute_coherence(topic_word_lists(lda_model), _sweep_shared['texts'], dictionary,
+                                  coherence=_sweep_shared['coherence'], processes=1, # Cores are used by the sweep
+                                  corpus=_sweep_shared['corpus'])
+    result = {'num_topics': num_topics, 'coherence': float(coherence), 'seconds': time.time() - start_time,
+              'topics': {i: [(word, f"{weight:.3f}") for word, weight in lda_model.show_topic(i, topn=_sweep_shared['num_words'])]
+                         for i in range(lda_model.num_topics)}}
+    if keep_model:
+        result['model'] = lda_model
+    else:
+        # The parent has the dictionary; state/dispatcher are only needed to continue training
+        result['model_path'] = os.path.join(_sweep_shared['model_dir'], f"lda-{num_topics}")
+        lda_model.save(result['model_path'], ignore=('state', 'dispatcher', 'id2word'))
+    return result
+
+def _sweep_rank(result: dict) -> tuple:
+    """Sort key of the sweep winner: highest coherence, the smaller topic count on ties."""
+    return result['coherence'], -result['num_topics']
+
+def sweep_topic_counts(messages: pd.Series, topic_counts=TOPIC_SWEEP_COUNTS, num_words=5, token_cache=None,
+                       coherence_mode: str = 'c_v', workers: int = None):
+    """Trains LDA for every count in `topic_counts` in parallel and keeps the most coherent model.
+
+    Args:
+        messages (pd.Series): Raw chat messages.
+        topic_counts: Topic counts to try.
+        num_words (int): Keywords per topic in the returned topics.
+        token_cache (TokenCache): Optional shared preprocessed tokens.
+        coherence_mode (str): 'c_v' or 'u_mass'.
+        workers (int): Pool size, defaults to TOPIC_SWEEP_WORKERS (capped at the number of counts).
+    Returns: lda_model, topics, coherence_score, duration_seconds, curve - curve is a list of
+             {'num_topics', 'coherence', 'seconds'} in topic-count order.
+    """
+    global last_coherence_report
+    if coherence_mode not in TOPIC_SWEEP_COHERENCE_MODES:
+        raise ValueError(f"Topic sweep coherence must be one of {', '.join(TOPIC_SWEEP_COHERENCE_MODES)}, got {coherence_mode!r}.")
+    start_time = time.time()
+    processed_docs = [doc for doc in preprocess_messages(messages, token_cache) if doc]
+    if not processed_docs:
+        print("Warning: No processable documents found for topic modeling.")
+        return None, {}, None, 0, []
+    processed_docs, dictionary = prepare_topic_vocabulary(processed_docs)
+    shared = {'dictionary': dictionary, 'corpus': Sparse2Corpus(build_bow_matrix(processed_docs, dictionary), documents_columns=False),
+              'texts': processed_docs, 'coherence': coherence_mode, 'num_words': num_words}
+
+    counts = sorted(set(topic_counts), reverse=True) # Largest (slowest) counts first evens out the pool
+    workers = max(1, min(workers or TOPIC_SWEEP_WORKERS, len(counts)))
+    if workers == 1:
+        # In-process: keep only the best model so far instead of refitting it
+        _init_sweep_worker(shared)
+        results, best, lda_model = [], None, None
+        for count in counts:
+            result = _train_sweep_model(count, keep_model=True)
+            model = result.pop('model')
+            if best is None or _sweep_rank(result) > _sweep_rank(best):
+                best, lda_model = result, model
+            results.append(result)
+        _init_sweep_worker({})
+    else:
+        shared['model_dir'] = tempfile.mkdtemp(prefix="kick_topic_sweep_")
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=PROCESS_POOL_CONTEXT,
+                                     initializer=_init_sweep_worker, initargs=(shared,)) as executor:
+                results = list(executor.map(_train_sweep_model, counts))
+            best = max(results, key=_sweep_rank)
+            lda_model = gensim.models.LdaModel.load(best['model_path'])
+            lda_model.id2word = dictionary
+        finally:
+            shutil.rmtree(shared['model_dir'], ignore_errors=True)
+        for result in results:
+            del result['model_path']
+    results.sort(key=lambda result: result['num_topics'])
+
+    topics = best['topics']
+    curve = [{key: result[key] for key in ('num_topics', 'coherence', 'seconds')} for result in results]
+    duration = time.time() - start_time
+    last_coherence_report = {'mode': coherence_mode, 'score': best['coherence'], 'ci': None,
+                             'documents': len(processed_docs), 'future': None, 'seconds': best['seconds']}
+    print(f"Topic sweep: {len(counts)} topic counts on {workers} processes in {duration:.2f} seconds; "
+          f"best num_topics={best['num_topics']} ({coherence_mode} {best['coherence']:.4f})")
+    return lda_model, topics, best['coherence'], duration, curve
+
+# --- Incremental (Online) Topic Modeling ---
+# perform_topic_modeling retrains LDA over the whole history. For live chat, IncrementalTopicModel
+# keeps one growing Dictionary and one LdaModel and folds each new window of messages in with a
+# single online-VB update() (Hoffman et al.), so a refresh costs time proportional to the window,
+# not to the history. New words extend the model's topic-word statistics in place.
+INCREMENTAL_TOPIC_CHUNKSIZE = 100  # Documents per online-VB mini-batch
+INCREMENTAL_TOPIC_INITIAL_PASSES = 5 # Passes over the first window only (gives the topics a starting point)
+INCREMENTAL_TOPIC_DECAY = 0.5      # kappa: how quickly older windows are forgotten (0.5-1.0)
+INCREMENTAL_TOPIC_OFFSET = 1.0     # tau_0: down-weights early updates
+
+class IncrementalTopicModel:
+    """Online LDA over a stream of chat windows: update() per window, assign_topics() for new messages."""
+
+    def __init__(self, num_topics: int = 4, num_words: int = 5, chunksize: int = INCREMENTAL_TOPIC_CHUNKSIZE,
+                 decay: float = INCREMENTAL_TOPIC_DECAY, offset: float = INCREMENTAL_TOPIC_OFFSET, random_state: int = 100):
+        self.num_topics = num_topics
+        self.num_words = num_words
+        self.chunksize = chunksize
+        self.decay = decay
+        self.offset = offset
+        self.random_state = random_state
+        self.dictionary = None
+        self.lda_model = None
+        self.documents_seen = 0
+        self.windows_seen = 0
+        self.last_update_seconds = 0.0
+
+    def _grow_vocabulary(self) -> None:
+        """Pads the model's topic-word state with zero counts for words the dictionary gained."""
+        lda, num_terms = self.lda_model, len(self.dictionary)
+        added = num_terms - lda.num_terms
+        if added <= 0:
+            return
+        new_eta = np.full(added, 1.0 / self.num_topics, dtype=lda.eta.dtype) # The default symmetric prior
+        lda.eta = np.concatenate([lda.eta, new_eta])
+        lda.state.eta = lda.eta
+        lda.state.sstats = np.hstack([lda.state.sstats, np.zeros((lda.num_topics, added), dtype=lda.state.sstats.dtype)])
+        lda.num_terms = num_terms
+        lda.id2word = self.dictionary
+        lda.sync_state() # Recomputes expElogbeta for the widened vocabulary
+
+    def update(self, messages: pd.Series) -> dict:
+        """Folds a new window of messages into the model and returns the current formatted topics.
+
+        The first window trains the model (INCREMENTAL_TOPIC_INITIAL_PASSES passes); later
+        windows run one online update. Windows without usable tokens leave the model unchanged.
+        """
+        start_time = time.time()
+        processed_docs = [doc for doc in preprocess_messages(messages) if doc]
+        if processed_docs:
+            if self.dictionary is None:
+                self.dictionary = corpora.Dictionary(processed_docs)
+            else:
+                self.dictionary.add_documents(processed_docs)
+            corpus = [self.dictionary.doc2bow(doc) for doc in processed_docs]
+            if self.lda_model is None:
+                self.lda_model = gensim.models.LdaModel(corpus=corpus, id2word=self.dictionary,
+                                                        num_topics=self.num_topics, chunksize=self.chunksize,
+                                                        passes=INCREMENTAL_TOPIC_INITIAL_PASSES, update_every=1,
+                                                        decay=self.decay, offset=self.offset,
+                                                        random_state=self.random_state)
+            else:
+                self._grow_vocabulary()
+                self.lda_model.update(corpus, chunksize=self.chunksize, decay=self.decay, offset=self.offset,
+                                      passes=1, update_every=1)
+            self.documents_seen += len(processed_docs)
+            self.windows_seen += 1
+        self.last_update_seconds = time.time() - start_time
+        return self.topics()
+
+    def topics(self, num_words: int = None) -> dict:
+        """Formatted topics in the same shape as perform_topic_modeling ({id: [(word, "weight")]})."""
+        if self.lda_model is None:
+            return {}
+        num_words = num_words or self.num_words
+        return {i: [(word, f"{weight:.3f}") for word, weight in self.lda_model.show_topic(i, topn=num_words)]
+                for i in range(self.lda_model.num_topics)}
+
+    def assign_topics(self, messages: pd.Series) -> np.ndarray:
+        """Dominant topic id per message using the current model (-1 if it has no known words or no model exists)."""
+        assigned = np.full(len(messages), -1, dtype=np.int64)
+        if self.lda_model is None or len(messages) == 0:
+            return assigned
+        bows = [self.dictionary.doc2bow(doc) for doc in preprocess_messages(messages)]
+        known = np.array([bool(bow) for bow in bows])
+        if known.any():
+            gamma, _ = self.lda_model.inference([bow for bow in bows if bow])
+            assigned[known] = gamma.argmax(axis=1)
+        return assigned
+
+    def stats(self) -> dict:
+        return {'documents_seen': self.documents_seen, 'windows_seen': self.windows_seen,
+                'vocabulary_size': len(self.dictionary) if self.dictionary is not None else 0,
+                'last_update_seconds': self.last_update_seconds}
 
 # --- Content Suggestions ---
-def generate_content_suggestions(df: pd.DataFrame, topics: dict) -> list[str]:
-    """Generates basic content suggestions based on sentiment and topics."""
+def generate_content_suggestions(df: pd.DataFrame, topics: dict, token_cache=None) -> list[str]:
+    """Generates basic content suggestions based on sentiment and topics.
+    Negative-message tokens are read from `token_cache` (a TokenCache) when given."""
     suggestions = []
     
     if df.empty or 'sentiment' not in df.columns:
@@ -488,7 +2684,7 @@ def generate_content_suggestions(df: pd.DataFrame, topics: dict) -> list[str]:
     negative_messages = df[df['sentiment'] == 'negative']['message']
     if not negative_messages.empty:
         # Very basic: Look at common words in negative messages after preprocessing
-        processed_negative = negative_messages.fillna('').apply(preprocess_text)
+        processed_negative = preprocess_messages(negative_messages, token_cache)
         all_negative_words = [word for sublist in processed_negative for word in sublist]
         if all_negative_words:
             negative_freq = pd.Series(all_negative_words).value_counts()
@@ -498,4 +2694,14 @@ def generate_content_suggestions(df: pd.DataFrame, topics: dict) -> list[str]:
     if not suggestions:
         return ["No specific suggestions could be generated at this time."]
         
-    return suggestions 
\ No newline at end of file
+    return suggestions 
+
+
+# --- Startup Time Report ---
+ANALYSIS_IMPORT_SECONDS = time.perf_counter() - _ANALYSIS_IMPORT_STARTED
+
+def get_startup_report() -> dict:
+    """Import time of this module plus the heavy dependencies loaded (lazily) so far."""
+    report = startup_report()
+    report['analysis_import_seconds'] = ANALYSIS_IMPORT_SECONDS
+    return report
@@ -0,0 +1,71 @@
+# Pluggable resource caching and user-facing reporting for analysis.py
+#
+# analysis.py has to run without a Streamlit runtime (batch CLI workers, cron jobs, tests), so it
+# never calls Streamlit directly. Loaded models are cached with `cache_resource` and problems are
+# surfaced with `report_error` / `report_warning`. By default models are memoized in-process and
+# messages go to stderr; the dashboard installs st.cache_resource / st.error / st.warning through
+# `configure(...)`.
+
+import functools
+import sys
+import threading
+
+
+def _print_error(message: str) -> None:
+    print(f"Error: {message}", file=sys.stderr)
+
+
+def _print_warning(message: str) -> None:
+    print(f"Warning: {message}", file=sys.stderr)
+
+
+_default_resource_cache = functools.lru_cache(maxsize=None)
+_resource_cache = _default_resource_cache
+_reporters = {"error": _print_error, "warning": _print_warning}
+_lock = threading.Lock()
+
+
+def configure(cache_resource=None, error=None, warning=None) -> None:
+    """Installs the resource-cache decorator and/or message reporters (None keeps the current one).
+
+    Args:
+        cache_resource: Decorator used to cache loaded models, e.g. st.cache_resource.
+        error: Callable taking one message string, e.g. st.error.
+        warning: Callable taking one message string, e.g. st.warning.
+    """
+    global _resource_cache
+    if cache_resource is not None:
+        _resource_cache = cache_resource
+    if error is not None:
+        _reporters["error"] = error
+    if warning is not None:
+        _reporters["warning"] = warning
+
+
+def cache_resource(func):
+    """Caches `func`'s results with whichever resource-cache decorator is installed when it is called."""
+    decorated = {}
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        decorator = _resource_cache
+        impl = decorated.get(decorator)
+        if impl is None:
+            with _lock:
+                impl = decorated.setdefault(decorator, decorator(func))
+        return impl(*args, **kwargs)
+
+    def clear():
+        for impl in decorated.values():
+            getattr(impl, "clear", getattr(impl, "cache_clear", lambda: None))()
+
+    wrapper.clear = clear
+    return wrapper
+
+
+def report_error(message: str) -> None:
+    _reporters["error"](message)
+
+
+def report_warning(message: str) -> None:
+    _reporters["warning"](message)
@@ -3,11 +3,19 @@ from fastapi.responses import JSONResponse
 import os
 import json
 import base64
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives import serialization
 from cryptography.exceptions import InvalidSignature
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import analysis # canlı mesajlar için model tabanlı duygu analizi (mikro-toplu)
 import uvicorn # uygulamayı çalıştırmak için eklendi
 from pydantic import BaseModel
 from typing import Optional # başka bir yerde kullanılıyorsa isteğe bağlı tutun veya kullanılmıyorsa kaldırın
@@ -33,7 +41,12 @@ except Exception as e:
     print(f"kick genel anahtarı yüklenirken hata: {e}")
     public_key = None # üretimde hatayı uygun şekilde işle
 
-app = FastAPI() # flask'tan fastapi'ye değiştirildi
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sentiment_batcher.warm_up() # model ilk canlı mesajdan önce arka planda yüklenir
+    yield
+
+app = FastAPI(lifespan=lifespan) # flask'tan fastapi'ye değiştirildi
 analyzer = SentimentIntensityAnalyzer()
 
 # kick mesajları için bellek içi depolama
@@ -92,6 +105,147 @@ async def verify_kick_signature(request: Request): # tür ipucu ve zaman uyumsuz
         print(f"i̇mza doğrulaması sırasında hata: {e}")
         return False
 
+def score_vader(text: str):
+    """vader etiketini ve bileşik puanını döndürür.
+
+    önbellek kullanılmaz: tek mesajlık vader mikro saniyeler sürer, sqlite g/ç'si ise olay döngüsünü bloklardı."""
+    compound = analyzer.polarity_scores(text)['compound']
+    sentiment_label = "neutral"
+    if compound >= 0.05:
+        sentiment_label = "positive"
+    elif compound <= -0.05:
+        sentiment_label = "negative"
+    return sentiment_label, compound
+
+# --- canlı duygu analizi için dinamik mikro-toplu zamanlayıcı ---
+# her webhook isteği mesajını kuyruğa bırakır ve kendi future'ını bekler; arka plandaki döngü
+# en fazla BATCH_MAX_WAIT_MS milisaniye ya da BATCH_MAX_SIZE mesaj biriktirip analysis.py'deki
+# yöntemle tek bir toplu çıkarım yapar (tek iş parçacıklı executor'da, olay döngüsünü bloklamadan).
+# model SENTIMENT_TIMEOUT_MS içinde yanıt veremezse, kuyruk MAX_PENDING_MESSAGES'ı aşarsa ya da
+# model yüklenemezse istek doğrudan vader ile yanıtlanır; böylece webhook gecikmesi sınırlı kalır.
+LIVE_SENTIMENT_METHOD = os.environ.get("KICK_LIVE_SENTIMENT_METHOD", "custom_kick_bert") # analysis.SUPPORTED_SENTIMENT_METHODS'tan biri
+BATCH_MAX_WAIT_MS = float(os.environ.get("KICK_BATCH_MAX_WAIT_MS", "20"))
+BATCH_MAX_SIZE = int(os.environ.get("KICK_BATCH_MAX_SIZE", "64"))
+SENTIMENT_TIMEOUT_MS = float(os.environ.get("KICK_SENTIMENT_TIMEOUT_MS", "250")) # istek başına en uzun model bekleme süresi
+MAX_PENDING_MESSAGES = int(os.environ.get("KICK_MAX_PENDING_MESSAGES", "1024")) # bunun üstünde yük atılır (doğrudan vader)
+
+class SentimentMicroBatcher:
+    """gelen mesajları mikro-toplulara ayırıp analysis.py yöntemiyle puanlar; gecikmeyi vader yedeğiyle sınırlar."""
+
+    def __init__(self, method: str, max_wait_ms: float, max_batch_size: int, timeout_ms: float, max_pending: int):
+        self.method = method
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self.timeout = timeout_ms / 1000
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sentiment-batch") # modeller tek iş parçacığında
+        self.queue = None
+        self._task = None
+        self.latencies = deque(maxlen=1000) # son isteklerin bekleme süreleri (saniye)
+        self.batch_sizes = deque(maxlen=1000)
+        self.counts = {"model": 0, "timeout": 0, "shed": 0, "model_failed": 0, "expired": 0}
+
+    def _ensure_started(self):
+        # kuyruk ve döngü, çalışan olay döngüsüne bağlı olduğu için ilk istekte oluşturulur
+        if self._task is None or self._task.done():
+            self.queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def warm_up(self):
+        """yöntemin modellerini arka planda yükler (ilk canlı mesaj model yüklemesini beklemesin).
+
+        bir mesaj puanlamak yetmez: mesaj kalıcı duygu önbelleğinde bulunursa model hiç yüklenmez."""
+        analysis.model_registry.warm_up(analysis.sentiment_method_models(self.method))
+
+    async def score(self, text: str):
+        """(etiket, puan, kaynak) döndürür; puan [-1, 1] aralığında, kaynak yöntem adı ya da 'vader'."""
+        if self.method == 'vader':
+            return (*score_vader(text), 'vader')
+        start_time = time.perf_counter()
+        self._ensure_started()
+        if self.queue.qsize() >= self.max_pending:
+            self.counts["shed"] += 1
+            return (*score_vader(text), 'vader')
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.queue.put_nowait((text, future, loop.time()))
+        try:
+            # shield: zaman aşımında future iptal edilmez, toplu sonuç geldiğinde sessizce tamamlanır
+            result = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.counts["timeout"] += 1
+            result = None
+        self.latencies.append(time.perf_counter() - start_time)
+        if result is None:
+            return (*score_vader(text), 'vader')
+        self.counts["model"] += 1
+        return (*result, self.method)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # bekleyeni zaman aşımına uğrayıp vader'a düşmüş mesajlar modele gönderilmez
+            now = loop.time()
+            expired = [item for item in batch if now - item[2] >= self.timeout]
+            batch = [item for item in batch if now - item[2] < self.timeout]
+            self.counts["expired"] += len(expired)
+            for _, future, _ in expired:
+                future.set_result(None)
+            if not batch:
+                continue
+            self.batch_sizes.append(len(batch))
+            try:
+                scored = await loop.run_in_executor(self.executor, self._score_batch, [text for text, _, _ in batch])
+            except Exception as e:
+                print(f"toplu duygu analizi başarısız oldu, vader'a düşülüyor: {e}")
+                results, failed = [], 0
+            else:
+                results, failed = scored
+            # model yüklenemez ya da hata verirse sonuç eksik gelir; karşılığı olmayan mesajlar beklemeden vader'a düşer
+            failed += max(len(batch) - len(results), 0)
+            self.counts["model_failed"] += failed # sayaçlar yalnızca olay döngüsünde güncellenir
+            for (_, future, _), result in itertools.zip_longest(batch, results[:len(batch)]):
+                if not future.done():
+                    future.set_result(result)
+
+    def _score_batch(self, texts: list) -> tuple:
+        """executor içinde çalışır: ([(etiket, puan) ya da model sonuç veremediyse None], başarısız mesaj sayısı)."""
+        labels, scores, _ = analysis.run_sentiment_scores(pd.Series(texts, dtype='object'), method=self.method)
+        polarity = analysis.sentiment_polarity(scores, self.method)
+        results = []
+        for label, value in zip(labels, polarity):
+            results.append(None if label == 'unknown' else (label, float(value)))
+        return results, results.count(None)
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        percentile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else None
+        return {
+            "method": self.method,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_batch_size": self.max_batch_size,
+            "timeout_ms": self.timeout * 1000,
+            "pending": self.queue.qsize() if self.queue is not None else 0,
+            "counts": dict(self.counts),
+            "latency_ms_p50": percentile(0.50),
+            "latency_ms_p99": percentile(0.99),
+            "mean_batch_size": sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else None,
+        }
+
+sentiment_batcher = SentimentMicroBatcher(LIVE_SENTIMENT_METHOD, BATCH_MAX_WAIT_MS, BATCH_MAX_SIZE,
+                                          SENTIMENT_TIMEOUT_MS, MAX_PENDING_MESSAGES)
+
 # --- rotalar ---
 @app.post('/kick_webhook') # dekoratör değiştirildi ve zaman uyumsuz eklendi
 async def kick_webhook(request: Request): # zaman uyumsuz ve tür ipucu eklendi
@@ -143,23 +297,19 @@ async def kick_webhook(request: Request): # zaman uyumsuz ve tür ipucu eklendi
             message_content = _data.get('content')
 
             if message_content:
-                # duygu analizi yap
-                vs = analyzer.polarity_scores(message_content)
-                sentiment_label = "neutral"
-                if vs['compound'] >= 0.05:
-                    sentiment_label = "positive"
-                elif vs['compound'] <= -0.05:
-                    sentiment_label = "negative"
+                # duygu analizi yap (mikro-toplu model; gecikirse doğrudan vader)
+                sentiment_label, compound, sentiment_method = await sentiment_batcher.score(message_content)
 
                 print(f"{sender_username} kullanıcısından mesaj: '{message_content}'")
-                print(f"duygu: {sentiment_label} (puan: {vs['compound']})")
+                print(f"duygu: {sentiment_label} (puan: {compound}, yöntem: {sentiment_method})")
 
                 # mesajı ve duyguyu sakla
                 chat_messages.append({
                     'sender': sender_username,
                     'message': message_content,
-                    'sentiment_score': vs['compound'],
+                    'sentiment_score': compound,
                     'sentiment_label': sentiment_label,
+                    'sentiment_method': sentiment_method,
                     'timestamp': request.headers.get('Kick-Event-Message-Timestamp') # başlıklardan zaman damgasını al
                 })
 
@@ -220,15 +370,10 @@ async def receive_twitch_message(payload: TwitchMessagePayload):
     print("\n--- twitch mesajı alındı ---")
     print(f"alınan yük: {payload.dict()}")
 
-    # duygu analizi yap (vader)
-    vs = analyzer.polarity_scores(payload.message)
-    sentiment_label = "neutral"
-    if vs['compound'] >= 0.05:
-        sentiment_label = "positive"
-    elif vs['compound'] <= -0.05:
-        sentiment_label = "negative"
+    # duygu analizi yap (mikro-toplu model; gecikirse doğrudan vader)
+    sentiment_label, compound, sentiment_method = await sentiment_batcher.score(payload.message)
     
-    print(f"twitch mesajı: '{payload.message}' | duygu: {sentiment_label} ({vs['compound']:.4f})")
+    print(f"twitch mesajı: '{payload.message}' | duygu: {sentiment_label} ({compound:.4f})")
 
     twitch_chat_messages.append({
         "timestamp": payload.timestamp,
@@ -236,7 +381,8 @@ async def receive_twitch_message(payload: TwitchMessagePayload):
         "message": payload.message,
         "channel": payload.channel,
         "sentiment_label": sentiment_label,
-        "sentiment_score": vs['compound']
+        "sentiment_score": compound,
+        "sentiment_method": sentiment_method
     })
 
     if len(twitch_chat_messages) > MAX_TWITCH_MESSAGES:
@@ -244,6 +390,11 @@ async def receive_twitch_message(payload: TwitchMessagePayload):
 
     return {"status": "success", "message": "twitch mesajı alındı ve işlendi"}
 
+@app.get('/sentiment_batcher_stats')
+async def sentiment_batcher_stats():
+    """mikro-toplu zamanlayıcının gecikme (p50/p99), toplu boyut ve yedeğe düşme sayılarını döndürür."""
+    return sentiment_batcher.stats()
+
 @app.get('/get_twitch_messages') # zaman uyumsuz eklendi
 async def get_twitch_messages():
     """saklanan twitch mesajlarının bir listesini döndürür."""
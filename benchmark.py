@@ -0,0 +1,209 @@
+# Throughput benchmark for the sentiment methods, topic modeling and content suggestions
+#
+# Usage:
+#   python benchmark.py                                     # every method, 1k/10k/100k/1M rows
+#   python benchmark.py --methods vader textblob --sizes 1000 10000 --output bench_results/base.json
+#   python benchmark.py --compare bench_results/base.json   # print speed/memory changes vs. a run
+#   python benchmark.py --methods --sizes 1000000 --topic-corpus-formats list csr mm   # topic corpus layouts
+#
+# Inputs are data/labeled_data/*.csv upsampled (with replacement) to each size. Every
+# (case, size) pair runs in a fresh process so peak RSS belongs to that case alone; models are
+# loaded and warmed up before timing starts. Results are written as JSON. Topic cases run once per
+# corpus format (case names get a "[format]" suffix when several are given); 'topic_corpus' times
+# building the Dictionary and BoW corpus alone, from already preprocessed messages.
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_BATCH_SIZE = 10_000 # Rows per timed run_sentiment_analysis call (latency percentiles are per batch)
+DEFAULT_OUTPUT_DIR = "bench_results"
+WARMUP_ROWS = 100
+TOPIC_CASES = ('topic_corpus', 'topic_modeling', 'content_suggestions')
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024 # bytes on macOS, KiB on Linux
+
+
+def make_input(size: int, make_unique: bool = False, seed: int = 42) -> pd.DataFrame:
+    """data/labeled_data upsampled to `size` rows ('message' and 'label' columns)."""
+    import analysis
+
+    labeled_df = analysis.load_labeled_data()
+    if labeled_df.empty:
+        raise RuntimeError(f"No labeled data found in {os.path.abspath(analysis.LABELED_DATA_DIR)}.")
+    sample = labeled_df.sample(n=size, replace=True, random_state=seed).reset_index(drop=True)
+    if make_unique:
+        # Defeats duplicate collapsing and the sentiment cache so every row reaches the model
+        sample['message'] = sample['message'].astype(str) + " " + sample.index.astype(str)
+    return sample[['message', 'label']]
+
+
+def _run_case(case: str, size: int, batch_size: int, make_unique: bool, use_cache: bool) -> dict:
+    """Runs one benchmark case in the current (fresh) process and returns its measurements."""
+    os.environ["KICK_SENTIMENT_CACHE"] = "1" if use_cache else "0"
+    import analysis
+
+    analysis.SENTIMENT_CACHE_ENABLED = use_cache
+    analysis.TOPIC_MODEL_CACHE_ENABLED = False # Topic cases always measure training
+    data = make_input(size, make_unique)
+    baseline_rss = _peak_rss_mb()
+    result = {'case': case, 'size': size, 'unique_messages': int(data['message'].nunique()), 'status': 'ok'}
+    topic_case, _, corpus_format = case.partition('[')
+
+    if topic_case in TOPIC_CASES:
+        analysis.TOPIC_CORPUS_FORMAT = corpus_format.rstrip(']') or analysis.TOPIC_CORPUS_FORMAT
+        result['topic_corpus_format'] = analysis.TOPIC_CORPUS_FORMAT
+        if topic_case == 'topic_corpus':
+            # Preprocessing is not timed and belongs to the baseline
+            processed_docs = [doc for doc in analysis.preprocess_messages(data['message']) if doc]
+            baseline_rss = _peak_rss_mb()
+            start = time.perf_counter()
+            dictionary = analysis.corpora.Dictionary(processed_docs)
+            corpus, corpus_path = analysis.build_topic_corpus(processed_docs, dictionary)
+            latencies = [time.perf_counter() - start]
+            result['corpus_rss_mb'] = _peak_rss_mb() - baseline_rss
+            analysis._remove_corpus_file(corpus_path)
+        elif topic_case == 'content_suggestions':
+            # Prerequisites are computed first and not timed
+            data['sentiment'] = analysis.run_sentiment_analysis(data['message'], method='vader')
+            _, topics, _, _ = analysis.perform_topic_modeling(data['message'], num_topics=4)
+            start = time.perf_counter()
+            analysis.generate_content_suggestions(data, topics or {})
+        else:
+            start = time.perf_counter()
+            analysis.perform_topic_modeling(data['message'], num_topics=4)
+        latencies = [time.perf_counter() - start]
+    else:
+        warmup_start = time.perf_counter()
+        warmup = analysis.run_sentiment_analysis(data['message'].head(WARMUP_ROWS), method=case) # Loads the model
+        result['warmup_seconds'] = time.perf_counter() - warmup_start
+        if len(warmup) == 0 or (warmup == 'unknown').all():
+            result['status'] = 'unavailable' # Model could not be loaded in this environment
+            return result
+        latencies = []
+        for start_row in range(0, size, batch_size):
+            batch = data['message'].iloc[start_row:start_row + batch_size]
+            start = time.perf_counter()
+            analysis.run_sentiment_analysis(batch, method=case)
+            latencies.append(time.perf_counter() - start)
+
+    total_seconds = float(sum(latencies))
+    result.update({
+        'batches': len(latencies),
+        'total_seconds': total_seconds,
+        'messages_per_second': size / total_seconds if total_seconds > 0 else None,
+        'batch_latency_p50_seconds': float(np.percentile(latencies, 50)),
+        'batch_latency_p95_seconds': float(np.percentile(latencies, 95)),
+        'baseline_rss_mb': baseline_rss,
+        'peak_rss_mb': _peak_rss_mb(),
+        'peak_children_rss_mb': _peak_rss_mb(resource.RUSAGE_CHILDREN), # Lexicon process-pool workers
+    })
+    return result
+
+
+def run_case_isolated(case: str, size: int, batch_size: int, make_unique: bool, use_cache: bool) -> dict:
+    """Runs a case in a freshly spawned process so its peak RSS is not inflated by earlier cases."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        try:
+            return executor.submit(_run_case, case, size, batch_size, make_unique, use_cache).result()
+        except Exception as e:
+            return {'case': case, 'size': size, 'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare_runs(current: dict, previous: dict) -> None:
+    """Prints throughput and peak-RSS changes for every (case, size) present in both runs."""
+    previous_results = {(r['case'], r['size']): r for r in previous.get('results', [])}
+    print(f"\nComparison with {previous.get('git_commit', '?')} ({previous.get('created', '?')}):")
+    for result in current['results']:
+        before = previous_results.get((result['case'], result['size']))
+        if not before or result.get('status') != 'ok' or before.get('status') != 'ok':
+            continue
+        speedup = result['messages_per_second'] / before['messages_per_second'] if before['messages_per_second'] else float('nan')
+        print(f"  {result['case']:<22} {result['size']:>9}: {speedup:6.2f}x msgs/s | "
+              f"peak RSS {before['peak_rss_mb']:.0f} -> {result['peak_rss_mb']:.0f} MB")
+
+
+def parse_args(argv=None):
+    import analysis
+
+    parser = argparse.ArgumentParser(description="Benchmark sentiment methods, topic modeling and content suggestions.")
+    parser.add_argument("--methods", nargs="*", default=analysis.SUPPORTED_SENTIMENT_METHODS,
+                        help="Sentiment methods to benchmark (default: all; none runs only the topic cases)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="Input sizes in rows")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help=f"Rows per timed batch (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--skip-topics", action="store_true", help="Skip topic modeling and content suggestions")
+    parser.add_argument("--topic-corpus-formats", nargs="+", default=[analysis.TOPIC_CORPUS_FORMAT],
+                        choices=analysis.TOPIC_CORPUS_FORMATS, help="Corpus layouts for the topic cases (default: %(default)s)")
+    parser.add_argument("--make-unique", action="store_true",
+                        help="Append the row number to every message so duplicate collapsing cannot help")
+    parser.add_argument("--use-cache", action="store_true", help="Keep the persistent sentiment cache enabled")
+    parser.add_argument("--output", default=None, help=f"Output JSON (default: {DEFAULT_OUTPUT_DIR}/benchmark-<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier benchmark JSON to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    topic_cases = list(TOPIC_CASES) if len(args.topic_corpus_formats) == 1 else \
+        [f"{case}[{corpus_format}]" for case in TOPIC_CASES for corpus_format in args.topic_corpus_formats]
+    if len(args.topic_corpus_formats) == 1:
+        os.environ["KICK_TOPIC_CORPUS_FORMAT"] = args.topic_corpus_formats[0] # Read by analysis in each spawned case
+    cases = list(args.methods) + ([] if args.skip_topics else topic_cases)
+    report = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': {'sizes': args.sizes, 'batch_size': args.batch_size, 'make_unique': args.make_unique,
+                   'use_cache': args.use_cache, 'topic_corpus_formats': args.topic_corpus_formats},
+        'results': [],
+    }
+
+    for size in args.sizes:
+        for case in cases:
+            print(f"Benchmarking {case} on {size} messages...", flush=True)
+            result = run_case_isolated(case, size, args.batch_size, args.make_unique, args.use_cache)
+            report['results'].append(result)
+            if result['status'] == 'ok':
+                print(f"  {result['messages_per_second']:.0f} msgs/s | batch p50 {result['batch_latency_p50_seconds']:.3f}s "
+                      f"p95 {result['batch_latency_p95_seconds']:.3f}s | peak RSS {result['peak_rss_mb']:.0f} MB")
+            else:
+                print(f"  {result['status']}: {result.get('error', 'model not available')}")
+
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare_runs(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
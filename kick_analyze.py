@@ -0,0 +1,178 @@
+# kick-analyze: headless batch analysis of Kick chat logs (no Streamlit/browser session needed)
+#
+# Usage:
+#   python kick_analyze.py                                   # every data/live-kick-data-*.csv
+#   python kick_analyze.py "logs/*.csv" --method custom_kick_bert --workers 4 --format json
+#
+# Each input CSV is analyzed in its own worker process. For every file the output directory gets
+# <name>.sentiment.<parquet|json> (one row per message with its sentiment label and scores) and
+# <name>.summary.json (sentiment counts, topics, coherence and content suggestions); a run-wide
+# summary.json lists all files.
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+DEFAULT_INPUT_PATTERN = os.path.join("data", "live-kick-data-*.csv")
+DEFAULT_OUTPUT_DIR = os.path.join("data", "batch_results")
+DEFAULT_METHOD = "vader"
+DEFAULT_NUM_TOPICS = 4 # Same as the dashboard
+
+
+def _init_worker(threads_per_worker: int) -> None:
+    """Pool initializer: splits CPU threads between workers before torch is (lazily) imported."""
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads_per_worker))
+    os.environ.setdefault("MKL_NUM_THREADS", str(threads_per_worker))
+    import analysis
+    analysis.LEXICON_PARALLEL_WORKERS = threads_per_worker # Files are already spread across processes
+    analysis.TOKEN_CACHE_WORKERS = threads_per_worker
+    analysis.LDA_WORKERS = threads_per_worker
+
+
+def _topics_to_json(topics: dict) -> dict:
+    return {str(topic_id): [{"word": word, "weight": float(weight)} for word, weight in words]
+            for topic_id, words in (topics or {}).items()}
+
+
+def analyze_file(path: str, method: str, output_dir: str, output_format: str, num_topics: int, skip_topics: bool,
+                 coherence_mode: str = "c_v") -> dict:
+    """Runs sentiment, topic modeling and content suggestions for one chat log and writes the results."""
+    import analysis
+
+    start_time = time.time()
+    name = os.path.splitext(os.path.basename(path))[0]
+    columns = pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns
+    text_column = analysis._detect_text_column(pd.DataFrame(columns=columns))
+
+    df = pd.concat(list(analysis.iter_sentiment_analysis(path, method=method, text_column=text_column,
+                                                         include_scores=True)), ignore_index=True)
+    df = df.rename(columns={"content": "message"})
+    sentiment_seconds = time.time() - start_time
+
+    token_cache = analysis.TokenCache() # Shared by topic modeling, coherence and suggestions
+    topics, coherence, topic_seconds = {}, None, 0.0
+    if not skip_topics and not df.empty:
+        token_cache.fill(df["message"])
+        _, topics, coherence, topic_seconds = analysis.perform_topic_modeling(df["message"], num_topics=num_topics,
+                                                                              token_cache=token_cache,
+                                                                              coherence_mode=coherence_mode)
+    suggestions = analysis.generate_content_suggestions(df, topics or {}, token_cache=token_cache)
+
+    os.makedirs(output_dir, exist_ok=True)
+    if output_format == "parquet":
+        sentiment_path = os.path.join(output_dir, f"{name}.sentiment.parquet")
+        df.to_parquet(sentiment_path, index=False)
+    else:
+        sentiment_path = os.path.join(output_dir, f"{name}.sentiment.json")
+        df.to_json(sentiment_path, orient="records", force_ascii=False, lines=True)
+
+    summary = {
+        "file": path,
+        "method": method,
+        "messages": int(len(df)),
+        "sentiment_counts": {label: int(count) for label, count in df["sentiment"].value_counts().items()},
+        "topics": _topics_to_json(topics),
+        "coherence": None if coherence is None else float(coherence),
+        "coherence_mode": coherence_mode,
+        "coherence_ci": analysis.last_coherence_report.get("ci"),
+        "vocabulary": dict(analysis.last_vocabulary_report),
+        "suggestions": suggestions,
+        "sentiment_output": sentiment_path,
+        "token_cache": token_cache.stats(),
+        "timings_seconds": {
+            "sentiment": sentiment_seconds,
+            "topic_modeling": topic_seconds or 0.0,
+            "total": time.time() - start_time,
+        },
+    }
+    with open(os.path.join(output_dir, f"{name}.summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+def _parquet_available() -> bool:
+    for engine in ("pyarrow", "fastparquet"):
+        try:
+            __import__(engine)
+            return True
+        except ImportError:
+            continue
+    return False
+
+
+def parse_args(argv=None):
+    import analysis
+
+    parser = argparse.ArgumentParser(prog="kick-analyze", description="Batch sentiment/topic analysis of Kick chat CSV logs.")
+    parser.add_argument("inputs", nargs="*", default=[DEFAULT_INPUT_PATTERN],
+                        help=f"CSV files or glob patterns (default: {DEFAULT_INPUT_PATTERN})")
+    parser.add_argument("--method", default=DEFAULT_METHOD, choices=analysis.SUPPORTED_SENTIMENT_METHODS,
+                        help=f"Sentiment method (default: {DEFAULT_METHOD})")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help=f"Output directory (default: {DEFAULT_OUTPUT_DIR})")
+    parser.add_argument("--format", dest="output_format", default="parquet", choices=["parquet", "json"],
+                        help="Per-message output format (default: parquet)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per file, up to the CPU count)")
+    parser.add_argument("--num-topics", type=int, default=DEFAULT_NUM_TOPICS, help=f"LDA topics per file (default: {DEFAULT_NUM_TOPICS})")
+    parser.add_argument("--coherence", dest="coherence_mode", default="c_v", choices=["c_v", "u_mass", "c_v_sampled"],
+                        help="Topic coherence measure (default: c_v; u_mass and c_v_sampled are faster)")
+    parser.add_argument("--skip-topics", action="store_true", help="Only run sentiment analysis")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    import analysis
+
+    args = parse_args(argv)
+    files = sorted({path for pattern in args.inputs for path in (glob.glob(pattern) or ([pattern] if os.path.isfile(pattern) else []))})
+    if not files:
+        print(f"No input files matched: {', '.join(args.inputs)}", file=sys.stderr)
+        return 1
+    if args.output_format == "parquet" and not _parquet_available():
+        print("Parquet output needs pyarrow (`pip install pyarrow`); use --format json otherwise.", file=sys.stderr)
+        return 1
+
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(args.workers or cpu_count, len(files)))
+    threads_per_worker = max(1, cpu_count // workers)
+    print(f"Analyzing {len(files)} file(s) with method '{args.method}' using {workers} worker process(es)...")
+
+    start_time = time.time()
+    summaries, failures = [], []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=analysis.PROCESS_POOL_CONTEXT,
+                             initializer=_init_worker, initargs=(threads_per_worker,)) as executor:
+        futures = {executor.submit(analyze_file, path, args.method, args.output_dir, args.output_format,
+                                   args.num_topics, args.skip_topics, args.coherence_mode): path for path in files}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                failures.append({"file": path, "error": f"{type(e).__name__}: {e}"})
+                print(f"[failed] {path}: {e}", file=sys.stderr)
+                continue
+            summaries.append(summary)
+            print(f"[done] {path}: {summary['messages']} messages in {summary['timings_seconds']['total']:.2f} seconds")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    run_summary = {
+        "method": args.method,
+        "workers": workers,
+        "duration_seconds": time.time() - start_time,
+        "files": sorted(summaries, key=lambda summary: summary["file"]),
+        "failures": failures,
+    }
+    with open(os.path.join(args.output_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(run_summary, f, ensure_ascii=False, indent=2)
+    print(f"Finished {len(summaries)}/{len(files)} file(s) in {run_summary['duration_seconds']:.2f} seconds; "
+          f"results in {args.output_dir}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
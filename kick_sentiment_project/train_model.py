@@ -6,7 +6,222 @@ import evaluate
 import numpy as np
 import os # dosya yollarını kontrol etmek için
 import glob # tüm csv dosyalarını bulmak için
+import time # onnx hız karşılaştırması için
+import argparse
+import copy # öğrenci model yapılandırması için
 import torch
+import torch.nn.functional as F
+
+parser = argparse.ArgumentParser(description="kick sohbet duygu modelini eğitir ve onnx olarak dışa aktarır.")
+parser.add_argument("--export-onnx-only", action="store_true",
+                    help="eğitimi atla, kayıtlı modeli onnx (fp32 + int8) olarak dışa aktar ve doğruluğu karşılaştır")
+parser.add_argument("--skip-onnx", action="store_true", help="eğitimden sonra onnx dışa aktarımını atla")
+parser.add_argument("--distill", action="store_true",
+                    help="eğitimi atla, kayıtlı modeli öğretmen olarak kullanıp küçük bir öğrenci modeli damıt")
+parser.add_argument("--student-layers", type=int, default=2, help="öğrenci bert modelindeki katman sayısı (varsayılan: 2)")
+parser.add_argument("--distill-epochs", type=int, default=3, help="damıtma epoch sayısı (varsayılan: 3)")
+parser.add_argument("--distill-temperature", type=float, default=2.0, help="yumuşak etiket sıcaklığı (varsayılan: 2.0)")
+args = parser.parse_args()
+
+output_model_dir = "model/finetuned_kick_sentiment"
+onnx_output_dir = "model/finetuned_kick_sentiment_onnx" # analysis.py bu dizini okur
+ONNX_ACCURACY_TOLERANCE = 0.01 # int8 modelin kaybetmesine izin verilen en fazla doğruluk (1 puan)
+student_output_dir = "model/distilled_kick_sentiment_student" # analysis.py bu dizini okur ('custom_kick_student')
+live_data_pattern = "../data/live-kick-data-*.csv" # damıtma için etiketsiz canlı sohbet kayıtları
+DISTILL_MAX_LENGTH = 128     # sohbet mesajları kısa; öğretmen ve öğrenci için kesme uzunluğu
+DISTILL_BATCH_SIZE = 32
+DISTILL_LEARNING_RATE = 5e-5
+DISTILL_ALPHA = 0.7          # kayıp = alpha * yumuşak etiket kaybı + (1 - alpha) * gerçek etiket kaybı (etiketli mesajlarda)
+
+def export_onnx(model_dir, onnx_dir):
+    """kayıtlı modeli onnx grafiğine ve dinamik olarak nicelenmiş int8 sürümüne dönüştürür."""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    print(f"--- onnx dışa aktarımı başlıyor: {model_dir} -> {onnx_dir} ---")
+    export_model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    export_model.eval()
+    export_tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    os.makedirs(onnx_dir, exist_ok=True)
+
+    dummy = export_tokenizer(["örnek sohbet mesajı", "gg"], padding=True, return_tensors="pt")
+    # bert forward() sırası: input_ids, attention_mask, token_type_ids
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    fp32_path = os.path.join(onnx_dir, "model.onnx")
+    int8_path = os.path.join(onnx_dir, "model.int8.onnx")
+    with torch.no_grad():
+        torch.onnx.export(export_model, tuple(dummy[name] for name in input_names), fp32_path,
+                          input_names=input_names, output_names=["logits"],
+                          dynamic_axes=dynamic_axes, opset_version=14)
+    print(f"fp32 onnx grafiği kaydedildi: {fp32_path}")
+
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"int8 (dinamik nicelenmiş) onnx grafiği kaydedildi: {int8_path}")
+
+    # etiket eşlemesi (id2label) ve tokenizer grafikle birlikte taşınır
+    export_tokenizer.save_pretrained(onnx_dir)
+    export_model.config.save_pretrained(onnx_dir)
+    return fp32_path, int8_path
+
+def predict_torch(model_dir, texts, batch_size=64):
+    """pytorch fp32 modeliyle tahmin edilen sınıf kimliklerini ve süreyi döndürür."""
+    eval_model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    eval_model.eval()
+    eval_tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    predictions = []
+    start = time.time()
+    with torch.no_grad():
+        for i in range(0, len(texts), batch_size):
+            batch = eval_tokenizer(texts[i:i + batch_size], padding=True, truncation=True, max_length=512, return_tensors="pt")
+            predictions.extend(eval_model(**batch).logits.argmax(dim=-1).tolist())
+    return np.array(predictions), time.time() - start
+
+def predict_onnx(onnx_path, tokenizer_dir, texts, batch_size=64):
+    """onnx runtime ile tahmin edilen sınıf kimliklerini ve süreyi döndürür."""
+    import onnxruntime as ort
+    session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    input_names = [model_input.name for model_input in session.get_inputs()]
+    eval_tokenizer = AutoTokenizer.from_pretrained(tokenizer_dir)
+    predictions = []
+    start = time.time()
+    for i in range(0, len(texts), batch_size):
+        batch = eval_tokenizer(texts[i:i + batch_size], padding=True, truncation=True, max_length=512, return_tensors="np")
+        feed = {name: batch[name].astype(np.int64) for name in input_names}
+        predictions.extend(session.run(None, feed)[0].argmax(axis=-1).tolist())
+    return np.array(predictions), time.time() - start
+
+def check_onnx_accuracy(model_dir, onnx_dir, texts, label_ids):
+    """fp32 pytorch, fp32 onnx ve int8 onnx modellerinin doğruluğunu ve hızını karşılaştırır."""
+    print(f"\n--- onnx doğruluk kontrolü ({len(texts)} ayrılmış test mesajı) ---")
+    label_ids = np.asarray(label_ids)
+    results = {}
+    results["pytorch fp32"] = predict_torch(model_dir, texts)
+    results["onnx fp32"] = predict_onnx(os.path.join(onnx_dir, "model.onnx"), onnx_dir, texts)
+    results["onnx int8"] = predict_onnx(os.path.join(onnx_dir, "model.int8.onnx"), onnx_dir, texts)
+
+    accuracies = {}
+    for name, (predictions, duration) in results.items():
+        accuracies[name] = float((predictions == label_ids).mean())
+        print(f"  {name:<13} doğruluk: {accuracies[name]:.4f} | süre: {duration:.2f} s | {len(texts) / max(duration, 1e-9):.1f} mesaj/s")
+
+    drop = accuracies["pytorch fp32"] - accuracies["onnx int8"]
+    speedup = results["pytorch fp32"][1] / max(results["onnx int8"][1], 1e-9)
+    print(f"  int8 hızlanma: {speedup:.2f}x | doğruluk kaybı: {drop * 100:.2f} puan")
+    if drop > ONNX_ACCURACY_TOLERANCE:
+        print(f"uyarı: int8 model {ONNX_ACCURACY_TOLERANCE * 100:.0f} puandan fazla doğruluk kaybediyor. analysis.py için KICK_ONNX_MODEL_FILE=model.onnx kullanmayı düşünün.")
+    return accuracies
+
+def load_unlabeled_live_texts(pattern):
+    """canlı sohbet csv'lerindeki benzersiz, boş olmayan mesajları döndürür (etiketsiz damıtma verisi)."""
+    texts = []
+    for file_path in sorted(glob.glob(pattern)):
+        live_df = pd.read_csv(file_path, encoding="utf-8-sig")
+        text_column = "message" if "message" in live_df.columns else "content" if "content" in live_df.columns else None
+        if text_column is None:
+            print(f"uyarı: {os.path.basename(file_path)} içinde 'message' veya 'content' sütunu yok. atlanıyor.")
+            continue
+        texts.extend(live_df[text_column].dropna().astype(str).str.strip().tolist())
+    return list(dict.fromkeys(text for text in texts if text))
+
+def teacher_soft_labels(teacher, teacher_tokenizer, texts, temperature, batch_size=64):
+    """öğretmen modelin sıcaklıkla yumuşatılmış sınıf olasılıklarını döndürür."""
+    teacher.eval()
+    soft_labels = []
+    with torch.no_grad():
+        for i in range(0, len(texts), batch_size):
+            batch = teacher_tokenizer(texts[i:i + batch_size], padding=True, truncation=True,
+                                      max_length=DISTILL_MAX_LENGTH, return_tensors="pt")
+            soft_labels.append(torch.softmax(teacher(**batch).logits / temperature, dim=-1))
+    return torch.cat(soft_labels)
+
+def build_student(teacher, num_layers):
+    """öğretmenin eşit aralıklı seçilen katmanlarıyla başlatılmış, daha az katmanlı bir bert öğrenci oluşturur."""
+    student_config = copy.deepcopy(teacher.config)
+    student_config.num_hidden_layers = num_layers
+    student = AutoModelForSequenceClassification.from_config(student_config)
+
+    teacher_layers = np.linspace(0, teacher.config.num_hidden_layers - 1, num_layers).round().astype(int)
+    layer_map = {f".encoder.layer.{t}.": f".encoder.layer.{s}." for s, t in enumerate(teacher_layers)}
+    student_state = {}
+    for key, value in teacher.state_dict().items():
+        if ".encoder.layer." not in key:
+            student_state[key] = value # gömme katmanı, pooler ve sınıflandırıcı aynen kopyalanır
+            continue
+        for teacher_prefix, student_prefix in layer_map.items():
+            if teacher_prefix in key:
+                student_state[key.replace(teacher_prefix, student_prefix)] = value
+    missing, _ = student.load_state_dict(student_state, strict=False)
+    if missing:
+        print(f"uyarı: öğretmenden kopyalanamayan öğrenci ağırlıkları: {missing}")
+    print(f"öğrenci modeli öğretmenin {teacher_layers.tolist()} numaralı katmanlarıyla başlatıldı.")
+    return student
+
+def distill_student(teacher_dir, student_dir, train_texts, train_labels, test_texts, test_labels,
+                    num_layers, epochs, temperature):
+    """öğretmenin yumuşak etiketleriyle (etiketli eğitim bölümü + etiketsiz canlı sohbet) küçük bir öğrenci eğitir."""
+    print(f"--- damıtma başlıyor: öğretmen {teacher_dir} -> {num_layers} katmanlı öğrenci {student_dir} ---")
+    teacher = AutoModelForSequenceClassification.from_pretrained(teacher_dir)
+    teacher_tokenizer = AutoTokenizer.from_pretrained(teacher_dir)
+
+    live_texts = load_unlabeled_live_texts(live_data_pattern)
+    transfer_texts = list(train_texts) + live_texts
+    # canlı mesajların gerçek etiketi yok (-100: çapraz entropi kaybında yok sayılır)
+    hard_labels = torch.tensor(list(train_labels) + [-100] * len(live_texts))
+    print(f"aktarım kümesi: {len(train_texts)} etiketli + {len(live_texts)} etiketsiz canlı mesaj")
+
+    start = time.time()
+    soft_labels = teacher_soft_labels(teacher, teacher_tokenizer, transfer_texts, temperature)
+    print(f"öğretmen yumuşak etiketleri hesaplandı ({time.time() - start:.2f} s)")
+
+    student = build_student(teacher, num_layers)
+    del teacher # öğretmen artık gerekli değil, belleği boşalt
+    train_device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    student.to(train_device)
+    optimizer = torch.optim.AdamW(student.parameters(), lr=DISTILL_LEARNING_RATE)
+    rng = np.random.default_rng(42)
+
+    for epoch in range(epochs):
+        student.train()
+        order = rng.permutation(len(transfer_texts))
+        epoch_loss, batches = 0.0, 0
+        for i in range(0, len(order), DISTILL_BATCH_SIZE):
+            batch_ids = torch.as_tensor(order[i:i + DISTILL_BATCH_SIZE])
+            batch = teacher_tokenizer([transfer_texts[j] for j in batch_ids.tolist()], padding=True, truncation=True,
+                                      max_length=DISTILL_MAX_LENGTH, return_tensors="pt").to(train_device)
+            logits = student(**batch).logits
+            # hinton damıtma kaybı: sıcaklıkla yumuşatılmış dağılımlar arası kl, t^2 ile ölçeklenir
+            loss = DISTILL_ALPHA * F.kl_div(F.log_softmax(logits / temperature, dim=-1),
+                                            soft_labels[batch_ids].to(train_device),
+                                            reduction="batchmean") * temperature ** 2
+            batch_hard_labels = hard_labels[batch_ids].to(train_device)
+            if (batch_hard_labels != -100).any():
+                loss = loss + (1 - DISTILL_ALPHA) * F.cross_entropy(logits, batch_hard_labels, ignore_index=-100)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            epoch_loss += loss.item()
+            batches += 1
+        print(f"  epoch {epoch + 1}/{epochs} - ortalama kayıp: {epoch_loss / max(batches, 1):.4f}")
+
+    os.makedirs(student_dir, exist_ok=True)
+    student.save_pretrained(student_dir)
+    teacher_tokenizer.save_pretrained(student_dir)
+    print(f"öğrenci modeli {student_dir} dizinine kaydedildi.")
+
+    # ayrılmış test bölümünde öğretmen ve öğrenciyi karşılaştır
+    print(f"\n--- damıtma doğruluk kontrolü ({len(test_texts)} ayrılmış test mesajı) ---")
+    test_labels = np.asarray(test_labels)
+    report = {}
+    for name, model_dir in (("öğretmen", teacher_dir), ("öğrenci", student_dir)):
+        predictions, duration = predict_torch(model_dir, test_texts)
+        report[name] = (float((predictions == test_labels).mean()), len(test_texts) / max(duration, 1e-9))
+        print(f"  {name:<9} doğruluk: {report[name][0]:.4f} | {report[name][1]:.1f} mesaj/s")
+    print(f"  öğrenci hızlanma: {report['öğrenci'][1] / max(report['öğretmen'][1], 1e-9):.2f}x | "
+          f"doğruluk farkı: {(report['öğretmen'][0] - report['öğrenci'][0]) * 100:.2f} puan")
+    print("tüm etiketli veri üzerinde karşılaştırma için: analysis.evaluate_sentiment_method('custom_kick_student')")
+    return report
 
 print("--- train_model.py (dinamik csv yükleme ile) başlıyor ---")
 
@@ -99,6 +314,27 @@ print(f"veri kümesi oluşturuldu. özellikler: {dataset.features}")
 dataset = dataset.train_test_split(test_size=0.2, seed=42) # tekrarlanabilirlik için tohum eklendi
 print(f"veri kümesi bölündü. eğitim boyutu: {len(dataset['train'])}, test boyutu: {len(dataset['test'])}")
 
+# yalnızca dışa aktarım: kayıtlı modeli onnx'e çevir ve aynı ayrılmış test bölümünde karşılaştır
+if args.export_onnx_only:
+    if not os.path.exists(output_model_dir):
+        print(f"kayıtlı model bulunamadı: {os.path.abspath(output_model_dir)}. önce modeli eğitin.")
+        exit()
+    export_onnx(output_model_dir, onnx_output_dir)
+    check_onnx_accuracy(output_model_dir, onnx_output_dir, dataset["test"]["text"], dataset["test"]["labels"])
+    print("--- train_model.py bitti (yalnızca onnx dışa aktarımı) ---")
+    exit()
+
+# damıtma: kayıtlı ince ayarlı model öğretmen, küçük bert öğrenci aynı ayrılmış test bölümünde değerlendirilir
+if args.distill:
+    if not os.path.exists(output_model_dir):
+        print(f"öğretmen model bulunamadı: {os.path.abspath(output_model_dir)}. önce modeli eğitin.")
+        exit()
+    distill_student(output_model_dir, student_output_dir, dataset["train"]["text"], dataset["train"]["labels"],
+                    dataset["test"]["text"], dataset["test"]["labels"], num_layers=args.student_layers,
+                    epochs=args.distill_epochs, temperature=args.distill_temperature)
+    print("--- train_model.py bitti (damıtma) ---")
+    exit()
+
 # tokenizer ve model yükle
 model_name = "dbmdz/bert-base-turkish-cased"
 print(f"tokenizer yükleniyor: {model_name}...")
@@ -163,11 +399,15 @@ trainer.train()
 print("--- model eğitimi tamamlandı ---")
 
 # modeli kaydet
-output_model_dir = "model/finetuned_kick_sentiment"
 print(f"model {output_model_dir} dizinine kaydediliyor...")
 trainer.save_model(output_model_dir)
 print(f"tokenizer {output_model_dir} dizinine kaydediliyor...")
 tokenizer.save_pretrained(output_model_dir)
 
 print(f"--- model ve tokenizer {output_model_dir} dizinine kaydedildi ---")
+
+# onnx (fp32 + int8) dışa aktarımı ve doğruluk karşılaştırması
+if not args.skip_onnx:
+    export_onnx(output_model_dir, onnx_output_dir)
+    check_onnx_accuracy(output_model_dir, onnx_output_dir, dataset["test"]["text"], dataset["test"]["labels"])
 print("--- train_model.py bitti ---") 
\ No newline at end of file
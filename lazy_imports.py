@@ -0,0 +1,69 @@
+# Lazy imports for heavy optional dependencies
+#
+# torch, transformers, gensim, nltk and textblob each take a second or more to import. Modules
+# declare them with `lazy_import(...)` at the top and the real import only happens on the first
+# attribute access or call, so e.g. a VADER-only dashboard session never loads torch.
+
+import importlib
+import threading
+import time
+
+# module name -> seconds spent importing it (filled as lazy imports resolve)
+import_timings = {}
+_declared = []
+_lock = threading.Lock()
+
+
+class LazyImport:
+    """Stand-in for a module (or one attribute of a module) that is imported on first use."""
+
+    def __init__(self, module_name: str, attribute: str = None):
+        self._module_name = module_name
+        self._attribute = attribute
+        self._target = None
+
+    def _load(self):
+        if self._target is None:
+            with _lock:
+                if self._target is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._module_name)
+                    import_timings.setdefault(self._module_name, time.perf_counter() - start)
+                    self._target = getattr(module, self._attribute) if self._attribute else module
+        return self._target
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._target is not None
+
+    @property
+    def name(self) -> str:
+        return f"{self._module_name}.{self._attribute}" if self._attribute else self._module_name
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<LazyImport {self.name} ({state})>"
+
+
+def lazy_import(module_name: str, attribute: str = None) -> LazyImport:
+    """Declares a lazily imported module, or `attribute` of that module (a class or function)."""
+    proxy = LazyImport(module_name, attribute)
+    _declared.append(proxy)
+    return proxy
+
+
+def startup_report() -> dict:
+    """Which lazy dependencies have been imported so far and how long each import took."""
+    loaded = sorted({proxy._module_name for proxy in _declared if proxy.is_loaded})
+    pending = sorted({proxy._module_name for proxy in _declared} - set(loaded))
+    return {
+        "import_seconds": {name: import_timings.get(name, 0.0) for name in loaded},
+        "loaded": loaded,
+        "not_loaded": pending,
+    }
@@ -0,0 +1,357 @@
+# Compiled VADER / TextBlob lexicon scoring
+#
+# VADER's polarity_scores and TextBlob(text).sentiment build analyzer objects, re-lowercase the
+# same tokens several times and walk the full rule chain for every row, even though most Kick chat
+# lines (Turkish, emote spam) contain no lexicon word at all. The engines here score a whole batch:
+#
+#   1. duplicate messages are scored once,
+#   2. every distinct token of the batch is looked up once in a precompiled hash index
+#      (lowercased token -> valence / (polarity, subjectivity, intensity, is_modifier)),
+#   3. messages without a lexicon hit get the library's neutral score (0.0) directly,
+#   4. the remaining messages go through a port of the library rules (negation, boosters,
+#      ALL-CAPS emphasis, "but", idioms, "!", emoticons) that reads the precomputed lookups.
+#
+# Scores are identical to vaderSentiment's compound and TextBlob's PatternAnalyzer polarity
+# (test/lexicon_parity_check.py compares them on the bundled chat logs and edge cases). The
+# lexicons, rule constants and TextBlob's tokenizer are taken from the installed libraries, so the
+# engines follow whatever versions are installed.
+
+import functools
+import hashlib
+import re
+import string
+
+import numpy as np
+
+_RUN_PATTERN = re.compile(r'[^\W_]+') # Letter/digit runs; token boundaries are never part of a run
+
+
+@functools.lru_cache(maxsize=1)
+def engine_revision() -> str:
+    """Hash of this module's source, so cached lexicon scores are invalidated when the engine changes."""
+    with open(__file__, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+class VaderLexiconEngine:
+    """Batch VADER compound scorer with the same output as SentimentIntensityAnalyzer.polarity_scores."""
+
+    def __init__(self):
+        from vaderSentiment import vaderSentiment as vader
+
+        analyzer = vader.SentimentIntensityAnalyzer()
+        self.lexicon = analyzer.lexicon
+        self.emojis = analyzer.emojis
+        self.emoji_chars = frozenset(emoji for emoji in analyzer.emojis if len(emoji) == 1)
+        self.booster = vader.BOOSTER_DICT
+        self.negate = frozenset(vader.NEGATE)
+        self.special_cases = vader.SPECIAL_CASES
+        self.c_incr = vader.C_INCR
+        self.n_scalar = vader.N_SCALAR
+        self.normalize = vader.normalize
+
+    def _replace_emojis(self, text: str) -> str:
+        # Same character loop as polarity_scores (descriptions are space-separated from words)
+        pieces = []
+        prev_space = True
+        for char in text:
+            description = self.emojis.get(char)
+            if description is not None:
+                if not prev_space:
+                    pieces.append(' ')
+                pieces.append(description)
+                prev_space = False
+            else:
+                pieces.append(char)
+                prev_space = char == ' '
+        return ''.join(pieces).strip()
+
+    @staticmethod
+    def _tokens(text: str) -> list:
+        # SentiText._words_and_emoticons: strip punctuation unless that leaves 2 or fewer characters
+        tokens = []
+        for token in text.split():
+            stripped = token.strip(string.punctuation)
+            tokens.append(token if len(stripped) <= 2 else stripped)
+        return tokens
+
+    def compound(self, texts) -> np.ndarray:
+        """VADER compound scores (float64, rounded to 4 decimals like the library) for `texts`."""
+        scores = {}
+        vocabulary = {} # Lowercased token -> lexicon valence or None, shared by the whole batch
+        values = np.empty(len(texts), dtype=np.float64)
+        for position, text in enumerate(texts):
+            text = str(text)
+            value = scores.get(text)
+            if value is None:
+                prepared = self._replace_emojis(text) if not self.emoji_chars.isdisjoint(text) else text
+                words = self._tokens(prepared)
+                lowers = [word.lower() for word in words]
+                valences = []
+                for lower in lowers:
+                    if lower not in vocabulary:
+                        vocabulary[lower] = self.lexicon.get(lower)
+                    valences.append(vocabulary[lower])
+                if any(valence is not None for valence in valences):
+                    value = self._score(prepared, words, lowers, valences)
+                else:
+                    value = 0.0 # No lexicon word: polarity_scores returns a neutral compound
+                scores[text] = value
+            values[position] = value
+        return values
+
+    def _score(self, text: str, words: list, lowers: list, valences: list) -> float:
+        booster, lexicon, n_scalar = self.booster, self.lexicon, self.n_scalar
+        count = len(words)
+        allcaps = sum(1 for word in words if word.isupper())
+        is_cap_diff = 0 < count - allcaps < count
+
+        sentiments = []
+        for i, item in enumerate(words):
+            lower = lowers[i]
+            if lower in booster or (i < count - 1 and lower == "kind" and lowers[i + 1] == "of"):
+                sentiments.append(0)
+                continue
+            base = valences[i]
+            if base is None:
+                sentiments.append(0)
+                continue
+
+            valence = base
+            # "no" next to another lexicon word negates it instead of counting on its own
+            if lower == "no" and i != count - 1 and lowers[i + 1] in lexicon:
+                valence = 0.0
+            if (i > 0 and lowers[i - 1] == "no") or (i > 1 and lowers[i - 2] == "no") \
+                    or (i > 2 and lowers[i - 3] == "no" and lowers[i - 1] in ("or", "nor")):
+                valence = base * n_scalar
+            if item.isupper() and is_cap_diff:
+                valence = valence + self.c_incr if valence > 0 else valence - self.c_incr
+
+            for start_i in range(3):
+                previous = i - (start_i + 1)
+                if i > start_i and lowers[previous] not in lexicon:
+                    scalar = self._scalar_inc_dec(words[previous], lowers[previous], valence, is_cap_diff)
+                    if start_i == 1 and scalar != 0:
+                        scalar = scalar * 0.95
+                    if start_i == 2 and scalar != 0:
+                        scalar = scalar * 0.9
+                    valence = valence + scalar
+                    valence = self._negation_check(valence, lowers, start_i, i)
+                    if start_i == 2:
+                        valence = self._special_idioms_check(valence, lowers, i)
+
+            valence = self._least_check(valence, lowers, i)
+            sentiments.append(valence)
+
+        sentiments = self._but_check(lowers, sentiments)
+        sum_s = float(sum(sentiments))
+        punct_emph_amplifier = min(text.count("!"), 4) * 0.292
+        question_marks = text.count("?")
+        if question_marks > 1:
+            punct_emph_amplifier += question_marks * 0.18 if question_marks <= 3 else 0.96
+        if sum_s > 0:
+            sum_s += punct_emph_amplifier
+        elif sum_s < 0:
+            sum_s -= punct_emph_amplifier
+        return round(self.normalize(sum_s), 4)
+
+    def _scalar_inc_dec(self, word: str, lower: str, valence: float, is_cap_diff: bool) -> float:
+        scalar = 0.0
+        if lower in self.booster:
+            scalar = self.booster[lower]
+            if valence < 0:
+                scalar *= -1
+            if word.isupper() and is_cap_diff:
+                scalar = scalar + self.c_incr if valence > 0 else scalar - self.c_incr
+        return scalar
+
+    def _negated(self, lower: str) -> bool:
+        return lower in self.negate or "n't" in lower
+
+    def _negation_check(self, valence: float, lowers: list, start_i: int, i: int) -> float:
+        if start_i == 0:
+            if self._negated(lowers[i - 1]):
+                valence = valence * self.n_scalar
+        elif start_i == 1:
+            if lowers[i - 2] == "never" and (lowers[i - 1] == "so" or lowers[i - 1] == "this"):
+                valence = valence * 1.25
+            elif lowers[i - 2] == "without" and lowers[i - 1] == "doubt":
+                pass
+            elif self._negated(lowers[i - 2]):
+                valence = valence * self.n_scalar
+        else:
+            if lowers[i - 3] == "never" and (lowers[i - 2] == "so" or lowers[i - 2] == "this") or \
+                    (lowers[i - 1] == "so" or lowers[i - 1] == "this"):
+                valence = valence * 1.25
+            elif lowers[i - 3] == "without" and (lowers[i - 2] == "doubt" or lowers[i - 1] == "doubt"):
+                pass
+            elif self._negated(lowers[i - 3]):
+                valence = valence * self.n_scalar
+        return valence
+
+    def _special_idioms_check(self, valence: float, lowers: list, i: int) -> float:
+        special_cases, booster = self.special_cases, self.booster
+        onezero = f"{lowers[i - 1]} {lowers[i]}"
+        twoonezero = f"{lowers[i - 2]} {lowers[i - 1]} {lowers[i]}"
+        twoone = f"{lowers[i - 2]} {lowers[i - 1]}"
+        threetwoone = f"{lowers[i - 3]} {lowers[i - 2]} {lowers[i - 1]}"
+        threetwo = f"{lowers[i - 3]} {lowers[i - 2]}"
+        for sequence in (onezero, twoonezero, twoone, threetwoone, threetwo):
+            if sequence in special_cases:
+                valence = special_cases[sequence]
+                break
+        if len(lowers) - 1 > i:
+            zeroone = f"{lowers[i]} {lowers[i + 1]}"
+            if zeroone in special_cases:
+                valence = special_cases[zeroone]
+        if len(lowers) - 1 > i + 1:
+            zeroonetwo = f"{lowers[i]} {lowers[i + 1]} {lowers[i + 2]}"
+            if zeroonetwo in special_cases:
+                valence = special_cases[zeroonetwo]
+        for n_gram in (threetwoone, threetwo, twoone): # Booster bi-grams such as "sort of"
+            if n_gram in booster:
+                valence = valence + booster[n_gram]
+        return valence
+
+    def _least_check(self, valence: float, lowers: list, i: int) -> float:
+        if i > 1 and lowers[i - 1] not in self.lexicon and lowers[i - 1] == "least":
+            if lowers[i - 2] != "at" and lowers[i - 2] != "very":
+                valence = valence * self.n_scalar
+        elif i > 0 and lowers[i - 1] not in self.lexicon and lowers[i - 1] == "least":
+            valence = valence * self.n_scalar
+        return valence
+
+    @staticmethod
+    def _but_check(lowers: list, sentiments: list) -> list:
+        # Kept as in the library, including its value-based index() lookup, so scores stay identical
+        if 'but' in lowers:
+            bi = lowers.index('but')
+            for sentiment in sentiments:
+                si = sentiments.index(sentiment)
+                if si < bi:
+                    sentiments.pop(si)
+                    sentiments.insert(si, sentiment * 0.5)
+                elif si > bi:
+                    sentiments.pop(si)
+                    sentiments.insert(si, sentiment * 1.5)
+        return sentiments
+
+
+class TextBlobLexiconEngine:
+    """Batch TextBlob (pattern) polarity scorer with the same output as TextBlob(text).sentiment.polarity."""
+
+    def __init__(self):
+        from textblob import _text
+        from textblob.en import sentiment
+
+        if dict.__len__(sentiment) == 0: # The pattern lexicon is loaded lazily
+            sentiment.load()
+        self.tokenizer = sentiment.tokenizer
+        self.negations = frozenset(sentiment.negations)
+        # Word -> (polarity, subjectivity, intensity, is_modifier) for the untagged (None) sense
+        # that TextBlob uses for plain strings
+        self.index = {word: (*senses[None], any(modifier in senses for modifier in sentiment.modifiers))
+                      for word, senses in dict.items(sentiment) if None in senses}
+        self.punctuation = _text.PUNCTUATION
+        self.emoticons = {}
+        for (_, polarity), emoticons in _text.EMOTICONS.items(): # First match wins, as in the library
+            for emoticon in emoticons:
+                self.emoticons.setdefault(emoticon.lower(), polarity)
+
+        # Pre-filter: a message can only score if one of its letter/digit runs is an anchor run of
+        # a lexicon word, or if it contains an emoticon (its characters possibly space-separated)
+        self.contractions = re.compile('|'.join(re.escape(contraction) for contraction in _text.replacements))
+        quotes = set("'\"“”‘’")
+        self.anchors = set()
+        for word in self.index:
+            if word != word.lower() or any(char.isspace() or char in quotes for char in word):
+                continue # Tokens are lowercased and split on whitespace/quotes, so these never match
+            runs = _RUN_PATTERN.findall(word)
+            self.anchors.add(max(runs, key=len) if runs else word)
+        self.runless_words = [word for word in self.anchors if not _RUN_PATTERN.search(word)]
+        self.emoticon_pattern = re.compile('|'.join(
+            r'\s*'.join(re.escape(char) for char in emoticon)
+            for emoticon in sorted(self.emoticons, key=len, reverse=True) if not emoticon.isalpha()))
+
+    def _may_score(self, text: str) -> bool:
+        lowered = self.contractions.sub(lambda match: ' ' + match.group(0), text).lower()
+        if not self.anchors.isdisjoint(_RUN_PATTERN.findall(lowered)):
+            return True
+        if any(word in lowered for word in self.runless_words):
+            return True
+        return self.emoticon_pattern.search(text.lower()) is not None
+
+    def polarity(self, texts) -> np.ndarray:
+        """TextBlob polarity values (float64) for `texts`."""
+        scores = {}
+        values = np.empty(len(texts), dtype=np.float64)
+        for position, text in enumerate(texts):
+            text = str(text)
+            value = scores.get(text)
+            if value is None:
+                value = self._score(text) if self._may_score(text) else 0.0
+                scores[text] = value
+            values[position] = value
+        return values
+
+    def _score(self, text: str) -> float:
+        index, negations, emoticons, punctuation = self.index, self.negations, self.emoticons, self.punctuation
+        assessments = [] # [polarity, subjectivity, intensity, negated] per assessed chunk
+        modifier = None  # Preceding known adverb ("really good")
+        negation = None  # Preceding negation ("not good")
+        for word in (token.lower() for token in " ".join(self.tokenizer(text)).split()):
+            entry = index.get(word)
+            if entry is not None:
+                polarity, subjectivity, intensity, is_modifier = entry
+                if modifier is None:
+                    assessments.append([polarity, subjectivity, intensity, 1])
+                else:
+                    last = assessments[-1]
+                    last[0] = max(-1.0, min(polarity * last[2], +1.0))
+                    last[1] = max(-1.0, min(subjectivity * last[2], +1.0))
+                    last[2] = intensity
+                if negation is not None:
+                    assessments[-1][2] = 1.0 / assessments[-1][2]
+                    assessments[-1][3] = -1
+                modifier = word if is_modifier else None
+                negation = word if word in negations else None
+                continue
+
+            if word in negations:
+                negation = word
+            elif negation and len(word.strip("'")) > 1:
+                negation = None
+            if negation is not None and modifier is not None and modifier.endswith("ly"):
+                assessments[-1][3] = -1
+                negation = None
+            elif modifier and len(word) > 2:
+                modifier = None
+            if word == "!" and assessments:
+                assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, +1.0))
+            if word == "(!)":
+                assessments.append([0.0, 1.0, 1.0, 1])
+            if word.isalpha() is False and len(word) <= 5 and word not in punctuation:
+                emoticon_polarity = emoticons.get(word)
+                if emoticon_polarity is not None:
+                    assessments.append([emoticon_polarity, 1.0, 1.0, 1])
+
+        total = 0
+        for polarity, _, _, negated in assessments:
+            total += polarity * -0.5 if negated < 0 else polarity # "not good" = slightly bad
+        return total / float(len(assessments) or 1)
+
+
+@functools.lru_cache(maxsize=None)
+def get_engine(kind: str):
+    """The (per-process) engine for 'vader' or 'textblob'; the lexicon index is built on first use."""
+    if kind == 'vader':
+        return VaderLexiconEngine()
+    if kind == 'textblob':
+        return TextBlobLexiconEngine()
+    raise ValueError(f"Unknown lexicon engine {kind!r}; expected 'vader' or 'textblob'.")
+
+
+def score_lexicon_batch(kind: str, texts) -> np.ndarray:
+    """VADER compound ('vader') or TextBlob polarity ('textblob') values (float64) for `texts`, in order."""
+    engine = get_engine(kind)
+    return engine.compound(texts) if kind == 'vader' else engine.polarity(texts)
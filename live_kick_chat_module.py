@@ -6,6 +6,27 @@ import time
 import queue
 from datetime import datetime
 from scraper.kick_scraper import KickScraper # Assuming kick_scraper.py is in a 'scraper' subfolder
+import analysis # canlı konu modeli (artımlı lda)
+
+LIVE_TOPIC_WINDOW = 50 # konu modeli bu kadar yeni mesaj biriktiğinde tek bir çevrimiçi güncellemeyle yenilenir
+
+def update_live_topics(topic_placeholder):
+    """yeni mesajları artımlı konu modeline ekler ve güncel konuları gösterir (tam lda yeniden eğitilmez)."""
+    new_messages = st.session_state.lk_log_messages[st.session_state.lk_topic_cursor:]
+    topic_model = st.session_state.lk_topic_model
+    if len(new_messages) >= LIVE_TOPIC_WINDOW:
+        topic_model.update(pd.Series([msg.get('content', '') for msg in new_messages], dtype='object'))
+        st.session_state.lk_topic_cursor = len(st.session_state.lk_log_messages)
+    topics = topic_model.topics()
+    if not topics:
+        return
+    with topic_placeholder.container():
+        stats = topic_model.stats()
+        st.subheader("canlı konular")
+        st.caption(f"{stats['documents_seen']} mesaj, {stats['vocabulary_size']} kelime | "
+                   f"son güncelleme: {stats['last_update_seconds'] * 1000:.0f} ms")
+        for topic_id, keywords in topics.items():
+            st.write(f"**konu {topic_id+1}:** " + ", ".join(word for word, _ in keywords))
 
 def display_live_kick_chat_interface():
     st.header("canlı kick sohbet kaydedici ve görüntüleyici")
@@ -25,6 +46,10 @@ def display_live_kick_chat_interface():
         st.session_state.lk_last_channel_name = ""
     if 'lk_raw_queue_log' not in st.session_state: # sıra mesajlarını ayıklamak için
         st.session_state.lk_raw_queue_log = []
+    if 'lk_topic_model' not in st.session_state: # artımlı konu modeli ve modele eklenmiş mesaj sayısı
+        st.session_state.lk_topic_model = analysis.IncrementalTopicModel(num_topics=4, num_words=5)
+    if 'lk_topic_cursor' not in st.session_state:
+        st.session_state.lk_topic_cursor = 0
 
     # --- kick kanalı girişi ve kontrolleri için kenar çubuğu --- 
     # kullanıcı arayüzünün bu kısmı, ana uygulamanın kenar çubuğunda veya burada koşullu olarak bulunabilir.
@@ -71,6 +96,7 @@ def display_live_kick_chat_interface():
     # --- günlükler için ana panel --- 
     log_area_title = st.empty()
     log_placeholder = st.empty()
+    topic_placeholder = st.empty()
 
     def save_lk_logs_to_csv(channel_name_for_file):
         if st.session_state.lk_log_messages:
@@ -113,6 +139,7 @@ def display_live_kick_chat_interface():
                 df_to_save.to_csv(filename, index=False, encoding='utf-8-sig')
                 status_placeholder.success(f"canlı günlükler {filename} dosyasına şu sütunlarla kaydedildi: {', '.join(final_df_columns)}")
                 st.session_state.lk_log_messages = [] 
+                st.session_state.lk_topic_cursor = 0 # konu modeli korunur, yalnızca imleç sıfırlanır
                 return True
             except Exception as e:
                 status_placeholder.error(f"csv kaydedilemedi: {e}")
@@ -127,6 +154,8 @@ def display_live_kick_chat_interface():
             st.session_state.lk_last_channel_name = kick_channel_name_input
             st.session_state.lk_log_messages = [] 
             st.session_state.lk_raw_queue_log = [] # yeni başlangıçta ham günlükleri temizle
+            st.session_state.lk_topic_model = analysis.IncrementalTopicModel(num_topics=4, num_words=5) # yeni kanal, yeni konular
+            st.session_state.lk_topic_cursor = 0
             log_placeholder.empty() 
             status_placeholder.info(f"'{kick_channel_name_input}' için canlı kayıt başlatılıyor...")
             
@@ -218,6 +247,7 @@ def display_live_kick_chat_interface():
                 display_columns = ['timestamp', 'username', 'content'] 
                 df_display_filtered = df_display[[col for col in display_columns if col in df_display.columns]]
                 st.dataframe(df_display_filtered.tail(100), height=400, use_container_width=True)
+            update_live_topics(topic_placeholder)
         elif st.session_state.lk_scraper_running:
             with log_placeholder.container():
                 st.info("Waiting for new messages...")
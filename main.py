@@ -1,3 +1,8 @@
+import glob
+import os
+import tempfile
+import time
+import weakref
 import streamlit as st
 import pandas as pd
 import analysis # yorum satırı kaldırıldı
@@ -6,8 +11,71 @@ from wordcloud import WordCloud # eklendi
 import matplotlib.pyplot as plt # eklendi
 from live_kick_chat_module import display_live_kick_chat_interface # yeni̇ modülümüzü i̇çe aktarma
 from analysis import run_sentiment_analysis # bu i̇çe aktarmanın doğru olduğundan emin olun
+import analysis_runtime
+
+# analysis modülü streamlit'e bağımlı değil; önbellek ve hata/uyarı mesajları burada bağlanır
+analysis_runtime.configure(cache_resource=st.cache_resource, error=st.error, warning=st.warning)
+
+# KICK_WARMUP_MODELS içindeki modeller (örn. "custom_kick_bert,bert") arka planda önceden yüklenir
+# yüklenmiş veya yüklenmekte olan modeller atlanır, bu yüzden her yeniden çalıştırmada çağrılabilir
+analysis.model_registry.warm_up(analysis.WARMUP_MODELS)
 
 st.set_page_config(layout="wide")
+remove_stale_scored_files()
+
+CSV_PREVIEW_ROWS = 1000 # önizleme için okunan satır sayısı
+RESULT_PREVIEW_ROWS = 1000 # sonuç tablosunda gösterilen puanlanmış satır sayısı
+
+SCORED_FILE_PREFIX = "kick_sentiment_"
+SCORED_FILE_MAX_AGE_HOURS = 24 # çöken süreçlerden kalan geçici dosyalar bu süreden sonra silinir
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class ScoredFile:
+    """puanlanmış satırların geçici csv dosyası.
+
+    oturum kapanınca session_state ile birlikte nesne de silinir ve dosya kaldırılır;
+    süreç kapanırken kalan dosyalar da silinir."""
+
+    def __init__(self):
+        scored_fd, self.path = tempfile.mkstemp(prefix=SCORED_FILE_PREFIX, suffix=".csv")
+        os.close(scored_fd)
+        self._finalizer = weakref.finalize(self, _remove_file, self.path)
+
+    def remove(self):
+        self._finalizer()
+
+@st.cache_resource
+def remove_stale_scored_files():
+    """süreç başına bir kez: eski (sahipsiz) geçici puan dosyalarını siler."""
+    cutoff = time.time() - SCORED_FILE_MAX_AGE_HOURS * 3600
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), f"{SCORED_FILE_PREFIX}*.csv")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+    return True
+
+def discard_scored_file():
+    """önceki analizin diske yazılmış puanlanmış satırlarını siler."""
+    saved_scores = st.session_state.pop('sentiment_scores', None)
+    if saved_scores is not None:
+        saved_scores['file'].remove()
+
+def count_rethresholded_labels(saved_scores, **threshold_options) -> pd.Series:
+    """diskteki puanları parça parça okuyup yeni eşiklerle etiket sayılarını döndürür."""
+    counts = pd.Series(dtype='int64')
+    for score_chunk in pd.read_csv(saved_scores['path'], usecols=saved_scores['columns'], dtype='float32',
+                                   chunksize=analysis.STREAM_CHUNK_SIZE):
+        labels = analysis.apply_sentiment_thresholds(score_chunk[saved_scores['columns']].to_numpy(dtype='float32'),
+                                                     saved_scores['method'], **threshold_options)
+        counts = counts.add(pd.Series(labels).value_counts(), fill_value=0)
+    return counts.astype('int64').sort_values(ascending=False).rename('sentiment')
 
 st.title("kick sohbet topluluğu etkileşim analizcisi")
 
@@ -19,6 +87,26 @@ analysis_mode = st.sidebar.radio(
     key="main_analysis_mode_radio" # netlik için bir anahtar eklendi
 )
 
+# --- başlatma süresi raporu (ağır kütüphaneler ilk kullanımda yüklenir) ---
+with st.sidebar.expander("başlatma süresi"):
+    startup = analysis.get_startup_report()
+    st.caption(f"analysis modülü içe aktarma: {startup['analysis_import_seconds']:.2f} saniye")
+    for module_name, seconds in startup['import_seconds'].items():
+        st.caption(f"{module_name}: {seconds:.2f} saniye")
+    if startup['not_loaded']:
+        st.caption(f"henüz yüklenmedi: {', '.join(startup['not_loaded'])}")
+
+# --- yüklü modeller ve bellek bütçesi ---
+with st.sidebar.expander("yüklü modeller"):
+    registry_stats = analysis.model_registry.stats()
+    st.caption(f"bellek: {registry_stats['total_bytes'] / 1e6:.0f} / {registry_stats['budget_bytes'] / 1e6:.0f} mb - "
+               f"boşaltılan model sayısı: {registry_stats['evictions']}")
+    for model_name, model_stats in registry_stats['models'].items():
+        state = f"{model_stats['bytes'] / 1e6:.0f} mb" if model_stats['loaded'] else "yüklenemedi"
+        st.caption(f"{model_name}: {state}")
+    if registry_stats['warming_up']:
+        st.caption(f"arka planda yükleniyor: {', '.join(registry_stats['warming_up'])}")
+
 # --- kick csv analiz modu ---
 if analysis_mode == "kick csv dosyasından analiz et":
     st.sidebar.header("kick sohbet günlüğünü yükle")
@@ -29,8 +117,13 @@ if analysis_mode == "kick csv dosyasından analiz et":
     analysis_method_options = {
         "bert (türkçe modeli - genel)": "bert",
         "özel kick ayarlı bert": "custom_kick_bert",
+        "özel kick ayarlı bert (onnx int8 - hızlı cpu)": "custom_kick_bert_onnx",
+        "özel kick öğrenci modeli (damıtılmış - canlı kullanım)": "custom_kick_student",
         "textblob (genel amaçlı)": "textblob",
-        "vader (i̇ngilizce odaklı, sosyal medya için iyi)": "vader"
+        "vader (i̇ngilizce odaklı, sosyal medya için iyi)": "vader",
+        "topluluk (4 modelin oylaması)": "ensemble",
+        "kick tf-idf (etiketli veriyle eğitilmiş - çok hızlı)": "kick_tfidf",
+        "kademeli (kick tf-idf, emin olmadığı mesajlar için özel kick bert)": "cascade"
     }
     chosen_display_name = st.sidebar.selectbox(
         "duygu analizi modelini seçin:",
@@ -38,14 +131,39 @@ if analysis_mode == "kick csv dosyasından analiz et":
         index=0
     )
     chosen_method_key = analysis_method_options[chosen_display_name]
+    method_options = None
+    if chosen_method_key == 'cascade':
+        # hızlı modelin en yüksek sınıf olasılığı bu değerin altındaysa mesaj özel kick bert'e gönderilir
+        cascade_confidence = st.sidebar.slider("en düşük güven (tf-idf olasılığı)", 0.0, 1.0,
+                                               analysis.CASCADE_MIN_CONFIDENCE, 0.05, key="cascade_confidence_slider")
+        method_options = {'min_confidence': cascade_confidence}
+    # tam c_v, lda eğitimi kadar sürebilir; hızlı modlar ya da arka planda hesaplama seçilebilir
+    coherence_mode_options = {
+        "c_v (tam)": "c_v",
+        "u_mass (hızlı)": "u_mass",
+        "c_v (örneklem, güven aralığıyla)": "c_v_sampled",
+        "c_v (tam, arka planda)": "c_v_background",
+    }
+    coherence_display_name = st.sidebar.selectbox("konu tutarlılığı ölçümü:", options=list(coherence_mode_options.keys()),
+                                                  index=list(coherence_mode_options.values()).index(analysis.DEFAULT_COHERENCE_MODE)
+                                                  if analysis.DEFAULT_COHERENCE_MODE in coherence_mode_options.values() else 0)
+    coherence_mode = coherence_mode_options[coherence_display_name]
+    # konu sayısı elle ayarlanmış 4 yerine bir aralık taranarak tutarlılığa göre seçilebilir
+    auto_topic_count = st.sidebar.checkbox("konu sayısını otomatik seç (tutarlılığa göre)", value=False, key="auto_topic_count_checkbox")
+    if auto_topic_count:
+        topic_count_range = st.sidebar.slider("denenecek konu sayısı aralığı", 2, 20,
+                                              (min(analysis.TOPIC_SWEEP_COUNTS), max(analysis.TOPIC_SWEEP_COUNTS)), key="topic_count_range_slider")
     st.sidebar.markdown("---") # ayırıcı
 
     if uploaded_file is not None:
         st.sidebar.success("dosya başarıyla yüklendi!")
         
         try:
-            # csv dosyasını oku
-            df = pd.read_csv(uploaded_file)
+            # csv dosyasının yalnızca başını oku (önizleme ve sütun doğrulama için)
+            # tam dosya analiz sırasında parçalar halinde akıtılır, böylece bellek kullanımı sabit kalır
+            df = pd.read_csv(uploaded_file, nrows=CSV_PREVIEW_ROWS, encoding='utf-8-sig')
+            csv_columns = df.columns.tolist()
+            text_source_column = 'message' # csv'deki orijinal metin sütunu
             
             # --- esnek sütun işleme --- 
             # zaman damgasını kontrol et (her zaman gerekli)
@@ -57,6 +175,7 @@ if analysis_mode == "kick csv dosyasından analiz et":
                 if 'message' not in df.columns:
                     if 'content' in df.columns:
                         st.info("'content' sütunu bulundu, analiz için 'message' olarak yeniden adlandırılıyor.")
+                        text_source_column = 'content'
                         df.rename(columns={'content': 'message'}, inplace=True)
                     else:
                         # ne 'message' ne de 'content' bulundu
@@ -75,45 +194,149 @@ if analysis_mode == "kick csv dosyasından analiz et":
                     # i̇lgili sütunları görüntüle, mesajın görünür olduğundan emin ol
                     preview_cols = ['timestamp', 'username', 'message'] if 'username' in df.columns else ['timestamp', 'message']
                     st.dataframe(df[preview_cols].head())
-                    st.info(f"{len(df)} mesaj yüklendi.")
+                    st.info(f"dosya yüklendi ({uploaded_file.size / 1e6:.1f} mb). analiz sırasında {analysis.STREAM_CHUNK_SIZE} satırlık parçalar halinde işlenecek.")
     
                     if st.button("sohbet etkileşimlerini analiz et", key="analyze_csv_button"):
                         st.header(f"analiz sonuçları ({chosen_display_name} kullanılarak)") # kullanılan modeli belirt
                         
                         # --- duygu analizi (birleşik çağrı) --- 
                         sentiment_column_name = 'sentiment' # varsayılan sütun adı
-                        with st.spinner(f"{chosen_display_name} kullanılarak duygular analiz ediliyor..."):
-                            # bu tek çağrı artık chosen_method_key aracılığıyla bert, textblob veya vader'ı işliyor
-                            df[sentiment_column_name] = run_sentiment_analysis(df['message'], method=chosen_method_key)
-                            
-                            # duygu analizinin başarısız olup olmadığını genel kontrol et (örneğin, model yükleme sorunları)
-                            # analysis.py'deki run_sentiment_analysis i̇şlevi i̇deal olarak
-                            # kendi hatalarını işlemeli ve başarısızlık durumunda 'nötr' veya 'bilinmeyen' bir seri döndürmelidir.
-                            # bu nedenle, analysis.py sağlamsa burada df[sentiment_column_name].empty için açık bir kontrole her zaman gerek olmayabilir.
-                            # 
-                            if df[sentiment_column_name].empty:
-                                st.error(f"{chosen_display_name} kullanılarak yapılan duygu analizi başarısız oldu veya sonuç döndürmedi. tam analizle devam edilemiyor.")
-                                st.stop() 
+                        progress_bar = st.progress(0.0, text=f"{chosen_display_name} kullanılarak duygular analiz ediliyor...")
+
+                        def update_sentiment_progress(rows_done, fraction):
+                            progress_bar.progress(fraction if fraction is not None else 0.0,
+                                                  text=f"{chosen_display_name}: {rows_done} mesaj analiz edildi...")
+
+                        # dosyayı parça parça akıt; yalnızca gösterilen sütunlar okunur
+                        uploaded_file.seek(0)
+                        source_cols = [col for col in ['timestamp', 'username', text_source_column] if col in csv_columns]
+                        scored_chunks = analysis.iter_sentiment_analysis(uploaded_file,
+                                                                         method=chosen_method_key,
+                                                                         usecols=source_cols,
+                                                                         text_column=text_source_column,
+                                                                         progress_callback=update_sentiment_progress,
+                                                                         sentiment_column=sentiment_column_name,
+                                                                         include_scores=True,
+                                                                         method_options=method_options)
+                        # parçalar bellekte birleştirilmez: etiket sayıları ve dakikalık eğilim parça parça toplanır,
+                        # puanlanmış satırlar geçici bir csv'ye yazılır, tabloda yalnızca ilk satırlar gösterilir
+                        discard_scored_file()
+                        scored_file = ScoredFile()
+                        scored_path = scored_file.path
+                        # konu modeli ve öneriler için satırların en fazla analysis.TOPIC_SAMPLE_ROWS satırlık düzgün örneklemi tutulur
+                        topic_sample = analysis.ChunkReservoir(columns=['message', sentiment_column_name])
+                        sentiment_counts = pd.Series(dtype='int64')
+                        sentiment_over_time = None
+                        trend_error = None
+                        preview_parts = []
+                        preview_rows = 0
+                        scored_columns = []
+                        for chunk_number, chunk in enumerate(scored_chunks):
+                            chunk = chunk.rename(columns={'content': 'message'})
+                            sentiment_counts = sentiment_counts.add(chunk[sentiment_column_name].value_counts(), fill_value=0)
+                            if trend_error is None:
+                                try:
+                                    chunk_minutes = pd.to_datetime(chunk['timestamp']).dt.floor('min').rename('timestamp_dt')
+                                    chunk_trend = chunk.groupby(chunk_minutes)[sentiment_column_name].value_counts().unstack(fill_value=0)
+                                    sentiment_over_time = chunk_trend if sentiment_over_time is None else sentiment_over_time.add(chunk_trend, fill_value=0)
+                                except Exception as e:
+                                    trend_error = e
+                            if preview_rows < RESULT_PREVIEW_ROWS:
+                                preview_parts.append(chunk.head(RESULT_PREVIEW_ROWS - preview_rows))
+                                preview_rows += len(preview_parts[-1])
+                            topic_sample.add(chunk)
+                            chunk.to_csv(scored_path, mode='a', header=chunk_number == 0, index=False)
+                            scored_columns = chunk.columns.tolist()
+                        sentiment_counts = sentiment_counts.astype('int64').sort_values(ascending=False).rename('count')
+                        preview_df = pd.concat(preview_parts, ignore_index=True) if preview_parts else pd.DataFrame()
+                        progress_bar.empty()
+
+                        # duygu analizinin başarısız olup olmadığını genel kontrol et (örneğin, model yükleme sorunları)
+                        # iter_sentiment_analysis başarısız parçaları 'unknown' olarak işaretler
+                        if sentiment_counts.empty or set(sentiment_counts.index) == {'unknown'}:
+                            scored_file.remove()
+                            st.error(f"{chosen_display_name} kullanılarak yapılan duygu analizi başarısız oldu veya sonuç döndürmedi. tam analizle devam edilemiyor.")
+                            st.stop() 
 
                         st.success(f"{chosen_display_name} kullanılarak duygu analizi tamamlandı!")
+                        # puanlar diskte kalır: eşikler daha sonra modeli yeniden çalıştırmadan değiştirilebilir
+                        score_cols = [f"{sentiment_column_name}_{col}" for col in analysis.SENTIMENT_SCORE_COLUMNS.get(chosen_method_key, [])]
+                        st.session_state['sentiment_scores'] = {
+                            'method': chosen_method_key,
+                            'display_name': chosen_display_name,
+                            'file': scored_file,
+                            'path': scored_path,
+                            'columns': score_cols,
+                            'combine': analysis.last_ensemble_report.get('combine') if chosen_method_key == 'ensemble' else None,
+                        }
+                        if not all(col in scored_columns for col in score_cols):
+                            st.session_state['sentiment_scores']['columns'] = []
+                        run_stats = analysis.last_sentiment_run_stats
+                        if run_stats:
+                            # tekrar eden mesajlar yalnızca bir kez puanlanır
+                            st.caption(f"{run_stats['total_messages']} mesaj, {run_stats['unique_messages']} benzersiz "
+                                       f"(%{run_stats['collapse_ratio'] * 100:.1f} tekrar) - süre: {run_stats['duration_seconds']:.2f} saniye")
+                            if run_stats.get('rule_counts'):
+                                # boş, komut, bağlantı ve yalnızca emote içeren mesajlar modele gönderilmez
+                                rule_text = ", ".join(f"{rule}: {count}" for rule, count in run_stats['rule_counts'].items())
+                                st.caption(f"kural tablosuyla etiketlenen mesajlar - {rule_text} "
+                                           f"(modele gönderilen benzersiz mesaj: {run_stats['model_messages']})")
+                        if chosen_method_key == 'ensemble' and analysis.last_ensemble_report:
+                            # model başına gecikme (tüm parçaların toplamı)
+                            latency_text = ", ".join(f"{member}: {seconds:.2f} s" for member, seconds in analysis.last_ensemble_report['latency_seconds'].items())
+                            st.caption(f"model başına süre - {latency_text}")
+                            if analysis.last_ensemble_report['excluded']:
+                                st.warning(f"yüklenemeyen modeller oylamaya katılmadı: {', '.join(analysis.last_ensemble_report['excluded'])}")
+                        if chosen_method_key == 'cascade' and analysis.last_cascade_report:
+                            cascade_report = analysis.last_cascade_report # tüm parçaların toplamı
+                            st.caption(f"{cascade_report['slow_method']} modeline gönderilen benzersiz mesaj oranı: "
+                                       f"%{cascade_report['escalation_rate'] * 100:.1f} ({cascade_report['escalated']}/{cascade_report['messages']})")
                         
                         # --- konu modelleme --- # değiştirildi
                         topics = {}
                         coherence_score = None # değişkeni başlat
                         topic_duration = 0 # süreyi başlat
+                        # ön işlenmiş mesajlar bu analizde bir kez hesaplanır; konu modeli, tutarlılık ve öneriler paylaşır
+                        token_cache = analysis.TokenCache()
+                        # konu modeli ve öneriler tüm dosya yerine akış sırasında tutulan örneklemle çalışır
+                        df = topic_sample.frame()
+                        if topic_sample.rows_seen > len(df):
+                            st.caption(f"konu modeli {topic_sample.rows_seen} mesajdan rastgele seçilen {len(df)} mesajla eğitiliyor.")
                         with st.spinner("konu modellemesi yapılıyor..."): 
-                            # döndürülen değerleri doğru şekilde aç (artık süreyi içeriyor)
-                            # en iyi tutarlılık puanını verdiği için num_topics = 4'e geri dönülüyor
-                            lda_model, topics, coherence_score, topic_duration = analysis.perform_topic_modeling(df['message'], num_topics=4, num_words=5)
+                            token_cache.fill(df['message'])
+                            topic_curve = []
+                            if auto_topic_count:
+                                # sözlük ve korpus bir kez kurulur, her konu sayısı ayrı bir süreçte eğitilir
+                                # konu sayısı seçimi için puan gerekir; arka plan/örneklem modları tam c_v kullanır
+                                sweep_coherence = 'u_mass' if coherence_mode == 'u_mass' else 'c_v'
+                                lda_model, topics, coherence_score, topic_duration, topic_curve = analysis.sweep_topic_counts(
+                                    df['message'], topic_counts=range(topic_count_range[0], topic_count_range[1] + 1), num_words=5,
+                                    token_cache=token_cache, coherence_mode=sweep_coherence)
+                            else:
+                                # döndürülen değerleri doğru şekilde aç (artık süreyi içeriyor)
+                                # en iyi tutarlılık puanını verdiği için num_topics = 4'e geri dönülüyor
+                                lda_model, topics, coherence_score, topic_duration = analysis.perform_topic_modeling(df['message'], num_topics=4, num_words=5, token_cache=token_cache,
+                                                                                                                    coherence_mode=coherence_mode)
+                            coherence_report = dict(analysis.last_coherence_report)
+                            vocabulary_report = dict(analysis.last_vocabulary_report)
+                        # arka plandaki tam c_v hesaplaması sonraki yeniden çalıştırmalarda gösterilir
+                        st.session_state['coherence_job'] = coherence_report if coherence_report.get('future') else None
                         if topics:
                             st.success(f"konu modellemesi tamamlandı! (süre: {topic_duration:.2f} saniye)") # süreyi göster
+                            if vocabulary_report:
+                                # kök bulma, ikili ifade tespiti ve sözlük budaması sonrası kelime dağarcığı
+                                st.caption(f"kelime dağarcığı: {vocabulary_report['raw_terms']} terim -> {vocabulary_report['final_terms']} terim "
+                                           f"(%{vocabulary_report['reduction'] * 100:.1f} küçüldü, {vocabulary_report['bigrams']} ikili ifade)")
                         else:
                             st.warning("konu modellemesi tamamlanamadı...")
                         
                         # --- öneri oluştur --- # eklendi
                         suggestions = []
                         with st.spinner("öneriler oluşturuluyor..."): 
-                            suggestions = analysis.generate_content_suggestions(df, topics)
+                            suggestions = analysis.generate_content_suggestions(df, topics, token_cache=token_cache)
+                        cache_stats = token_cache.stats()
+                        st.caption(f"ön işleme önbelleği: {cache_stats['messages']} benzersiz mesaj, doldurma {cache_stats['fill_seconds']:.2f} s, "
+                                   f"kazanılan süre ~{cache_stats['saved_seconds']:.2f} s")
                         
                         st.header("analiz sonuçları") 
                         
@@ -121,31 +344,20 @@ if analysis_mode == "kick csv dosyasından analiz et":
                         
                         with col1:
                             st.subheader(f"duygu analizi ({chosen_display_name}) ")
-                            if sentiment_column_name in df.columns:
-                                sentiment_counts = df[sentiment_column_name].value_counts()
+                            if not sentiment_counts.empty:
                                 st.write("duygu dağılımı:")
                                 st.dataframe(sentiment_counts)
                                 
                                 # --- duygu eğilim grafiği --- # eklendi
                                 st.subheader("zamana göre duygu eğilimi")
                                 try:
-                                    # zaman damgasını datetime'a dönüştürmeyi dene
-                                    df['timestamp_dt'] = pd.to_datetime(df['timestamp'])
-                                    df = df.sort_values('timestamp_dt') # zamana göre sırala
-                                    
-                                    # veriyi yeniden örnekle (örneğin, dakika başına veya uyarlanabilir şekilde)
-                                    # dakika başına frekans için 't' kullanılıyor
-                                    # frekansı (örneğin, 5 dakika için '5t', saat için 'h') 
-                                    # tipik sohbet günlüğü süresine bağlı olarak ayarlayabilirsiniz
-                                    sentiment_over_time = df.set_index('timestamp_dt')\
-                                                           .groupby(pd.Grouper(freq='min'))[[sentiment_column_name]]\
-                                                           .value_counts()\
-                                                           .unstack(fill_value=0)
+                                    if trend_error is not None:
+                                        raise trend_error
+                                    # dakikalık sayılar parça parça toplandı
+                                    if sentiment_over_time is not None:
+                                        sentiment_over_time = sentiment_over_time.sort_index().astype('int64')
                                     
-                                    if not sentiment_over_time.empty:
-                                         # gerekirse netlik için sütunları yeniden adlandır (örneğin, çoklu dizini kaldır)
-                                        sentiment_over_time.columns = [col[1] for col in sentiment_over_time.columns]
-                                        
+                                    if sentiment_over_time is not None and not sentiment_over_time.empty:
                                         # olası duygu etiketleri için renkleri tanımla
                                         color_map = {'positive': 'green', 'negative': 'red', 'neutral': 'blue', 'unknown': 'grey'}
                                         # haritayı yalnızca veride bulunan sütunları içerecek şekilde filtrele
@@ -176,13 +388,22 @@ if analysis_mode == "kick csv dosyasından analiz et":
                                 col_metric1, col_metric2 = st.columns(2)
                                 with col_metric1:
                                     if coherence_score:
-                                         st.metric(label="konu tutarlılığı (c_v)", value=f"{coherence_score:.4f}")
-                                         st.caption("tutarlılık (c_v) konu yorumlanabilirliğini ölçer (daha yüksek genellikle daha iyidir).")
+                                         st.metric(label=f"konu tutarlılığı ({coherence_report['mode']})", value=f"{coherence_score:.4f}")
+                                         if coherence_report.get('ci'):
+                                             st.caption(f"%95 güven aralığı: {coherence_report['ci'][0]:.4f} - {coherence_report['ci'][1]:.4f} "
+                                                        f"({coherence_report['documents']} mesajlık örneklemler)")
+                                         st.caption("tutarlılık konu yorumlanabilirliğini ölçer (c_v için daha yüksek genellikle daha iyidir; u_mass negatiftir, sıfıra yakın olan daha iyidir).")
+                                    elif coherence_report.get('future'):
+                                        st.info("tam c_v tutarlılık puanı arka planda hesaplanıyor; hazır olduğunda aşağıda gösterilecek.")
                                     else:
                                         st.write("tutarlılık puanı hesaplanamadı.")
                                 with col_metric2:
                                     st.metric(label="modelleme süresi", value=f"{topic_duration:.2f} s")
                                     st.caption("konu modellemesi için geçen süre.")
+                                if topic_curve:
+                                    # taranan her konu sayısının tutarlılık puanı
+                                    st.write(f"konu sayısına göre tutarlılık ({coherence_report['mode']}) - seçilen: {len(topics)}")
+                                    st.line_chart(pd.DataFrame(topic_curve).set_index('num_topics')['coherence'])
                                 
                                 topic_words_for_cloud = {} # kelime bulutu için
                                 for topic_id, keywords in topics.items():
@@ -230,13 +451,49 @@ if analysis_mode == "kick csv dosyasından analiz et":
                                  st.write("No suggestions generated.")
                             
                             st.header(f"Data with Calculated Sentiment ({chosen_display_name}) ") 
-                            # Display relevant columns including the calculated sentiment
+                            # Display relevant columns including the calculated sentiment (first rows only)
                             display_cols = preview_cols + [sentiment_column_name]
-                            st.dataframe(df[[col for col in display_cols if col in df.columns]])
+                            st.dataframe(preview_df[[col for col in display_cols if col in preview_df.columns]])
+                            if sentiment_counts.sum() > len(preview_df):
+                                st.caption(f"ilk {len(preview_df)} / {int(sentiment_counts.sum())} satır gösteriliyor.")
                             
                             # --- Placeholder for Export ---
                             # Add Streamlit download button for PNG export if needed
 
+                    # --- arka planda hesaplanan tam c_v tutarlılık puanı ---
+                    coherence_job = st.session_state.get('coherence_job')
+                    if coherence_job is not None:
+                        coherence_future = coherence_job['future']
+                        if coherence_future.done():
+                            try:
+                                st.metric(label="konu tutarlılığı (c_v, arka planda hesaplandı)", value=f"{coherence_future.result():.4f}")
+                            except Exception as e:
+                                st.warning(f"arka plandaki tutarlılık hesaplaması başarısız oldu: {e}")
+                        else:
+                            st.info(f"tam c_v tutarlılık puanı arka planda hesaplanıyor ({coherence_job['documents']} mesaj)...")
+                            st.button("tutarlılık puanını yenile", key="refresh_coherence_button") # tıklama sayfayı yeniden çalıştırır
+
+                    # --- duygu eşiklerini ayarla (model yeniden çalıştırılmaz) ---
+                    saved_scores = st.session_state.get('sentiment_scores')
+                    if saved_scores is not None and saved_scores['columns'] and os.path.exists(saved_scores['path']):
+                        with st.expander(f"duygu eşiklerini ayarla ({saved_scores['display_name']} - model yeniden çalıştırılmaz)"):
+                            saved_method = saved_scores['method']
+                            # oylamalı topluluk, oy paylarından yeniden karar verir (güven eşiği); ortalamalı topluluk puan eşikleri kullanır
+                            saved_thresholds = (analysis.ENSEMBLE_AVERAGE_THRESHOLDS if saved_method == 'ensemble' and saved_scores['combine'] == 'average'
+                                                else analysis.LEXICON_THRESHOLDS.get(saved_method))
+                            if saved_thresholds is not None:
+                                default_positive, default_negative, _ = saved_thresholds
+                                positive_threshold = st.slider("pozitif eşiği", 0.0, 1.0, float(default_positive), 0.01, key="positive_threshold_slider")
+                                negative_threshold = st.slider("negatif eşiği", -1.0, 0.0, float(default_negative), 0.01, key="negative_threshold_slider")
+                                rethresholded_counts = count_rethresholded_labels(saved_scores,
+                                                                                  positive_threshold=positive_threshold,
+                                                                                  negative_threshold=negative_threshold)
+                            else:
+                                min_confidence = st.slider("en düşük güven (altı nötr sayılır)", 0.0, 1.0, 0.0, 0.01, key="min_confidence_slider")
+                                rethresholded_counts = count_rethresholded_labels(saved_scores, min_confidence=min_confidence)
+                            st.write("yeni eşiklerle duygu dağılımı:")
+                            st.dataframe(rethresholded_counts)
+
         except Exception as e:
             st.error(f"An error occurred while processing the file: {e}")
 
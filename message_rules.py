@@ -0,0 +1,102 @@
+# Rule table for trivial chat messages
+#
+# A large share of Kick chat never needs a model: blank rows (the scraper strips emote images,
+# leaving empty messages), "!commands", bare links, emote spam and "???". These are classified
+# here from a configurable emote -> sentiment map before any sentiment backend runs.
+#
+# The emote map can be extended with a JSON file ({"emote or token": "positive" | "negative" |
+# "neutral"}) named by KICK_EMOTE_SENTIMENT_MAP; entries are matched case-insensitively.
+
+import json
+import os
+import re
+
+import numpy as np
+
+DEFAULT_EMOTE_SENTIMENT = {
+    # Laughter / hype
+    'kekw': 'positive', 'lul': 'positive', 'lol': 'positive', 'omegalul': 'positive', 'pog': 'positive',
+    'poggers': 'positive', 'pogchamp': 'positive', 'pogu': 'positive', 'catjam': 'positive',
+    'peepohappy': 'positive', 'feelsgoodman': 'positive', 'ez': 'positive', 'gg': 'positive',
+    'xd': 'positive', ':)': 'positive', ':d': 'positive', '<3': 'positive', 'hahaha': 'positive',
+    # Sadness / annoyance / boredom
+    'sadge': 'negative', 'feelsbadman': 'negative', 'notlikethis': 'negative', 'biblethump': 'negative',
+    'residentsleeper': 'negative', 'weirdchamp': 'negative', 'pepehands': 'negative', ':(': 'negative',
+    # Ambiguous reactions
+    'kappa': 'neutral', 'monkas': 'neutral', 'pepega': 'neutral', '4head': 'neutral', 'copium': 'neutral',
+}
+
+# Label assigned by each non-emote rule
+DEFAULT_RULE_LABELS = {
+    'empty': 'neutral',
+    'command': 'neutral',
+    'url_only': 'neutral',
+    'punctuation_only': 'neutral',
+}
+
+RULE_NAMES = ('empty', 'command', 'url_only', 'emote_only', 'punctuation_only') # Checked in this order
+
+_EMOTE_TAG_PATTERN = re.compile(r'\[emote:\d+:([^\]]+)\]') # Kick API chat content, e.g. [emote:37226:KEKW]
+_COMMAND_PATTERN = re.compile(r'^![a-z0-9_]+\b', re.IGNORECASE) # Bot commands such as !uptime, not "!!! harika"
+_URL_PATTERN = re.compile(r'^(?:https?://|www\.)\S+$', re.IGNORECASE)
+_WORD_CHAR_PATTERN = re.compile(r'\w')
+_POLARITY = {'positive': 1, 'negative': -1, 'neutral': 0}
+
+
+def load_emote_sentiment_map(path: str = None) -> dict:
+    """The default emote map, extended/overridden by the JSON file at `path` (or KICK_EMOTE_SENTIMENT_MAP)."""
+    emote_sentiment = dict(DEFAULT_EMOTE_SENTIMENT)
+    path = path or os.environ.get("KICK_EMOTE_SENTIMENT_MAP")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for emote, label in json.load(f).items():
+                if label not in _POLARITY:
+                    raise ValueError(f"Emote map {path}: label for {emote!r} must be positive, negative or neutral, got {label!r}.")
+                emote_sentiment[emote.lower()] = label
+    return emote_sentiment
+
+
+class MessageRules:
+    """Classifies trivial messages without a model; other messages are left to the sentiment backend."""
+
+    def __init__(self, emote_sentiment: dict = None, rule_labels: dict = None):
+        self.emote_sentiment = {emote.lower(): label for emote, label in
+                                (emote_sentiment if emote_sentiment is not None else load_emote_sentiment_map()).items()}
+        self.rule_labels = {**DEFAULT_RULE_LABELS, **(rule_labels or {})}
+
+    def _emote_label(self, tokens: list):
+        """Sentiment of an emote-only token list, or None if any token is not an emote."""
+        total = 0
+        for token in tokens:
+            tag = _EMOTE_TAG_PATTERN.fullmatch(token)
+            label = self.emote_sentiment.get((tag.group(1) if tag else token).lower())
+            if label is None:
+                if not tag:
+                    return None
+                label = 'neutral' # Unmapped Kick emote: still emote-only, no known sentiment
+            total += _POLARITY[label]
+        return 'positive' if total > 0 else 'negative' if total < 0 else 'neutral'
+
+    def classify(self, text: str) -> tuple:
+        """Returns (rule name, label) for a trivial message, or (None, None) if a model is needed."""
+        stripped = str(text).strip()
+        if not stripped:
+            return 'empty', self.rule_labels['empty']
+        if _COMMAND_PATTERN.match(stripped):
+            return 'command', self.rule_labels['command']
+        tokens = _EMOTE_TAG_PATTERN.sub(lambda match: f" {match.group(0)} ", stripped).split()
+        if all(_URL_PATTERN.match(token) for token in tokens):
+            return 'url_only', self.rule_labels['url_only']
+        emote_label = self._emote_label(tokens)
+        if emote_label is not None:
+            return 'emote_only', emote_label
+        if not _WORD_CHAR_PATTERN.search(stripped):
+            return 'punctuation_only', self.rule_labels['punctuation_only']
+        return None, None
+
+    def classify_many(self, texts) -> tuple:
+        """Vector form of classify: (rule names, labels) object arrays with None for model messages."""
+        results = [self.classify(text) for text in texts]
+        rules = np.array([rule for rule, _ in results], dtype=object)
+        labels = np.array([label for _, label in results], dtype=object)
+        return rules, labels
@@ -0,0 +1,163 @@
+# Persistent, content-addressed sentiment cache (SQLite backed)
+#
+# Chat repeats itself constantly ("KEKW", "gg", "sa", copypastas), so sentiment results are
+# stored on disk keyed by (method, model revision, normalized text). Entries are evicted in
+# least-recently-used order once the cache grows past `max_entries`.
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from importlib import metadata
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.environ.get("KICK_SENTIMENT_CACHE_PATH", os.path.join(".cache", "sentiment_cache.sqlite"))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("KICK_SENTIMENT_CACHE_MAX_ENTRIES", "500000"))
+EVICTION_SLACK = 0.1 # Evict down to 90% of max_entries so eviction does not run on every insert
+_SQL_BATCH = 500     # Stay well below SQLite's bound-parameter limit
+
+
+def normalize_text(text) -> str:
+    """Normalizes a chat message for cache lookups (collapses and strips whitespace)."""
+    return " ".join(str(text).split())
+
+
+def package_revision(distribution: str) -> str:
+    """Returns '<distribution>-<version>' for an installed package, used as a model revision."""
+    try:
+        return f"{distribution}-{metadata.version(distribution)}"
+    except metadata.PackageNotFoundError:
+        return f"{distribution}-unknown"
+
+
+def make_cache_key(method: str, revision: str, text: str) -> str:
+    """Content address for one (method, model revision, normalized text) triple."""
+    return hashlib.sha1(f"{method}\x1f{revision}\x1f{text}".encode("utf-8")).hexdigest()
+
+
+class SentimentCache:
+    """Disk-backed sentiment cache with size-bounded LRU eviction and hit/miss counters."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Several processes (dashboard, webhook server, batch jobs) may share the same file
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sentiment_cache ("
+            " key TEXT PRIMARY KEY,"
+            " method TEXT NOT NULL,"
+            " label TEXT NOT NULL,"
+            " scores BLOB,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sentiment_cache_last_used ON sentiment_cache(last_used)")
+        self._conn.commit()
+        # Row count is counted once here and then tracked per insert; other processes sharing the
+        # file make it drift, so it is recounted whenever it says the cache is over its bound
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()[0]
+
+    def get_many(self, method: str, revision: str, texts) -> dict:
+        """Looks up normalized texts.
+
+        Returns:
+            dict: text -> (label, scores as float32 np.ndarray) for every cached text.
+        """
+        keys = {make_cache_key(method, revision, text): text for text in set(texts)}
+        found = {}
+        key_list = list(keys)
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(key_list), _SQL_BATCH):
+                chunk = key_list[i:i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, label, scores FROM sentiment_cache WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, label, scores in rows:
+                    found[keys[key]] = (label, np.frombuffer(scores, dtype=np.float32) if scores else np.empty(0, dtype=np.float32))
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE sentiment_cache SET last_used = ? WHERE key = ?", [(now, row[0]) for row in rows]
+                    )
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, method: str, revision: str, items) -> None:
+        """Stores (text, label, scores) triples; `scores` is any float array-like or None."""
+        now = time.time()
+        rows = []
+        for text, label, scores in items:
+            blob = None if scores is None else np.asarray(scores, dtype=np.float32).tobytes()
+            rows.append((make_cache_key(method, revision, text), method, label, blob, now))
+        if not rows:
+            return
+        with self._lock:
+            # rowcount of OR IGNORE is the number of new keys; existing keys are then overwritten
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO sentiment_cache (key, method, label, scores, last_used) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            ).rowcount
+            if inserted < len(rows):
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO sentiment_cache (key, method, label, scores, last_used) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+            self._entries += inserted
+            self._evict_if_needed()
+            self._conn.commit()
+
+    def _evict_if_needed(self) -> None:
+        """Drops least-recently-used entries once the cache is over its size bound."""
+        if self._entries <= self.max_entries:
+            return
+        count = self._conn.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()[0]
+        self._entries = count
+        if count <= self.max_entries:
+            return
+        target = int(self.max_entries * (1 - EVICTION_SLACK))
+        self._conn.execute(
+            "DELETE FROM sentiment_cache WHERE key IN"
+            " (SELECT key FROM sentiment_cache ORDER BY last_used ASC LIMIT ?)",
+            (count - target,),
+        )
+        self._entries = target
+        print(f"Sentiment cache: evicted {count - target} least-recently-used entries.")
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for this process and the (tracked) number of stored entries."""
+        entries = self._entries
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
+
+    def clear(self) -> None:
+        """Removes every entry and resets the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM sentiment_cache")
+            self._conn.commit()
+            self._entries = 0
+            self.hits = 0
+            self.misses = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,79 @@
+# How much work the cascade's fast model saves, and how accurate the messages it keeps are
+#
+# Usage (from the repository root):
+#   python test/cascade_fast_model_check.py                          # data/live-kick-data-naru-*.csv
+#   python test/cascade_fast_model_check.py path/to/chat.csv
+#
+# The TF-IDF classifier is trained on data/labeled_data, so its accuracy there is measured with
+# grouped 5-fold cross-validation (analysis.kick_tfidf_out_of_fold_scores; repeats of the same
+# message stay in one fold). For each minimum confidence the report shows the share of labeled
+# messages escalated to the slow model, the accuracy of the messages the fast model keeps, and,
+# when the slow model can be loaded, the cascade's accuracy next to running the slow model on
+# everything. The escalation rate on a real
+# chat log uses the classifier trained on all labeled data, as the dashboard does.
+# Exits with status 1 if the default threshold escalates more than MAX_ESCALATION_RATE of the chat log.
+
+import glob
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analysis
+
+DEFAULT_SOURCE = (sorted(glob.glob(os.path.join("data", "live-kick-data-naru-*.csv"))) or [os.path.join("data", "sample_chat.csv")])[0]
+MIN_CONFIDENCES = (0.5, 0.6, 0.7, 0.8)
+MAX_ESCALATION_RATE = 0.5
+
+
+def load_messages(path: str) -> pd.Series:
+    frame = pd.read_csv(path, encoding='utf-8-sig')
+    column = 'message' if 'message' in frame.columns else 'content'
+    return frame[column]
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    labeled_df = analysis.load_labeled_data()
+    truth = labeled_df['label'].to_numpy()
+    probabilities = analysis.kick_tfidf_out_of_fold_scores(labeled_df)
+    fast_labels = analysis.apply_sentiment_thresholds(probabilities, 'kick_tfidf')
+    print(f"labeled_data: {len(labeled_df)} messages | {analysis.KICK_TFIDF_CV_FOLDS}-fold grouped CV accuracy of kick_tfidf alone "
+          f"{(fast_labels == truth).mean():.3f}")
+
+    slow_labels = analysis.run_sentiment_analysis(labeled_df['message'], method=analysis.CASCADE_SLOW_METHOD).to_numpy()
+    slow_available = len(slow_labels) == len(labeled_df) and not (slow_labels == 'unknown').all()
+    if slow_available:
+        print(f"{analysis.CASCADE_SLOW_METHOD} on everything: accuracy {(slow_labels == truth).mean():.3f}")
+    else:
+        print(f"{analysis.CASCADE_SLOW_METHOD} could not be loaded here; cascade vs all-{analysis.CASCADE_SLOW_METHOD} accuracy not measured.")
+
+    for min_confidence in MIN_CONFIDENCES:
+        escalate = analysis.cascade_escalation_mask(probabilities, min_confidence)
+        kept = ~escalate
+        line = (f"  min confidence {min_confidence:.2f}: escalated {escalate.mean():.1%} | "
+                f"accuracy of kept messages {(fast_labels[kept] == truth[kept]).mean():.3f}")
+        if slow_available:
+            cascade_labels = np.where(escalate, slow_labels, fast_labels)
+            line += f" | cascade accuracy {(cascade_labels == truth).mean():.3f}"
+        print(line)
+
+    source = argv[0] if argv else DEFAULT_SOURCE
+    messages = load_messages(source)
+    _, scores, _ = analysis.run_sentiment_scores(messages, method='kick_tfidf')
+    # Empty messages are labelled by the rule table and never reach either model
+    scored = ~np.isnan(scores).all(axis=1)
+    escalation_rate = float((analysis.cascade_escalation_mask(scores) & scored).mean())
+    print(f"{source}: {len(messages)} messages | escalated at min confidence "
+          f"{analysis.CASCADE_MIN_CONFIDENCE:.2f}: {escalation_rate:.1%}")
+    ok = escalation_rate <= MAX_ESCALATION_RATE
+    print("OK: the fast model keeps most messages." if ok else
+          f"FAILED: more than {MAX_ESCALATION_RATE:.0%} of messages would be escalated.")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
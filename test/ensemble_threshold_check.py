@@ -0,0 +1,60 @@
+# Check that re-thresholding a stored ensemble score matrix reproduces the ensemble's labels
+#
+# Usage (from the repository root):
+#   python test/ensemble_threshold_check.py                 # data/sample_chat.csv
+#   python test/ensemble_threshold_check.py path/to/chat.csv
+#
+# The dashboard's threshold expander relabels messages from the saved score matrix with
+# analysis.apply_sentiment_thresholds. At the default thresholds (and min_confidence 0) that must
+# give back exactly the labels the ensemble produced, for both combine modes and with weights
+# that create tied votes. Members that cannot be loaded here are excluded from the vote, as in the
+# dashboard. Exits with status 1 on any mismatch.
+
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analysis
+
+DEFAULT_SOURCE = os.path.join("data", "sample_chat.csv")
+CONFIGURATIONS = {
+    "vote": {'combine': 'vote'},
+    "vote, weighted (ties)": {'combine': 'vote', 'members': ['vader', 'textblob'], 'weights': {'vader': 1.0, 'textblob': 1.0}},
+    "vote, weighted (no ties)": {'combine': 'vote', 'weights': {'textblob': 2.0}},
+    "average": {'combine': 'average'},
+}
+
+
+def load_messages(path: str) -> pd.Series:
+    frame = pd.read_csv(path, encoding='utf-8-sig')
+    column = 'message' if 'message' in frame.columns else 'content'
+    return frame[column]
+
+
+def check(name: str, messages: pd.Series, options: dict) -> bool:
+    labels, scores, _ = analysis.run_sentiment_scores(messages, method='ensemble', method_options=options)
+    rethresholded = analysis.apply_sentiment_thresholds(scores, 'ensemble')
+    mismatches = [i for i, (label, relabel) in enumerate(zip(labels, rethresholded)) if label != relabel]
+    members = analysis.last_ensemble_report.get('members', [])
+    print(f"{name:<26} {len(messages):>6} messages | members {', '.join(members) or '-'} | "
+          f"label mismatches {len(mismatches)}")
+    for i in mismatches[:10]:
+        print(f"    {messages.iloc[i]!r}: ensemble {labels.iloc[i]}, re-thresholded {rethresholded[i]} (scores {scores[i]})")
+    return not mismatches
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    messages = load_messages(argv[0] if argv else DEFAULT_SOURCE)
+    ok = True
+    for name, options in CONFIGURATIONS.items():
+        ok = check(name, messages, options) and ok
+    print("OK: default thresholds reproduce the ensemble labels." if ok else "FAILED: re-thresholding changes ensemble labels.")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# Parity and speed check for lexicon_engine against vaderSentiment / TextBlob
+#
+# Usage (from the repository root):
+#   python test/lexicon_parity_check.py            # bundled chat logs + edge cases + 20000 random lines
+#   python test/lexicon_parity_check.py --fuzz 200000
+#
+# Every message is scored with the library (per-row, as analysis.get_vader_sentiment /
+# get_textblob_sentiment do) and with the compiled engine; scores must be equal and labels identical.
+# Exits with status 1 on any mismatch.
+
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analysis
+import lexicon_engine
+
+EDGE_CASES = [
+    "VADER is smart, handsome, and funny.", "VADER is smart, handsome, and funny!",
+    "VADER is very smart, handsome, and funny.", "VADER is VERY SMART, handsome, and FUNNY.",
+    "VADER is VERY SMART, uber handsome, and FRIGGIN FUNNY!!!", "VADER is not smart, handsome, nor funny.",
+    "At least it isn't a horrible book.", "The book was only kind of good.",
+    "The plot was good, but the characters are uncompelling and the dialog is not great.",
+    "Today SUX!", "Today only kinda sux! But I'll get by, lol", "Make sure you :) or :D today!",
+    "Catch utf-8 emoji such as 💘 and 💋 and 😁", "Not bad at all", "Sentiment analysis has never been this good!",
+    "With VADER, sentiment analysis is the shit!", "On the other hand, VADER is quite bad ass",
+    "Without a doubt, excellent idea.", "Roger Dodger is one of the least compelling variations on this theme.",
+    "Roger Dodger is at least compelling as a variation on the theme.", "no no no good", "no, not bad or nor good",
+    "good but bad but good", "good good but bad bad", "very very very good", "GOOD", "good GOOD good",
+    "not really good", "really not good", "not a good day", "I don't like it", "I DON'T like it", "can't stop, won't stop",
+    "terribly bad (!)", "great!!!! really?? ??", "awful... :( :'( : ( ;-)", "<3 <3 ♥", "xD XD x-D", "o.O >.> :-.",
+    "well-known far-out fine-looking f*cking", "e.g. good. U.S. great. Mr. Nice", "good\n\nbad", "\"good\" 'bad' “nice” ‘sad’",
+    "", "   ", "!!!", "???", "kekw", "çok iyi ya :)", "berbat bir yayın :(", "😂😂😂", "🔥 good 🔥",
+]
+
+FUZZ_WORDS = [
+    "good", "bad", "great", "terrible", "love", "hate", "not", "no", "never", "very", "really", "kind", "of", "sort",
+    "but", "least", "at", "so", "this", "without", "doubt", "the", "shit", "bomb", "nor", "or", "isn't", "don't",
+    "n't", "funny", "happy", "sad", "lol", "kinda", "extremely", "barely", "terribly", "nice", "awful", "ok", "is",
+    "a", "it", "çok", "iyi", "kötü", "ya", "kekw", ":)", ":(", ":D", ";)", "<3", ":'(", "xD", "o.O", "(!)", "!", "?",
+    "...", ".", ",", "'", '"', "-", "😂", "🔥", "💘", "\n\n", "U.S.", "Mr.", "bad-ass", "far-out",
+]
+FUZZ_CHARS = "goodbadlvenxDOP :;()[]<>=-'\"!?.,*^_8°♥\n"
+
+
+def load_messages() -> list:
+    paths = (glob.glob(os.path.join("data", "labeled_data", "*.csv")) + glob.glob(os.path.join("data", "live-kick-data-*.csv"))
+             + glob.glob(os.path.join("data", "sample_chat.csv")))
+    messages = []
+    for path in paths:
+        df = pd.read_csv(path, encoding="utf-8-sig")
+        column = analysis._detect_text_column(df)
+        messages.extend(str(message) for message in df[column].fillna(""))
+    return messages
+
+
+def fuzz_messages(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        if rng.random() < 0.25: # Character soup for tokenizer/emoticon corner cases
+            messages.append("".join(rng.choice(FUZZ_CHARS) for _ in range(rng.randint(1, 20))))
+            continue
+        words = [rng.choice(FUZZ_WORDS) for _ in range(rng.randint(1, 12))]
+        words = [word.upper() if rng.random() < 0.15 else word for word in words]
+        separators = [rng.choice([" ", " ", " ", "", "  "]) for _ in words]
+        messages.append("".join(word + separator for word, separator in zip(words, separators)))
+    return messages
+
+
+def check(kind: str, messages: list) -> bool:
+    if kind == 'vader':
+        analyzer = analysis.load_vader_analyzer()
+        start = time.perf_counter()
+        expected = [analyzer.polarity_scores(message)['compound'] for message in messages]
+        expected_labels = [analysis.get_vader_sentiment(message, analyzer) for message in messages]
+    else:
+        start = time.perf_counter()
+        expected = [analysis.TextBlob(message).sentiment.polarity for message in messages]
+        expected_labels = [analysis.get_textblob_sentiment(message) for message in messages]
+    library_seconds = (time.perf_counter() - start) / 2 # Scores and labels each score every message once
+
+    lexicon_engine.get_engine(kind) # Index build is a one-off cost, like loading the analyzer
+    start = time.perf_counter()
+    values = lexicon_engine.score_lexicon_batch(kind, messages)
+    engine_seconds = time.perf_counter() - start
+    labels = analysis.apply_sentiment_thresholds(values, kind)
+
+    score_mismatches = [i for i, (value, reference) in enumerate(zip(values, expected)) if value != reference]
+    label_mismatches = [i for i, (label, reference) in enumerate(zip(labels, expected_labels)) if label != reference]
+    print(f"{kind:<9} {len(messages):>7} messages | library {library_seconds:.3f}s | engine {engine_seconds:.3f}s "
+          f"({library_seconds / max(engine_seconds, 1e-9):.1f}x) | score mismatches {len(score_mismatches)} | "
+          f"label mismatches {len(label_mismatches)}")
+    for i in (score_mismatches + label_mismatches)[:10]:
+        print(f"    {messages[i]!r}: library {expected[i]} / {expected_labels[i]}, engine {values[i]} / {labels[i]}")
+    return not score_mismatches and not label_mismatches
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare lexicon_engine with vaderSentiment and TextBlob.")
+    parser.add_argument("--fuzz", type=int, default=20000, help="Random English/Turkish/emoticon lines to add (default: 20000)")
+    args = parser.parse_args(argv)
+
+    corpora = {"chat logs": load_messages(), "edge cases": EDGE_CASES, "fuzz": fuzz_messages(args.fuzz)}
+    ok = True
+    for name, messages in corpora.items():
+        print(f"--- {name} ---")
+        for kind in ('vader', 'textblob'):
+            ok = check(kind, messages) and ok
+    print("OK: engine matches the libraries." if ok else "FAILED: engine differs from the libraries.")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# Parity and speed check for analysis.preprocess_text against the original NLTK implementation
+#
+# Usage (from the repository root; needs the NLTK data from the README: punkt/punkt_tab,
+# stopwords, wordnet):
+#   python test/preprocess_parity_check.py
+#
+# The original preprocess_text (per-call regexes, word_tokenize, lemmatize on every token) is
+# kept below as the reference. Both run on the bundled chat logs plus edge cases; the token
+# lists must be identical. Exits with status 1 on any mismatch.
+
+import glob
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analysis
+from nltk.tokenize import word_tokenize
+
+EDGE_CASES = [
+    "", "   ", "!komut yaz", "  !komut", "http://kick.com/naru bak", "link: https://x.co/a?b=1 güzel",
+    "I cannot believe it, gonna be great", "CANNOT GONNA GOTTA LEMME GIMME WANNA", "wanna", "wannabe gonnas",
+    "can't won't don't it's they're", "İSTANBUL ıspanak İyi ILIK", "gımme gİmme", "oyun_2024 __init__ snake_case",
+    "3 gol 2 asist 1.5 saat", "²³ ½ ٣٤ numbers", "tab\tnew\nline\r\nspace nbsp em", "çok güzel yayın ❤️🔥",
+    "running dogs cats leaves", "the and of is was", "...!!!???", "e-posta @kullanıcı #etiket $para %50",
+]
+
+
+def reference_preprocess_text(text):
+    """analysis.preprocess_text before the precompiled/memoized rewrite."""
+    text = str(text).lower()
+    text = re.sub(r'http\S+', '', text)
+    if text.strip().startswith('!'):
+        return []
+    text = re.sub(r'[^\w\s]', '', text)
+    text = re.sub(r'\d+', '', text)
+    tokens = word_tokenize(text)
+    stop_words = analysis.get_stop_words()
+    lemmatizer = analysis.get_lemmatizer()
+    processed_tokens = []
+    for word in tokens:
+        if word not in stop_words and len(word) >= analysis.MIN_WORD_LENGTH:
+            try:
+                processed_tokens.append(lemmatizer.lemmatize(word))
+            except Exception:
+                processed_tokens.append(word)
+    return processed_tokens
+
+
+def load_messages() -> list:
+    paths = (glob.glob(os.path.join("data", "labeled_data", "*.csv")) + glob.glob(os.path.join("data", "live-kick-data-*.csv"))
+             + glob.glob(os.path.join("data", "sample_chat.csv")))
+    messages = []
+    for path in paths:
+        df = pd.read_csv(path, encoding="utf-8-sig")
+        messages.extend(str(message) for message in df[analysis._detect_text_column(df)].fillna(""))
+    return messages
+
+
+def main() -> int:
+    messages = load_messages() + EDGE_CASES
+    analysis.preprocess_text("warm up") # Loads stopwords and WordNet outside the timed runs
+    reference_preprocess_text("warm up")
+
+    start = time.perf_counter()
+    expected = [reference_preprocess_text(message) for message in messages]
+    reference_seconds = time.perf_counter() - start
+
+    analysis._process_token.cache_clear()
+    start = time.perf_counter()
+    actual = analysis.preprocess_messages(pd.Series(messages, dtype='object'))
+    new_seconds = time.perf_counter() - start
+
+    mismatches = [i for i, (tokens, reference) in enumerate(zip(actual, expected)) if tokens != reference]
+    print(f"{len(messages)} messages | original {reference_seconds:.3f}s | new {new_seconds:.3f}s "
+          f"({reference_seconds / max(new_seconds, 1e-9):.1f}x) | mismatches {len(mismatches)} | "
+          f"token cache {analysis._process_token.cache_info()}")
+    for i in mismatches[:10]:
+        print(f"    {messages[i]!r}: original {expected[i]}, new {actual[i]}")
+    print("OK: preprocessing output is unchanged." if not mismatches else "FAILED: preprocessing output differs.")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+# Over-stemming check for the Turkish stemmer used by topic vocabulary reduction
+#
+# Usage (from the repository root):
+#   python test/turkish_stemmer_check.py
+#
+# Words whose ending only looks like a suffix must keep their meaning ("yayın" is not "yay"),
+# and ordinary inflections must still reach their stem. Both stemmers are checked: the built-in
+# suffix stripper (used when snowballstemmer is not installed) and the guarded snowballstemmer
+# Turkish stemmer that the default install (requirements.txt) uses. Exits with status 1 on any
+# mismatch, or if snowballstemmer is not installed.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analysis
+
+# Roots that end in suffix-like letters: stripping them changes the word
+UNCHANGED = [
+    "yayın", "oyun", "için", "kadın", "dünya", "hatta", "kaya", "araya", "bende", "neden", "zaten",
+    "panda", "orta", "usta", "sade", "yayını", "oyunu", "kanal", "takım", "bugün", "herkes",
+]
+
+# Inflected forms and the stem they should share with the bare word
+STEMS = {
+    "yayınlar": "yayın", "yayınları": "yayın", "yayınlarda": "yayın", "yayında": "yayın", "yayından": "yayın",
+    "oyunda": "oyun", "oyunlar": "oyun", "oyuncular": "oyuncu", "oyuncuya": "oyuncu",
+    "dünyaya": "dünya", "istanbulda": "istanbul", "haftaya": "hafta", "kanallarda": "kanal",
+    "arabanın": "araba", "gelecekte": "gelecek", "takımıyla": "takımı",
+}
+
+# Stacked suffixes only snowball splits (the fallback strips one suffix per word)
+SNOWBALL_STEMS = {
+    "kanallarından": "kanal", "yayınlarından": "yayın", "oyuncularla": "oyuncu", "takımlarından": "takım",
+}
+
+
+def check(name: str, stem, stems: dict) -> list:
+    failures = []
+    for word in UNCHANGED:
+        stemmed = stem(word)
+        if stemmed != word:
+            failures.append(f"    {name}: over-stemmed {word!r} -> {stemmed!r}")
+    for word, expected in stems.items():
+        stemmed = stem(word)
+        if stemmed != expected:
+            failures.append(f"    {name}: {word!r} -> {stemmed!r}, expected {expected!r}")
+    print(f"{name}: {len(UNCHANGED)} roots, {len(stems)} inflected forms | mismatches {len(failures)}")
+    return failures
+
+
+def main() -> int:
+    failures = check("fallback stemmer", analysis._strip_turkish_suffix, STEMS)
+    stemmer = analysis.get_turkish_stemmer()
+    if stemmer is analysis._strip_turkish_suffix:
+        failures.append("    snowballstemmer is not installed, so the default stemmer was not checked (pip install -r requirements.txt)")
+    else:
+        failures += check("snowball stemmer (guarded)", stemmer, {**STEMS, **SNOWBALL_STEMS})
+    print("\n".join(failures) if failures else "OK: no over-stemming, inflections reach their stem.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# Persistent topic model cache (one directory of gensim files per trained model)
+#
+# Streamlit re-runs the whole script on every interaction, and re-analyzing the same upload
+# used to retrain LDA from scratch. A trained model, its dictionary, the formatted topics and the
+# coherence score of each mode computed so far are saved under a fingerprint of the preprocessed
+# corpus plus the training parameters, so the same data and settings load the model instead. Entries are evicted in
+# least-recently-used order once the cache directory grows past `max_bytes`.
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from lazy_imports import lazy_import
+
+LdaModel = lazy_import('gensim.models', 'LdaModel')
+Dictionary = lazy_import('gensim.corpora', 'Dictionary')
+
+DEFAULT_CACHE_DIR = os.environ.get("KICK_TOPIC_CACHE_DIR", os.path.join(".cache", "topic_models"))
+DEFAULT_MAX_BYTES = int(float(os.environ.get("KICK_TOPIC_CACHE_MAX_MB", "512")) * 1024 ** 2)
+EVICTION_SLACK = 0.1 # Evict down to 90% of max_bytes so eviction does not run on every insert
+_META_FILE = "meta.json"
+_MODEL_FILE = "lda.model"
+_DICTIONARY_FILE = "dictionary"
+
+
+def corpus_fingerprint(processed_docs, params: dict) -> str:
+    """Cache key for a preprocessed corpus (token lists, in order) trained with `params`.
+
+    Document order is part of the key: online LDA results depend on it."""
+    digest = hashlib.blake2b(json.dumps(params, sort_keys=True, default=str).encode("utf-8"), digest_size=20)
+    for doc in processed_docs:
+        digest.update(" ".join(doc).encode("utf-8")) # Tokens never contain whitespace
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def _directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+class TopicModelCache:
+    """Directory-backed cache of trained LDA models with size-bounded LRU eviction."""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str):
+        """Loads a cached entry.
+
+        Returns:
+            tuple: (lda_model, meta dict) or None if `key` is not cached (or cannot be loaded).
+        """
+        path = self._entry_path(key)
+        meta_path = os.path.join(path, _META_FILE)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            lda_model = LdaModel.load(os.path.join(path, _MODEL_FILE))
+            lda_model.id2word = Dictionary.load(os.path.join(path, _DICTIONARY_FILE))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            print(f"Warning: Could not load cached topic model {key}: {e}. Retraining.")
+            self.misses += 1
+            return None
+        os.utime(meta_path) # Modification time of meta.json orders LRU eviction
+        self.hits += 1
+        return lda_model, meta
+
+    def put(self, key: str, lda_model, dictionary, meta: dict) -> None:
+        """Saves a trained model, its dictionary and JSON-serializable `meta` under `key`."""
+        staging = os.path.join(self.directory, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(staging)
+        try:
+            # id2word is stored once, as the dictionary file
+            lda_model.save(os.path.join(staging, _MODEL_FILE), ignore=('state', 'dispatcher', 'id2word'))
+            dictionary.save(os.path.join(staging, _DICTIONARY_FILE))
+            with open(os.path.join(staging, _META_FILE), "w", encoding="utf-8") as f:
+                json.dump({**meta, 'created': time.time()}, f)
+            with self._lock:
+                path = self._entry_path(key)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                os.replace(staging, path) # Readers never see a half-written entry
+                self._evict_if_needed()
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def update_meta(self, key: str, **fields) -> None:
+        """Merges `fields` into a cached entry's metadata (e.g. a coherence score computed later)."""
+        meta_path = os.path.join(self._entry_path(key), _META_FILE)
+        with self._lock:
+            try:
+                with open(meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+            except FileNotFoundError:
+                return
+            meta.update(fields)
+            staging = f"{meta_path}.{uuid.uuid4().hex}"
+            with open(staging, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(staging, meta_path)
+
+    def _entries(self) -> list:
+        """(last used, size in bytes, path) for every complete entry."""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            meta_path = os.path.join(path, _META_FILE)
+            if name.startswith(".tmp-") or not os.path.isfile(meta_path):
+                continue
+            entries.append((os.path.getmtime(meta_path), _directory_size(path), path))
+        return entries
+
+    def _evict_if_needed(self) -> None:
+        """Drops least-recently-used entries once the cache is over its size bound."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * (1 - EVICTION_SLACK))
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted += 1
+        print(f"Topic model cache: evicted {evicted} least-recently-used models.")
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for this process and the number and size of stored models."""
+        with self._lock:
+            entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self) -> None:
+        """Removes every entry and resets the counters."""
+        with self._lock:
+            for _, _, path in self._entries():
+                shutil.rmtree(path, ignore_errors=True)
+            self.hits = 0
+            self.misses = 0